@@ -1,6 +1,5 @@
 from fastapi import FastAPI, Request, Form, Depends, HTTPException, status, BackgroundTasks
-from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, RedirectResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, StreamingResponse, Response
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer
@@ -10,25 +9,68 @@ from dotenv import load_dotenv
 import subprocess
 import tempfile
 import re
+import json
+import base64
 import asyncio
-import threading
-from typing import Dict
+import uuid
+from typing import Optional
 from jose import JWTError, jwt
 from sqlalchemy.orm import Session
 
 # Load environment variables from .env file
 load_dotenv()
 
-from generate_prompt import InputSpec, build_prompt, call_openai_chat
-from database.models import User, ProductTerm, Report, get_db, create_tables
+from generate_prompt import (
+    InputSpec, build_prompt, call_openai_chat_async, stream_openai_chat_async,
+    call_openai_chat_sections_async, iter_openai_chat_sections_async, section_groups_for,
+    PROMPT_TEMPLATE_VERSION, LLM_ERROR_PREFIX
+)
+from database.models import User, ProductTerm, Report, SessionLocal, get_db, create_tables
 from auth.auth import get_current_user, verify_token
 from auth.auth_routes import router as auth_router
+from services.openai_clients import openai_clients
+from services.report_cache import report_cache
+from services.single_flight import report_single_flight
+from services.job_store import job_store
+from services.job_worker import JobWorker, JobSweeper
+from services.job_events import job_events
+from services.fair_scheduler import fair_scheduler
+from services.idempotency import idempotency_store
+from services.report_renderer import RENDERER_VERSION, render_report_document
+from services.render_cache import RenderedPage, render_cache
+from services.pdf_renderer import PdfBusy, pdf_renderer
+from services.executors import io_executor, render_executor
+from services.http_cache import ENCODING_SUFFIXES, cached_bytes_response, cached_file_response, write_compressed_variants
+from services.static_assets import CachedStaticFiles, asset_url
+from services.term_index import rank_from_key, term_index
+from services.term_fts import term_fts
+from services.fuzzy_terms import fuzzy_terms
 
 # App will be initialized later with lifespan
 
-# Job status tracking for async report generation
-job_status: Dict[str, Dict] = {}
-job_lock = threading.Lock()
+# "single" asks for the whole report in one completion; "sections" fans it out per section group
+GENERATION_MODES = ("single", "sections")
+DEFAULT_GENERATION_MODE = os.getenv("REPORT_GENERATION_MODE", "single")
+# Languages the prompt and report page are written for
+REPORT_LANGUAGES = ("en", "it")
+
+# Report generation jobs run on a worker that claims them from the persistent job store
+JOB_WORKER_ENABLED = os.getenv("JOB_WORKER_ENABLED", "true").lower() == "true"
+# Whether /generate queues reports by default instead of generating them inside the request
+DEFAULT_ASYNC_JOBS = os.getenv("REPORT_ASYNC_JOBS", "false").lower() == "true"
+# Longest a /job-status long-poll may block, in seconds
+JOB_STATUS_MAX_WAIT = float(os.getenv("JOB_STATUS_MAX_WAIT", "60"))
+
+# How long a repeated submission waits for the original request holding its idempotency key
+IDEMPOTENCY_WAIT_TIMEOUT = float(os.getenv("IDEMPOTENCY_WAIT_TIMEOUT", "900"))
+
+# Browsers keep report pages but revalidate them (ETag / Last-Modified) on every view
+REPORT_CACHE_CONTROL = os.getenv("REPORT_CACHE_CONTROL", "private, no-cache")
+# Reports with at least this much markdown are rendered on the render process pool rather than an I/O thread
+RENDER_PROCESS_MIN_BYTES = int(os.getenv("RENDER_PROCESS_MIN_BYTES", "16384"))
+
+# Accounts allowed to see admin-only introspection endpoints
+ADMIN_EMAILS = {email.strip().lower() for email in os.getenv("ADMIN_EMAILS", "").split(",") if email.strip()}
 
 # These will be configured after app initialization
 
@@ -59,6 +101,25 @@ async def lifespan(app: FastAPI):
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
     
+    # Start draining the job queue
+    if JOB_WORKER_ENABLED:
+        job_worker.start()
+    job_sweeper.start()
+    
+    # Prepare product term search before the first keystroke arrives
+    if term_index.enabled:
+        try:
+            await asyncio.to_thread(term_index.build)
+        except Exception as e:
+            print(f"Error building term index: {e}")
+    elif term_fts.enabled:
+        await asyncio.to_thread(term_fts.setup)
+    if fuzzy_terms.enabled:
+        try:
+            await asyncio.to_thread(fuzzy_terms.build)
+        except Exception as e:
+            print(f"Error building fuzzy term matcher: {e}")
+    
     yield
     
     # Shutdown
@@ -71,6 +132,10 @@ async def lifespan(app: FastAPI):
             for task in tasks:
                 task.cancel()
             await asyncio.gather(*tasks, return_exceptions=True)
+        # Release pooled upstream connections
+        await openai_clients.aclose()
+        io_executor.shutdown()
+        render_executor.shutdown()
     except Exception as e:
         print(f"Error during shutdown: {e}")
 
@@ -110,8 +175,9 @@ app.add_middleware(
 )
 
 # Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount("/static", CachedStaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
+templates.env.globals["asset_url"] = asset_url
 
 # Include authentication routes
 app.include_router(auth_router)
@@ -121,64 +187,40 @@ os.makedirs("reports", exist_ok=True)
 # Security scheme
 security = HTTPBearer(auto_error=False)
 
-def generate_report_background(job_id: str, brand: str, product: str, budget: str, enterprise_size: str, other_info: str, ai_model: str, language: str, user_id: int):
-    """Background task for report generation"""
+async def generate_report_background(job_id: str, worker_id: str, brand: str, product: str, budget: str, enterprise_size: str, other_info: str, ai_model: str, language: str, user_id: int, bypass_cache: bool = False, generation_mode: str = DEFAULT_GENERATION_MODE):
+    """Run a queued report generation job, recording progress in the job store"""
+    # The report's file or database write in progress, and the completion, if it got that far
+    writing = completing = None
     try:
-        with job_lock:
-            job_status[job_id] = {"status": "processing", "progress": 0}
+        if language not in REPORT_LANGUAGES:
+            raise ValueError(f"Unsupported language: {language}")
         
         # Update progress
-        with job_lock:
-            job_status[job_id]["progress"] = 25
+        await asyncio.to_thread(job_store.update_progress, job_id, worker_id, 25)
         
         # Build prompt
         spec = InputSpec(brand=brand.strip(), product=product.strip(), budget=budget.strip(), enterprise_size=enterprise_size.strip(), other_info=other_info.strip())
-        prompt_text = build_prompt(spec, analysis_date=datetime.now().strftime("%d %B %Y"), language=language)
+        analysis_date = datetime.now()
+        prompt_text = build_prompt(spec, analysis_date=analysis_date.strftime("%d %B %Y"), language=language)
         
         # Update progress
-        with job_lock:
-            job_status[job_id]["progress"] = 50
+        await asyncio.to_thread(job_store.update_progress, job_id, worker_id, 50)
         
         # Generate report text
-        if ai_model != "none" and ai_model != "undefined":
-            report_text = call_openai_chat(prompt_text, model=ai_model)
-        else:
-            if ai_model == "undefined":
-                report_text = call_openai_chat(prompt_text, model="gpt-5")
-            else:
-                report_text = prompt_text
+        report_text = await generate_report_text(spec, prompt_text, ai_model, language, analysis_date, bypass_cache, generation_mode)
         
         # Ensure report_text is not None and not empty
         if report_text is None or report_text.strip() == "":
-            report_text = f"""# AI Trade Report - {brand}
-
-**Error:** Unable to generate report content. Please try again.
-
-## Troubleshooting
-
-If you continue to experience issues, please:
-1. Check your internet connection
-2. Verify your OpenAI API key is valid
-3. Try again in a few minutes
-4. Contact support if the problem persists
-
----
-*Report generated on {datetime.now().strftime('%d %B %Y')}*"""
+            report_text = empty_report_text(brand, product, budget, enterprise_size)
         
         # Update progress
-        with job_lock:
-            job_status[job_id]["progress"] = 75
+        await asyncio.to_thread(job_store.update_progress, job_id, worker_id, 75)
         
         # Generate filenames
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        report_filename_txt = f"reports/report_{user_id}_{timestamp}.txt"
         report_filename_pdf = f"report_{user_id}_{timestamp}"
         
-        # Save text version
-        with open(report_filename_txt, "w", encoding="utf-8") as f:
-            f.write(report_text)
-        
-        # Create HTML version
+        # Save text version and what the report page is rendered with
         form_data = {
             'brand': brand,
             'product': product,
@@ -186,1656 +228,273 @@ If you continue to experience issues, please:
             'enterprise_size': enterprise_size,
             'other_info': other_info
         }
-        html_path = create_html_report(report_text, report_filename_pdf, language, form_data)
+        # Shielded, so a cancel cannot interrupt the writes halfway; it waits for them and removes them instead
+        writing = asyncio.ensure_future(io_executor.run(write_report_files, report_filename_pdf, report_text, language, form_data))
+        await asyncio.shield(writing)
         actual_filename = f"{report_filename_pdf}.html"
         
+        # Save report metadata to database
+        writing = asyncio.ensure_future(io_executor.run(store_report_record, user_id, form_data, ai_model, language, actual_filename))
+        await asyncio.shield(writing)
+        
         # Update job status to completed
-        with job_lock:
-            form_data_params = f"?brand={brand}&product={product}&budget={budget}&enterprise_size={enterprise_size}"
-            job_status[job_id] = {
-                "status": "completed",
-                "progress": 100,
-                "redirect_url": f"/report/{actual_filename}{form_data_params}",
-                "report_name": actual_filename
-            }
+        completing = asyncio.ensure_future(asyncio.to_thread(job_store.complete, job_id, worker_id, {
+            "redirect_url": report_redirect_url(actual_filename, form_data),
+            "report_name": actual_filename
+        }))
+        if not await asyncio.shield(completing):
+            # Cancelled (or taken over) before the worker noticed; the report must not outlive the job
+            await io_executor.run(discard_report_output, report_filename_pdf)
+            await asyncio.to_thread(job_store.finish_cancel, job_id, worker_id)
             
+    except asyncio.CancelledError:
+        completed = completing is not None and (await asyncio.gather(completing, return_exceptions=True))[0] is True
+        if writing is not None and not completed:
+            # Remove what was written before the worker marks the job cancelled
+            await asyncio.gather(writing, return_exceptions=True)
+            await io_executor.run(discard_report_output, report_filename_pdf)
+        raise
     except Exception as e:
         # Update job status to error
-        with job_lock:
-            job_status[job_id] = {
-                "status": "error",
-                "progress": 0,
-                "error": str(e)
-            }
-
-def create_html_report(content: str, filename: str, language: str = "en", form_data: dict = None) -> str:
-    """Create an HTML report from text content"""
-    html_path = f"reports/{filename}.html"
+        await asyncio.to_thread(job_store.fail, job_id, worker_id, str(e))
+
+async def enqueue_report_job(user_id: int, **params) -> str:
+    """Queue a report generation for the job workers and return its job id"""
+    job_id = uuid.uuid4().hex
+    await asyncio.to_thread(job_store.create, job_id, dict(params, user_id=user_id), user_id=user_id)
+    return job_id
+
+async def run_report_job(job_id: str, worker_id: str, payload: dict):
+    await generate_report_background(job_id, worker_id, **payload)
+
+job_worker = JobWorker(job_store, run_report_job, fair_scheduler)
+job_sweeper = JobSweeper(job_store)
+
+async def cached_report_text(cache_key: str) -> Optional[str]:
+    """Look a report up in the response cache, reading its disk tier off the event loop"""
+    cached_text = report_cache.get_from_memory(cache_key)
+    if cached_text is None:
+        cached_text = await io_executor.run(report_cache.get, cache_key)
+    return cached_text
+
+async def generate_report_text(spec: InputSpec, prompt_text: str, ai_model: str, language: str, analysis_date: datetime, bypass_cache: bool = False, generation_mode: str = DEFAULT_GENERATION_MODE) -> str:
+    """Produce the report text for a spec, serving identical specs from the response cache"""
+    if ai_model == "none":
+        print("DEBUG: Using prompt text as fallback")
+        return prompt_text
+    if ai_model == "undefined":
+        print("DEBUG: AI model was 'undefined', using gpt-5 as fallback")
+    model = "gpt-5" if ai_model == "undefined" else ai_model
     
-    # Create HTML content
-    html_content = create_html_document(content, language, form_data)
+    def call_llm():
+        if generation_mode == "sections":
+            return call_openai_chat_sections_async(prompt_text, section_groups_for(spec), model=model)
+        return call_openai_chat_async(prompt_text, model=model)
     
-    # Write HTML file
-    with open(html_path, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    if bypass_cache:
+        report_cache.record_bypass()
+        return await call_llm()
     
-    return html_path
-
-def create_html_document(content: str, language: str = "en", form_data: dict = None) -> str:
-    """Convert text content to HTML format"""
+    cache_key = report_cache.make_key(spec, language, model, PROMPT_TEMPLATE_VERSION, analysis_date.date(), generation_mode)
+    cached_text = await cached_report_text(cache_key)
+    if cached_text is not None:
+        return cached_text
     
-    # Language-specific translations
-    translations = {
-        "en": {
-            "title": "AI Trade Report - Professional Market Analysis",
-            "report_title": "AI Trade Report",
-            "report_overview": "Report Overview",
-            "generated_by": "Generated by:",
-            "ai_powered": "AI-Powered Market Research",
-            "date": "Date:",
-            "report_type": "Report Type:",
-            "comprehensive_analysis": "Comprehensive Market Analysis",
-            "footer_text1": "This report was generated using AI-powered market research technology.",
-            "footer_text2": "For questions or additional analysis, please contact your research team.",
-            "print": "Print",
-            "download_pdf": "Download PDF",
-            "save": "Save",
-            "return_home": "Home",
-            "saved_reports_title": "Your Saved Reports",
-            "saved_reports_subtitle": "Access and manage your previously generated reports",
-            "saved_reports_nav": "Saved Reports",
-            "no_reports_title": "No Saved Reports Yet",
-            "no_reports_description": "Generate your first report to see it saved here for easy access."
-        },
-        "it": {
-            "title": "AI Trade Report - Analisi di Mercato Professionale",
-            "report_title": "AI Trade Report",
-            "report_overview": "Panoramica del Report",
-            "generated_by": "Generato da:",
-            "ai_powered": "Ricerca di Mercato basata su AI",
-            "date": "Data:",
-            "report_type": "Tipo di Report:",
-            "comprehensive_analysis": "Analisi di Mercato Completa",
-            "footer_text1": "Questo report è stato generato utilizzando tecnologia di ricerca di mercato basata su AI.",
-            "footer_text2": "Per domande o analisi aggiuntive, contatta il tuo team di ricerca.",
-            "print": "Stampa",
-            "download_pdf": "Scarica PDF",
-            "save": "Salva",
-            "return_home": "Home",
-            "saved_reports_title": "I Tuoi Report Salvati",
-            "saved_reports_subtitle": "Accedi e gestisci i tuoi report generati in precedenza",
-            "saved_reports_nav": "Report Salvati",
-            "no_reports_title": "Nessun Report Salvato Ancora",
-            "no_reports_description": "Genera il tuo primo report per vederlo salvato qui per un accesso facile."
-        }
-    }
-    
-    t = translations.get(language, translations["en"])
-    
-    # Escape HTML special characters
-    def escape_html(text):
-        special_chars = {
-            '&': '&amp;',
-            '<': '&lt;',
-            '>': '&gt;',
-            '"': '&quot;',
-            "'": '&#x27;'
-        }
-        for char, replacement in special_chars.items():
-            text = text.replace(char, replacement)
-        return text
+    async def generate():
+        report_text = await call_llm()
+        # Never cache failures: they are returned as text rather than raised
+        if report_text and report_text.strip() and not report_text.startswith(LLM_ERROR_PREFIX):
+            await io_executor.run(report_cache.put, cache_key, report_text)
+        return report_text
     
-    # Start HTML document
-    html = """<!DOCTYPE html>
-<html lang=""" + language + """>
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0, maximum-scale=1.0, user-scalable=no">
-    <title>""" + t['title'] + """</title>
-    <link rel="preconnect" href="https://fonts.googleapis.com">
-    <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
-    <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&family=JetBrains+Mono:wght@400;500&display=swap" rel="stylesheet">
-    <script src="https://cdnjs.cloudflare.com/ajax/libs/html2pdf.js/0.10.1/html2pdf.bundle.min.js"></script>
-    <style>
-        html, body {
-            font-family: 'Times New Roman', serif;
-            font-size: 12pt;
-            line-height: 1.5;
-            margin: 0;
-            padding: 0;
-            background-color: #f5f5f5;
-            color: #333;
-            width: 100%;
-            min-width: 100%;
-            box-sizing: border-box;
-        }
-        .container {
-            width: 100vw;
-            min-width: 100%;
-            margin: 0;
-            background: white;
-            padding: 40px;
-            border-radius: 0;
-            box-shadow: none;
-            box-sizing: border-box;
-        }
-        h1 {
-            color: #2c3e50;
-            font-weight: bold;
-            font-size: 18pt;
-            border-bottom: 3px solid #3498db;
-            padding-bottom: 10px;
-            margin-bottom: 30px;
-            text-align: center;
-        }
-        h2 {
-            color: #34495e;
-            font-weight: bold;
-            font-size: 16pt;
-            border-bottom: 2px solid #ecf0f1;
-            padding-bottom: 8px;
-            margin-top: 30px;
-            margin-bottom: 20px;
-        }
-        h3 {
-            color: #2c3e50;
-            font-weight: bold;
-            font-size: 14pt;
-            margin-top: 25px;
-            margin-bottom: 15px;
-        }
-        h4 {
-            color: #7f8c8d;
-            font-weight: bold;
-            font-size: 12pt;
-            margin-top: 20px;
-            margin-bottom: 10px;
-        }
-        p {
-            margin-bottom: 15px;
-            text-align: justify;
-        }
-        ul, ol {
-            margin-bottom: 15px;
-            padding-left: 30px;
-            line-height: 1.5;
-        }
-        li {
-            margin-bottom: 8px;
-            line-height: 1.5;
-        }
-        /* Professional bullet points */
-        ul li {
-            list-style-type: disc;
-            margin-left: 20px;
-        }
-        ul ul li {
-            list-style-type: circle;
-        }
-        ul ul ul li {
-            list-style-type: square;
-        }
-        table {
-            width: 100%;
-            border-collapse: collapse;
-            margin: 20px 0;
-            background: white;
-            box-shadow: 0 1px 3px rgba(0,0,0,0.1);
-        }
-        th, td {
-            border: 1px solid #ddd;
-            padding: 12px;
-            text-align: left;
-        }
-        th {
-            background-color: #3498db;
-            color: white;
-            font-weight: bold;
-        }
-        tr:nth-child(even) {
-            background-color: #f8f9fa;
-        }
-        tr:hover {
-            background-color: #e8f4f8;
-        }
-        .highlight {
-            background-color: #fff3cd;
-            padding: 15px;
-            border-left: 4px solid #ffc107;
-            margin: 20px 0;
-        }
-        .summary-box {
-            background-color: #d4edda;
-            padding: 20px;
-            border-left: 4px solid #28a745;
-            margin: 20px 0;
-            border-radius: 4px;
-        }
-        .warning-box {
-            background-color: #f8d7da;
-            padding: 15px;
-            border-left: 4px solid #dc3545;
-            margin: 20px 0;
-            border-radius: 4px;
-        }
-        .code-block {
-            background-color: #f8f9fa;
-            border: 1px solid #e9ecef;
-            border-radius: 4px;
-            padding: 15px;
-            font-family: 'Courier New', monospace;
-            margin: 15px 0;
-            overflow-x: auto;
-        }
-        .footer {
-            margin-top: 40px;
-            padding-top: 20px;
-            border-top: 1px solid #ecf0f1;
-            text-align: center;
-            color: #7f8c8d;
-            font-size: 0.9em;
-        }
-        /* Professional Report Header */
-        .report-header {
-            position: fixed;
-            top: 0;
-            left: 0;
-            right: 0;
-            z-index: 1000;
-            background: rgba(255, 255, 255, 0.95);
-            backdrop-filter: blur(20px);
-            border-bottom: 1px solid rgba(0, 0, 0, 0.1);
-            padding: 1rem 0;
-        }
-        .header-content {
-            max-width: 1200px;
-            margin: 0 auto;
-            padding: 0 2rem;
-            display: flex;
-            align-items: center;
-            justify-content: space-between;
-        }
-        .header-brand {
-            display: flex;
-            align-items: center;
-            gap: 0.75rem;
-            font-weight: 700;
-            font-size: 1.25rem;
-            color: #1f2937;
-        }
-        .header-brand .brand-icon {
-            font-size: 1.5rem;
-            background: linear-gradient(135deg, #2563eb, #7c3aed);
-            -webkit-background-clip: text;
-            -webkit-text-fill-color: transparent;
-            background-clip: text;
-        }
-        .header-actions {
-            display: flex;
-            gap: 0.75rem;
-        }
-        .action-btn {
-            display: flex;
-            align-items: center;
-            gap: 0.5rem;
-            background: linear-gradient(135deg, #2563eb, #1d4ed8);
-            color: white;
-            border: none;
-            padding: 0.75rem 1.5rem;
-            border-radius: 0.75rem;
-            cursor: pointer;
-            font-size: 0.875rem;
-            font-weight: 600;
-            font-family: 'Inter', sans-serif;
-            box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1);
-            transition: all 0.3s ease;
-        }
-        .action-btn:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 10px 15px -3px rgba(0, 0, 0, 0.1);
-        }
-        .action-btn:active {
-            transform: translateY(0);
-        }
-        .action-btn.print {
-            background: linear-gradient(135deg, #10b981, #059669);
-        }
-        .action-btn.pdf {
-            background: linear-gradient(135deg, #ef4444, #dc2626);
-        }
-        
-        /* Hide download button on mobile devices */
-        @media (max-width: 768px) {
-            .action-btn.pdf {
-                display: none !important;
-            }
-        }
-        .action-btn.save {
-            background: linear-gradient(135deg, #8b5cf6, #7c3aed);
-        }
-        .action-btn.home {
-            background: linear-gradient(135deg, #f59e0b, #d97706);
-        }
-        .btn-icon {
-            font-size: 1rem;
-        }
-        .btn-text {
-            font-size: 0.875rem;
-        }
-        
-        /* Report Title Section */
-        .report-title-section {
-            text-align: center;
-            margin-bottom: 2rem;
-            padding-top: 6rem;
-        }
-        .title-underline {
-            width: 100px;
-            height: 4px;
-            background: linear-gradient(90deg, #2563eb, #7c3aed);
-            margin: 1rem auto 0;
-            border-radius: 2px;
-        }
-        
-        /* Enhanced Summary Box */
-        .summary-box {
-            background: linear-gradient(135deg, #f0f9ff, #e0f2fe);
-            border: 1px solid #bae6fd;
-            border-radius: 1rem;
-            padding: 1.5rem;
-            margin: 2rem 0;
-            box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1);
-        }
-        .summary-header {
-            display: flex;
-            align-items: center;
-            gap: 0.75rem;
-            margin-bottom: 1rem;
-            font-weight: 600;
-            color: #0369a1;
-            font-size: 1.125rem;
-        }
-        .summary-icon {
-            font-size: 1.25rem;
-        }
-        .summary-content {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
-            gap: 1rem;
-        }
-        .summary-item {
-            display: flex;
-            flex-direction: column;
-            gap: 0.25rem;
-        }
-        .item-label {
-            font-size: 0.875rem;
-            font-weight: 500;
-            color: #64748b;
-            text-transform: uppercase;
-            letter-spacing: 0.05em;
-        }
-        .item-value {
-            font-size: 1rem;
-            font-weight: 600;
-            color: #1e293b;
-        }
-                 @media print {
-             body { 
-                 background-color: white !important; 
-                 color: black !important;
-                 font-size: 12pt;
-                 line-height: 1.4;
-                 margin: 0 !important;
-                 padding: 0 !important;
-                 width: 100% !important;
-             }
-             .container { 
-                 box-shadow: none !important; 
-                 background: white !important;
-                 padding: 20px !important;
-                 margin: 0 !important;
-                 width: 100% !important;
-                 min-width: 100% !important;
-                 max-width: none !important;
-                 box-sizing: border-box !important;
-                 height: auto !important;
-                 min-height: 100vh !important;
-             }
-             .report-header { display: none !important; }
-             .action-buttons { display: none !important; }
-             h1, h2, h3, h4 { 
-                 color: black !important; 
-                 page-break-after: avoid;
-                 page-break-inside: avoid;
-             }
-             table { 
-                 page-break-inside: avoid; 
-                 border-collapse: collapse !important;
-             }
-             .summary-box, .highlight, .warning-box {
-                 background: #f8f9fa !important;
-                 border: 1px solid #ddd !important;
-                 color: black !important;
-                 page-break-inside: avoid;
-             }
-             p, li {
-                 page-break-inside: avoid;
-                 orphans: 3;
-                 widows: 3;
-             }
-             .footer {
-                 page-break-inside: avoid;
-             }
-             .report-logos {
-                 page-break-inside: avoid;
-                 margin: 15px 0 !important;
-                 padding: 10px !important;
-                 background: #f8f9fa !important;
-                 border: 1px solid #dee2e6 !important;
-             }
-             .report-logos img {
-                 height: 35px !important;
-                 opacity: 0.9 !important;
-             }
-         }
-        /* ===== MOBILE RESPONSIVE DESIGN ===== */
-        @media (max-width: 1200px) {
-            .header-content {
-                padding: 0 1.5rem;
-            }
-            .container {
-                padding: 30px;
-            }
-        }
-        
-        @media (max-width: 768px) {
-            /* Mobile Header */
-            .report-header {
-                padding: 0.75rem 0;
-            }
-            .header-content {
-                padding: 0 1rem;
-                flex-direction: column;
-                gap: 0.75rem;
-                align-items: center;
-            }
-            .header-brand {
-                font-size: 1.125rem;
-            }
-            .header-actions {
-                width: 100%;
-                justify-content: center;
-                gap: 0.5rem;
-                flex-wrap: wrap;
-            }
-            .action-btn {
-                padding: 0.5rem 0.75rem;
-                font-size: 0.75rem;
-                flex: 1;
-                max-width: 120px;
-                display: flex;
-                align-items: center;
-                gap: 0.375rem;
-            }
-            .btn-text {
-                font-size: 0.8125rem;
-                display: inline !important;
-            }
-            
-            /* Mobile Container */
-            .container {
-                padding: 20px 15px;
-                margin-top: 120px; /* Account for taller mobile header */
-            }
-            
-            /* Mobile Typography */
-            h1 {
-                font-size: 1.75rem;
-                margin-bottom: 20px;
-            }
-            h2 {
-                font-size: 1.375rem;
-                margin-top: 25px;
-                margin-bottom: 15px;
-            }
-            h3 {
-                font-size: 1.125rem;
-                margin-top: 20px;
-                margin-bottom: 12px;
-            }
-            h4 {
-                font-size: 1rem;
-                margin-top: 15px;
-                margin-bottom: 8px;
-            }
-            p {
-                font-size: 0.9375rem;
-                line-height: 1.6;
-                margin-bottom: 12px;
-            }
-            
-            /* Mobile Tables */
-            table {
-                font-size: 0.875rem;
-                margin: 15px 0;
-                display: block;
-                overflow-x: auto;
-                white-space: nowrap;
-                -webkit-overflow-scrolling: touch;
-            }
-            th, td {
-                padding: 8px 6px;
-                min-width: 80px;
-            }
-            th {
-                font-size: 0.8125rem;
-            }
-            
-            /* Mobile Lists */
-            ul, ol {
-                padding-left: 20px;
-                margin-bottom: 12px;
-            }
-            li {
-                font-size: 0.9375rem;
-                margin-bottom: 6px;
-                line-height: 1.5;
-            }
-            
-            /* Mobile Boxes */
-            .summary-box, .highlight, .warning-box {
-                padding: 15px;
-                margin: 15px 0;
-                border-radius: 8px;
-            }
-            .summary-content {
-                grid-template-columns: 1fr;
-                gap: 0.75rem;
-            }
-            .summary-item {
-                padding: 8px 0;
-            }
-            .item-label {
-                font-size: 0.8125rem;
-            }
-            .item-value {
-                font-size: 0.9375rem;
-            }
-            
-            /* Mobile Code Blocks */
-            .code-block {
-                padding: 12px;
-                font-size: 0.8125rem;
-                margin: 12px 0;
-                border-radius: 6px;
-            }
-            
-            /* Mobile Footer */
-            .footer {
-                margin-top: 30px;
-                padding-top: 15px;
-                font-size: 0.8125rem;
-            }
-        }
-        
-        @media (max-width: 480px) {
-            /* Extra Small Mobile */
-            .container {
-                padding: 15px 10px;
-                margin-top: 140px;
-            }
-            
-            .header-content {
-                padding: 0 0.75rem;
-            }
-            .header-brand {
-                font-size: 1rem;
-            }
-            .action-btn {
-                padding: 0.375rem 0.5rem;
-                font-size: 0.6875rem;
-                max-width: 100px;
-                display: flex;
-                align-items: center;
-                gap: 0.25rem;
-            }
-            .btn-text {
-                font-size: 0.75rem;
-                display: inline !important;
-            }
-            
-            h1 {
-                font-size: 1.5rem;
-            }
-            h2 {
-                font-size: 1.25rem;
-            }
-            h3 {
-                font-size: 1.0625rem;
-            }
-            
-            table {
-                font-size: 0.8125rem;
-            }
-            th, td {
-                padding: 6px 4px;
-                min-width: 70px;
-            }
-            
-            .summary-box, .highlight, .warning-box {
-                padding: 12px;
-                margin: 12px 0;
-            }
-            
-            .code-block {
-                padding: 10px;
-                font-size: 0.75rem;
-            }
-        }
-        
-        /* Mobile Print Optimizations */
-        @media print and (max-width: 768px) {
-            .container {
-                padding: 15px !important;
-                margin: 0 !important;
-                width: 100% !important;
-            }
-            h1, h2, h3, h4 {
-                page-break-after: avoid;
-                font-size: 1.2em;
-            }
-            table {
-                font-size: 0.8em;
-                page-break-inside: avoid;
-            }
-            .summary-box, .highlight, .warning-box {
-                page-break-inside: avoid;
-                margin: 10px 0;
-            }
-        }
-        @media screen {
-            body {
-                margin: 0;
-                padding: 0;
-            }
-        }
-        
-        /* Saved Reports Section Styles */
-        .saved-reports-section {
-            padding: 2rem 0;
-            background: linear-gradient(135deg, #f8fafc 0%, #e2e8f0 100%);
-            min-height: 400px;
-        }
-        
-        .saved-reports-card {
-            background: white;
-            border-radius: 1rem;
-            box-shadow: 0 10px 25px rgba(0, 0, 0, 0.1);
-            padding: 2rem;
-            margin: 0 auto;
-            max-width: 1200px;
-        }
-        
-        .saved-reports-header {
-            text-align: center;
-            margin-bottom: 2rem;
-        }
-        
-        .saved-reports-title {
-            font-size: 1.75rem;
-            font-weight: 700;
-            color: #1e293b;
-            margin-bottom: 0.5rem;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            gap: 0.5rem;
-        }
-        
-        .title-icon {
-            font-size: 1.5rem;
-        }
-        
-        .saved-reports-subtitle {
-            color: #64748b;
-            font-size: 1rem;
-            margin: 0;
-        }
-        
-        .saved-reports-list {
-            display: grid;
-            grid-template-columns: repeat(auto-fill, minmax(350px, 1fr));
-            gap: 1.5rem;
-            margin-bottom: 2rem;
-        }
-        
-        .saved-report-item {
-            background: linear-gradient(135deg, #ffffff 0%, #f8fafc 100%);
-            border: 1px solid #e2e8f0;
-            border-radius: 0.75rem;
-            padding: 1.5rem;
-            transition: all 0.3s ease;
-            cursor: pointer;
-            position: relative;
-            overflow: hidden;
-        }
-        
-        .saved-report-item:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 8px 25px rgba(0, 0, 0, 0.15);
-            border-color: #3b82f6;
-        }
-        
-        .saved-report-item::before {
-            content: '';
-            position: absolute;
-            top: 0;
-            left: 0;
-            right: 0;
-            height: 3px;
-            background: linear-gradient(90deg, #3b82f6, #8b5cf6);
-        }
-        
-        .report-item-header {
-            display: flex;
-            justify-content: space-between;
-            align-items: flex-start;
-            margin-bottom: 1rem;
-        }
-        
-        .report-item-title {
-            font-size: 1.125rem;
-            font-weight: 600;
-            color: #1e293b;
-            margin: 0;
-            line-height: 1.4;
-        }
-        
-        .report-item-date {
-            font-size: 0.875rem;
-            color: #64748b;
-            white-space: nowrap;
-        }
-        
-        .report-item-details {
-            margin-bottom: 1rem;
-        }
-        
-        .report-detail-row {
-            display: flex;
-            align-items: center;
-            margin-bottom: 0.5rem;
-            font-size: 0.875rem;
-        }
-        
-        .report-detail-label {
-            font-weight: 500;
-            color: #475569;
-            min-width: 80px;
-            margin-right: 0.5rem;
-        }
-        
-        .report-detail-value {
-            color: #1e293b;
-            flex: 1;
-        }
-        
-        .report-item-actions {
-            display: flex;
-            gap: 0.5rem;
-            margin-top: 1rem;
-        }
-        
-        .report-action-btn {
-            flex: 1;
-            padding: 0.5rem 1rem;
-            border: none;
-            border-radius: 0.5rem;
-            font-size: 0.875rem;
-            font-weight: 500;
-            cursor: pointer;
-            transition: all 0.2s ease;
-            text-decoration: none;
-            text-align: center;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            gap: 0.375rem;
-        }
-        
-        .report-action-btn.primary {
-            background: linear-gradient(135deg, #3b82f6, #1d4ed8);
-            color: white;
-        }
-        
-        .report-action-btn.primary:hover {
-            background: linear-gradient(135deg, #2563eb, #1e40af);
-            transform: translateY(-1px);
-        }
-        
-        .report-action-btn.secondary {
-            background: #f1f5f9;
-            color: #475569;
-            border: 1px solid #e2e8f0;
-        }
-        
-        .report-action-btn.secondary:hover {
-            background: #e2e8f0;
-            border-color: #cbd5e1;
-        }
-        
-        .no-reports-message {
-            text-align: center;
-            padding: 3rem 2rem;
-            color: #64748b;
-        }
-        
-        .no-reports-icon {
-            font-size: 3rem;
-            margin-bottom: 1rem;
-        }
-        
-        .no-reports-message h3 {
-            font-size: 1.25rem;
-            font-weight: 600;
-            color: #475569;
-            margin-bottom: 0.5rem;
-        }
-        
-        .no-reports-message p {
-            font-size: 1rem;
-            margin: 0;
-        }
-        
-        .saved-reports-toggle {
-            background: none;
-            border: none;
-            color: inherit;
-            font-size: inherit;
-            cursor: pointer;
-            display: flex;
-            align-items: center;
-            gap: 0.5rem;
-            padding: 0.5rem 1rem;
-            border-radius: 0.5rem;
-            transition: all 0.2s ease;
-        }
-        
-        .saved-reports-toggle:hover {
-            background: rgba(59, 130, 246, 0.1);
-            color: #3b82f6;
-        }
-        
-        .saved-reports-toggle.active {
-            background: rgba(59, 130, 246, 0.15);
-            color: #3b82f6;
-        }
-        
-        .nav-icon {
-            font-size: 1rem;
-        }
-        
-        /* Mobile Responsive for Saved Reports */
-        @media (max-width: 768px) {
-            .saved-reports-list {
-                grid-template-columns: 1fr;
-                gap: 1rem;
-            }
-            
-            .saved-report-item {
-                padding: 1rem;
-            }
-            
-            .report-item-header {
-                flex-direction: column;
-                align-items: flex-start;
-                gap: 0.5rem;
-            }
-            
-            .report-item-actions {
-                flex-direction: column;
-            }
-            
-            .saved-reports-card {
-                padding: 1.5rem;
-                margin: 0 1rem;
-            }
-            
-        .saved-reports-title {
-            font-size: 1.5rem;
-        }
-    }
-    
-    /* Loading and Error States */
-    .loading-reports {
-        text-align: center;
-        padding: 2rem;
-        color: #64748b;
-        font-size: 1rem;
-    }
+    # Identical requests already in flight (same team, frontend retries) share one LLM call
+    return await report_single_flight.do(cache_key, generate)
+
+def empty_report_text(brand: str, product: str, budget: str, enterprise_size: str) -> str:
+    """Placeholder report used when the model returned no content"""
+    # Handle multiple products in empty report message
+    products = [p.strip() for p in product.split(',') if p.strip()]
+    if len(products) > 1:
+        product_list = "\n".join([f"- {p}" for p in products])
+        product_section = f"## Products/Services:\n{product_list}"
+    else:
+        product_section = f"## Product: {product}"
     
-        .error-message {
-        text-align: center;
-        padding: 2rem;
-        color: #dc2626;
-        font-size: 1rem;
-        }
-
-        /* Custom styles for Bootstrap modal enhancements */
-        .modal-header {
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-        }
-
-        .modal-header .btn-close {
-            filter: invert(1);
-        }
-
-        .sortable {
-            cursor: pointer;
-            user-select: none;
-        }
-
-        .sortable:hover {
-            background-color: rgba(255, 255, 255, 0.1);
-        }
-
-        .sort-indicator {
-            margin-left: 8px;
-            opacity: 0.5;
-            transition: all 0.2s ease;
-        }
-
-        .sortable.asc .sort-indicator {
-            opacity: 1;
-            transform: rotate(180deg);
-        }
-
-        .sortable.desc .sort-indicator {
-            opacity: 1;
-        }
-
-        /* Custom Navbar Styles */
-        .navbar {
-            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-            padding: 0.75rem 0;
-        }
-
-        .navbar-brand {
-            font-size: 1.5rem;
-            color: #333 !important;
-        }
-
-        .navbar-brand .brand-logo-img {
-            border-radius: 8px;
-            box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-        }
-
-        .navbar-nav .btn {
-            border-radius: 8px;
-            font-weight: 500;
-            transition: all 0.2s ease;
-            padding: 0.5rem 1rem;
-        }
-
-        .navbar-nav .btn:hover {
-            transform: translateY(-1px);
-            box-shadow: 0 4px 8px rgba(0,0,0,0.15);
-        }
+    return f"""# AI Trade Report - {brand}
 
-        .navbar-nav .btn-outline-primary:hover {
-            background-color: #0d6efd;
-            border-color: #0d6efd;
-        }
-
-        .navbar-nav .btn-outline-secondary:hover {
-            background-color: #6c757d;
-            border-color: #6c757d;
-        }
-
-        .navbar-nav .btn-outline-danger:hover {
-            background-color: #dc3545;
-            border-color: #dc3545;
-        }
+**Error:** Unable to generate report content. Please try again.
 
-        /* Responsive navbar */
-        @media (max-width: 768px) {
-            .navbar-brand {
-                font-size: 1.25rem;
-            }
-            
-            .navbar-nav .btn {
-                margin-bottom: 0.5rem;
-                width: 100%;
-            }
-            
-            .navbar-nav {
-                margin-top: 1rem;
-            }
-        }
+{product_section}
+## Brand: {brand}
+## Enterprise Size: {enterprise_size}
+## Budget: {budget if budget else 'Not specified'}
 
-        /* Scrollable Table Styles */
-        .table-responsive {
-            border-radius: 8px;
-            border: 1px solid #dee2e6;
-        }
+## Troubleshooting
 
-        .table-responsive::-webkit-scrollbar {
-            width: 8px;
-            height: 8px;
-        }
+If you continue to experience issues, please:
+1. Check your internet connection
+2. Verify your OpenAI API key is valid
+3. Try again in a few minutes
+4. Contact support if the problem persists
 
-        .table-responsive::-webkit-scrollbar-track {
-            background: #f1f1f1;
-            border-radius: 4px;
-        }
+---
+*Report generated on {datetime.now().strftime('%d %B %Y')}*"""
 
-        .table-responsive::-webkit-scrollbar-thumb {
-            background: #c1c1c1;
-            border-radius: 4px;
-        }
+def report_redirect_url(actual_filename: str, form_data: dict) -> str:
+    """Build the report URL, including form data for the report page's save button"""
+    form_data_params = f"?brand={form_data['brand']}&product={form_data['product']}&budget={form_data['budget']}&enterprise_size={form_data['enterprise_size']}"
+    return f"/report/{actual_filename}{form_data_params}"
 
-        .table-responsive::-webkit-scrollbar-thumb:hover {
-            background: #a8a8a8;
-        }
+def save_report_record(db: Session, user_id: int, form_data: dict, ai_model: str, language: str, actual_filename: str):
+    """Store the generated report's metadata; failures are logged, not raised"""
+    try:
+        print(f"DEBUG: Saving report to database with form data:")
+        print(f"  Brand: '{form_data['brand']}'")
+        print(f"  Product: '{form_data['product']}'")
+        print(f"  Budget: '{form_data['budget']}'")
+        print(f"  Enterprise Size: '{form_data['enterprise_size']}'")
+        
+        report_record = Report(
+            user_id=user_id,
+            title=f"AI Trade Report - {form_data['brand']}",
+            brand=form_data['brand'],
+            product=form_data['product'],
+            budget=form_data['budget'],
+            enterprise_size=form_data['enterprise_size'],
+            ai_model=ai_model,
+            language=language,
+            content="",  # The text lives in reports/*.txt; pages are rendered from it on view
+            file_path=actual_filename,
+            is_saved=False  # Not saved by user yet
+        )
+        db.add(report_record)
+        db.commit()
+        db.refresh(report_record)
+        print(f"DEBUG: Report saved successfully with ID: {report_record.id}")
+    except Exception as e:
+        print(f"Warning: Could not save report metadata to database: {e}")
 
-        .sticky-top {
-            position: sticky;
-            top: 0;
-            z-index: 10;
-        }
+def store_report_record(user_id: int, form_data: dict, ai_model: str, language: str, actual_filename: str):
+    """save_report_record with its own session, for executor threads and background jobs: sessions are not shared across threads"""
+    db = SessionLocal()
+    try:
+        save_report_record(db, user_id, form_data, ai_model, language, actual_filename)
+    finally:
+        db.close()
+
+def write_report_files(filename: str, report_text: str, language: str = "en", form_data: dict = None):
+    """Write reports/{filename}.txt and its metadata sidecar"""
+    with open(f"reports/{filename}.txt", "w", encoding="utf-8") as f:
+        f.write(report_text)
+    write_report_metadata(filename, language, form_data)
+
+def discard_report_output(filename: str):
+    """Remove the files and report row a cancelled job wrote for reports/{filename}"""
+    for path in [f"reports/{filename}.txt", f"reports/{filename}.json"] + [f"reports/{filename}.txt{suffix}" for suffix in ENCODING_SUFFIXES.values()]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    db = SessionLocal()
+    try:
+        db.query(Report).filter(Report.file_path == f"{filename}.html").delete()
+        db.commit()
+    finally:
+        db.close()
 
-        .table th {
-            white-space: nowrap;
-            font-weight: 600;
-        }
+def write_report_metadata(filename: str, language: str = "en", form_data: dict = None) -> str:
+    """Write the sidecar next to reports/{filename}.txt that its HTML page is rendered from.
 
-        .table td {
-            vertical-align: middle;
-        }
-    </style>
-</head>
-<body>
-    <!-- Professional Report Header -->
-    <header class="report-header">
-        <div class="header-content">
-            <div class="header-brand">
-                <img src="/static/logo_trade_on_chain.png" alt="AI Trade Report" class="brand-logo" style="height: 32px; width: auto; margin-right: 12px;">
-                <img src="/static/logo2.png" alt="AI Trade Report" class="brand-logo" style="height: 32px; width: auto; margin-right: 12px;">
-                <span class="brand-text">AI Trade Report</span>
-            </div>
-            <div class="header-actions">
-                <button class="action-btn save" onclick="saveReport()">
-                    <span class="btn-icon">💾</span>
-                    <span class="btn-text">""" + t['save'] + """</span>
-                </button>
-                <button class="action-btn home" onclick="returnToMain()">
-                    <span class="btn-icon">🏠</span>
-                    <span class="btn-text">""" + t['return_home'] + """</span>
-                </button>
-                <button class="action-btn print" onclick="window.print()">
-                    <span class="btn-icon">🖨️</span>
-                    <span class="btn-text">""" + t['print'] + """</span>
-                </button>
-                <button class="action-btn pdf" onclick="downloadPDF()">
-                    <span class="btn-icon">📄</span>
-                    <span class="btn-text">""" + t['download_pdf'] + """</span>
-                </button>
-            </div>
-        </div>
-    </header>
-    
-    <div class="container" id="report-content">
-        <div class="report-title-section">
-            <h1>""" + t['report_title'] + """</h1>
-            <div class="title-underline"></div>
-        </div>
-        <div class="summary-box">
-            <div class="summary-header">
-                <span class="summary-icon">📋</span>
-                <span class="summary-title">""" + t['report_overview'] + """</span>
-            </div>
-            <div class="report-logos" style="text-align: center; margin: 20px 0; padding: 15px; background: linear-gradient(135deg, #f8fafc 0%, #e2e8f0 100%); border-radius: 8px; border: 1px solid #e2e8f0;">
-                <div style="display: flex; justify-content: center; align-items: center; gap: 20px; flex-wrap: wrap;">
-                    <img src="/static/logo2.png" alt="AI Trade Report" style="height: 40px; width: auto; border-radius: 9px; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">
-                </div>
-                <div style="margin-top: 10px; font-size: 0.9em; color: #64748b; font-weight: 500;">
-                    Professional Market Analysis • Powered by AI Technology
-                </div>
-            </div>
-            <div class="summary-content">
-                <div class="summary-item">
-                    <span class="item-label">""" + t['generated_by'] + """</span>
-                    <span class="item-value">""" + t['ai_powered'] + """</span>
-                </div>
-                <div class="summary-item">
-                    <span class="item-label">""" + t['date'] + """</span>
-                    <span class="item-value">""" + datetime.now().strftime('%d %B %Y') + """</span>
-                </div>
-                <div class="summary-item">
-                    <span class="item-label">""" + t['report_type'] + """</span>
-                    <span class="item-value">""" + t['comprehensive_analysis'] + """</span>
-                </div>"""
-    
-    # Add form data if available
-    if form_data:
-        print(f"DEBUG: Adding form data to HTML: {form_data}")
-        html += """
-                <div class="summary-item">
-                    <span class="item-label">Brand Name</span>
-                    <span class="item-value">""" + form_data.get('brand', 'N/A') + """</span>
-                </div>
-                <div class="summary-item">
-                    <span class="item-label">Product/Service</span>
-                    <span class="item-value">""" + form_data.get('product', 'N/A') + """</span>
-                </div>
-                <div class="summary-item">
-                    <span class="item-label">Investment Budget</span>
-                    <span class="item-value">""" + form_data.get('budget', 'N/A') + """</span>
-                </div>
-                <div class="summary-item">
-                    <span class="item-label">Enterprise Size</span>
-                    <span class="item-value">""" + form_data.get('enterprise_size', 'N/A') + """</span>
-                </div>"""
-        
-        # Add other information if provided
-        if form_data.get('other_info') and form_data.get('other_info').strip():
-            html += """
-                <div class="summary-item">
-                    <span class="item-label">Other Information</span>
-                    <span class="item-value">""" + form_data.get('other_info', 'N/A') + """</span>
-                </div>"""
-        
-        # Add hidden form data for JavaScript to extract
-        html += f"""
-        <script>
-        // Store form data for save function
-        window.formData = {{
-            brand: '{form_data.get('brand', '')}',
-            product: '{form_data.get('product', '')}',
-            budget: '{form_data.get('budget', '')}',
-            enterprise_size: '{form_data.get('enterprise_size', '')}',
-            other_info: '{form_data.get('other_info', '')}'
-        }};
-        console.log('Form data stored:', window.formData);
-        </script>"""
-    else:
-        print("DEBUG: No form data provided to HTML generation")
+    Also stores the compressed copies of the finished .txt that /download serves.
+    """
+    meta_path = f"reports/{filename}.json"
+    write_compressed_variants(f"reports/{filename}.txt")
     
-    html += """
-            </div>
-        </div>
-"""
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            "language": language,
+            "form_data": form_data,
+            "report_date": datetime.now().strftime('%d %B %Y'),
+        }, f)
     
-    # Process content line by line
-    lines = content.split('\n')
-    in_table = False
-    in_list = False
-    list_type = 'ul'
+    return meta_path
+
+def load_report_source(filename: str) -> Optional[dict]:
+    """Markdown and page inputs for reports/<name>.html, or None if there is nothing to render.
+
+    Reports are stored as .txt plus a .json sidecar and rendered on demand, so
+    renderer changes reach old reports too. Reports from before that keep
+    their pre-rendered .html file when their .txt has no sidecar; with
+    neither, the text stored on the report's database row is used.
+    """
+    stem = filename[:-len('.html')]
+    txt_path = os.path.join("reports", f"{stem}.txt")
+    meta_path = os.path.join("reports", f"{stem}.json")
     
-    for line in lines:
-        line = line.strip()
-        
-        if not line:
-            if in_table:
-                # End table
-                html += "        </table>\n"
-                in_table = False
-            elif in_list:
-                # End list
-                html += f"        </{list_type}>\n"
-                in_list = False
-            else:
-                html += "        <br>\n"
-            continue
-        
-        # Handle different line types
-        if line.startswith('# '):
-            # Main title
-            title = escape_html(line[2:])
-            html += f"        <h1>{title}</h1>\n"
-        elif line.startswith('## '):
-            # Section heading
-            title = escape_html(line[3:])
-            html += f"        <h2>{title}</h2>\n"
-        elif line.startswith('### '):
-            # Subsection heading
-            title = escape_html(line[4:])
-            html += f"        <h3>{title}</h3>\n"
-        elif line.startswith('#### '):
-            # Sub-subsection heading
-            title = escape_html(line[5:])
-            html += f"        <h4>{title}</h4>\n"
-        elif line.startswith('|') and '|' in line[1:]:
-            # Table row
-            if not in_table:
-                # Start table
-                html += "        <table>\n"
-                in_table = True
-            
-            # Process table row
-            cells = [cell.strip() for cell in line.split('|')[1:-1]]
-            escaped_cells = [escape_html(cell) for cell in cells]
-            
-            # Check if this is a header row (contains dashes or is the first row)
-            if any('---' in cell or '--' in cell for cell in cells) or not any('---' in prev_line for prev_line in lines if '|' in prev_line):
-                html += "            <tr>\n"
-                for cell in escaped_cells:
-                    html += f"                <th>{cell}</th>\n"
-                html += "            </tr>\n"
-            else:
-                html += "            <tr>\n"
-                for cell in escaped_cells:
-                    html += f"                <td>{cell}</td>\n"
-                html += "            </tr>\n"
-        elif line.startswith('- ') or line.startswith('* '):
-            # Bullet point
-            if not in_list:
-                html += "        <ul>\n"
-                in_list = True
-                list_type = 'ul'
-            text = escape_html(line[2:])
-            html += f"            <li>{text}</li>\n"
-        elif line.startswith('1. ') or line.startswith('2. ') or line.startswith('3. ') or line.startswith('4. ') or line.startswith('5. '):
-            # Numbered list
-            if not in_list:
-                html += "        <ol>\n"
-                in_list = True
-                list_type = 'ol'
-            text = escape_html(line[3:])
-            html += f"            <li>{text}</li>\n"
-        elif line.startswith('**') and line.endswith('**'):
-            # Bold text
-            text = escape_html(line[2:-2])
-            html += f"        <p><strong>{text}</strong></p>\n"
-        elif line.startswith('```'):
-            # Code block
-            if line == '```':
-                html += "        <div class=\"code-block\">\n"
-            else:
-                html += f"        <div class=\"code-block\">\n            {escape_html(line[3:])}\n"
-        elif line.endswith('```'):
-            # End code block
-            html += "        </div>\n"
-        elif line.startswith('> '):
-            # Quote/note
-            text = escape_html(line[2:])
-            html += f"        <div class=\"highlight\">{text}</div>\n"
-        else:
-            # Regular paragraph
-            if line:
-                text = escape_html(line)
-                html += f"        <p>{text}</p>\n"
-    
-    # Close any open tags
-    if in_table:
-        html += "        </table>\n"
-    if in_list:
-        html += f"        </{list_type}>\n"
-    
-    # Add Other Information section if provided and not already in content
-    if form_data and form_data.get('other_info') and form_data.get('other_info').strip():
-        other_info_content = form_data.get('other_info', '').strip()
-        # Check if Other Information section already exists in content
-        content_lower = content.lower()
-        if not any(keyword in content_lower for keyword in ['other information', 'additional client requirements', 'altre informazioni', 'requisiti aggiuntivi']):
-            # Add fallback Other Information section
-            if language == "it":
-                html += f"""
-        <h2>Altre Informazioni</h2>
-        <p>Il cliente ha fornito le seguenti informazioni aggiuntive che devono essere considerate nell'analisi:</p>
-        <div style="background: #f8f9fa; padding: 15px; border-left: 4px solid #007bff; margin: 15px 0;">
-            <p style="margin: 0; font-style: italic;">"{other_info_content}"</p>
-        </div>
-        <p>Queste informazioni dovrebbero essere integrate nell'analisi di mercato e nelle raccomandazioni strategiche.</p>
-"""
-            else:
-                html += f"""
-        <h2>Other Information</h2>
-        <p>The client has provided the following additional information that should be considered in the analysis:</p>
-        <div style="background: #f8f9fa; padding: 15px; border-left: 4px solid #007bff; margin: 15px 0;">
-            <p style="margin: 0; font-style: italic;">"{other_info_content}"</p>
-        </div>
-        <p>This information should be integrated into the market analysis and strategic recommendations.</p>
-"""
-    
-    # End HTML document
-    html += """        <div class="footer">
-            <div style="margin-bottom: 20px;">
-                <div style="display: flex; justify-content: center; align-items: center; gap: 15px; margin-bottom: 15px;">
-                    <img src="/static/logo_trade_on_chain.png" alt="TradeOnChain" style="height: 30px; width: auto; opacity: 0.8; border-radius: 9px;">
-                    <span style="font-size: 1.1em; color: #1e293b; font-weight: 600;">TradeOnChain</span>
-                </div>
-                <div style="font-size: 0.85em; color: #94a3b8; font-weight: 500; margin-bottom: 10px;">
-                    AI Trade Report • Professional Market Analysis
-                </div>
-            </div>
-            <p>""" + t['footer_text1'] + """</p>
-            <p>""" + t['footer_text2'] + """</p>
-        </div>
-    </div>
+    content = None
+    meta = None
+    if os.path.exists(meta_path):
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(txt_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not read report {stem}: {e}")
+            content = None
     
-    <script>
-        // Define the function immediately when script loads
-        function downloadPDF() {
-            const element = document.getElementById('report-content');
-            
-            // Show loading state
-            const btn = event.target;
-            const originalText = btn.innerHTML;
-            btn.innerHTML = '⏳ Generating PDF...';
-            btn.disabled = true;
-           
-           // Wait for fonts and images to load
-           setTimeout(function() {
-               // First, ensure the element is visible and has content
-               if (!element || element.offsetHeight === 0 || element.offsetWidth === 0) {
-                   alert('Report content not found. Please refresh the page and try again.');
-                   btn.innerHTML = originalText;
-                   btn.disabled = false;
-                   return;
-               }
-               
-               // Ensure the element is visible and has content
-               const rect = element.getBoundingClientRect();
-               if (rect.width === 0 || rect.height === 0) {
-                   alert('Report content is not visible. Please scroll to the report and try again.');
-                   btn.innerHTML = originalText;
-                   btn.disabled = false;
-                   return;
-               }
-               
-               // Force a reflow to ensure content is rendered
-               element.style.display = 'none';
-               element.offsetHeight; // Trigger reflow
-               element.style.display = 'block';
-               
-               // Ensure all content is visible and expanded
-               element.style.height = 'auto';
-               element.style.minHeight = '100vh';
-               element.style.overflow = 'visible';
-               
-               // Wait a bit more for any dynamic content to render
-               setTimeout(function() {
-               
-               const opt = {
-                   margin: [0.5, 0.5, 0.5, 0.5],
-                   filename: 'AI_Trade_Report.pdf',
-                   image: { type: 'jpeg', quality: 0.98 },
-                   html2canvas: { 
-                       scale: 1.2,
-                       useCORS: true,
-                       allowTaint: true,
-                       backgroundColor: '#ffffff',
-                       logging: false,
-                       letterRendering: true,
-                       width: element.scrollWidth,
-                       height: element.scrollHeight,
-                       scrollX: 0,
-                       scrollY: 0,
-                       windowWidth: element.scrollWidth,
-                       windowHeight: element.scrollHeight
-                   },
-                   jsPDF: { 
-                       unit: 'in', 
-                       format: 'a4', 
-                       orientation: 'portrait',
-                       compress: true
-                   },
-                   pagebreak: { mode: ['css', 'legacy'] }
-               };
-              
-              // Debug: Log element dimensions
-              console.log('Element dimensions:', {
-                  width: element.offsetWidth,
-                  height: element.offsetHeight,
-                  scrollWidth: element.scrollWidth,
-                  scrollHeight: element.scrollHeight,
-                  rect: element.getBoundingClientRect()
-              });
-              
-              // Try the main PDF generation
-              html2pdf().set(opt).from(element).save().then(function() {
-                  btn.innerHTML = originalText;
-                  btn.disabled = false;
-              }).catch(function(error) {
-                  console.error('PDF generation failed:', error);
-                  
-                  // Fallback: Try with simpler options
-                  const simpleOpt = {
-                      margin: 0.5,
-                      filename: 'AI_Trade_Report.pdf',
-                      image: { type: 'jpeg', quality: 0.8 },
-                      html2canvas: { 
-                          scale: 1,
-                          backgroundColor: '#ffffff',
-                          width: element.scrollWidth,
-                          height: element.scrollHeight,
-                          useCORS: true,
-                          scrollX: 0,
-                          scrollY: 0
-                      },
-                      jsPDF: { unit: 'in', format: 'a4', orientation: 'portrait' }
-                  };
-                  
-                  html2pdf().set(simpleOpt).from(element).save().then(function() {
-                      btn.innerHTML = originalText;
-                      btn.disabled = false;
-                  }).catch(function(fallbackError) {
-                      console.error('Fallback PDF generation also failed:', fallbackError);
-                      alert('PDF generation failed. Please use the Print button and save as PDF from your browser instead.');
-                      btn.innerHTML = originalText;
-                      btn.disabled = false;
-                  });
-              });
-          }, 500);
-      }, 1000);
-  }
-  
-  // Also make it available on window object
-  window.downloadPDF = downloadPDF;
-  
-  // Save report function
-  // Track if report is saved
-  let isReportSaved = false;
-  
-  function saveReport() {
-      console.log('Save report function called');
-      
-      const btn = event.target.closest('.action-btn');
-      if (!btn) {
-          console.error('Save button not found');
-          return;
-      }
-      
-      // Check if already saved
-      if (isReportSaved) {
-          btn.innerHTML = '✅ Already Saved';
-          btn.style.background = 'linear-gradient(135deg, #10b981, #059669)';
-          btn.disabled = true;
-          
-          setTimeout(() => {
-              btn.innerHTML = '💾 Save';
-              btn.style.background = 'linear-gradient(135deg, #8b5cf6, #7c3aed)';
-              btn.disabled = false;
-          }, 2000);
-          return;
-      }
-      
-      const originalText = btn.innerHTML;
-      
-      // Show loading state
-      btn.innerHTML = '⏳ Saving...';
-      btn.disabled = true;
-      
-      try {
-          // Get report data
-          const reportTitle = document.querySelector('h1')?.textContent || 'AI Trade Report';
-          const reportContent = document.getElementById('report-content')?.innerHTML || '';
-          const currentUrl = window.location.pathname;
-          const filename = currentUrl.split('/').pop() || 'unknown_report.html';
-          
-          console.log('Report data extracted:', {
-              title: reportTitle,
-              filename: filename,
-              contentLength: reportContent.length
-          });
-          
-          // Extract form data from embedded JavaScript variable
-          let brand = 'Unknown Brand';
-          let product = 'Unknown Product';
-          let budget = 'Unknown Budget';
-          let enterpriseSize = 'Unknown Size';
-          
-          // Try to get from embedded form data first
-          if (window.formData) {
-              console.log('Found window.formData:', window.formData);
-              brand = window.formData.brand || 'Unknown Brand';
-              product = window.formData.product || 'Unknown Product';
-              budget = window.formData.budget || 'Unknown Budget';
-              enterpriseSize = window.formData.enterprise_size || 'Unknown Size';
-              console.log('Extracted form data from embedded variable:', { brand, product, budget, enterpriseSize });
-          } else {
-              console.log('No window.formData found, trying URL parameters...');
-              // Fallback to URL parameters
-              const urlParams = new URLSearchParams(window.location.search);
-              console.log('Current URL:', window.location.href);
-              console.log('URL search params:', window.location.search);
-              console.log('URL params object:', Object.fromEntries(urlParams));
-              
-              brand = urlParams.get('brand') || 'Unknown Brand';
-              product = urlParams.get('product') || 'Unknown Product';
-              budget = urlParams.get('budget') || 'Unknown Budget';
-              enterpriseSize = urlParams.get('enterprise_size') || 'Unknown Size';
-              
-              console.log('Extracted form data from URL (fallback):', { brand, product, budget, enterpriseSize });
-          }
-          
-          // Prepare data for API
-          const reportData = {
-              title: reportTitle,
-              brand: brand,
-              product: product,
-              budget: budget,
-              enterprise_size: enterpriseSize,
-              ai_model: 'gpt-5',
-              language: 'en',
-              content: reportContent,
-              file_path: filename
-          };
-          
-          console.log('Sending data to API:', reportData);
-          console.log('Final data being sent:', {
-              title: reportData.title,
-              brand: reportData.brand,
-              product: reportData.product,
-              budget: reportData.budget,
-              enterprise_size: reportData.enterprise_size
-          });
-          
-          // Send to database
-          fetch('/save-report', {
-              method: 'POST',
-              headers: {
-                  'Content-Type': 'application/json',
-              },
-              body: JSON.stringify(reportData)
-          })
-          .then(response => {
-              console.log('API response status:', response.status);
-              if (!response.ok) {
-                  throw new Error(`HTTP error! status: ${response.status}`);
-              }
-              return response.json();
-          })
-          .then(data => {
-              console.log('API response data:', data);
-              if (data.status === 'success') {
-                  isReportSaved = true; // Mark as saved
-                  btn.innerHTML = '✅ Saved!';
-                  btn.style.background = 'linear-gradient(135deg, #10b981, #059669)';
-                  
-                  setTimeout(() => {
-                      btn.innerHTML = '💾 Save';
-                      btn.style.background = 'linear-gradient(135deg, #8b5cf6, #7c3aed)';
-                      btn.disabled = false;
-                  }, 2000);
-              } else {
-                  throw new Error(data.message || 'Failed to save report');
-              }
-          })
-          .catch(error => {
-              console.error('Error saving report:', error);
-              btn.innerHTML = '❌ Error';
-              btn.style.background = 'linear-gradient(135deg, #ef4444, #dc2626)';
-              
-              setTimeout(() => {
-                  btn.innerHTML = originalText;
-                  btn.style.background = 'linear-gradient(135deg, #8b5cf6, #7c3aed)';
-                  btn.disabled = false;
-              }, 3000);
-          });
-      } catch (error) {
-          console.error('Error in saveReport function:', error);
-          btn.innerHTML = '❌ Error';
-          btn.style.background = 'linear-gradient(135deg, #ef4444, #dc2626)';
-          
-          setTimeout(() => {
-              btn.innerHTML = originalText;
-              btn.style.background = 'linear-gradient(135deg, #8b5cf6, #7c3aed)';
-              btn.disabled = false;
-          }, 3000);
-      }
-  }
-  
-  // Return to main page function
-  function returnToMain() {
-      if (isReportSaved) {
-          // If report is saved, go directly without warning
-          window.location.href = '/';
-      } else {
-          // If not saved, show warning
-          if (confirm('Are you sure you want to return to the main page? Your current report will be lost.')) {
-              window.location.href = '/';
-          }
-      }
-  }
-  
-  // Make functions available globally
-  window.saveReport = saveReport;
-  window.returnToMain = returnToMain;
- 
-          // Hide header when printing
-  window.addEventListener('beforeprint', function() {
-      const header = document.querySelector('.report-header');
-      if (header) header.style.display = 'none';
-  });
-  
-  window.addEventListener('afterprint', function() {
-      const header = document.querySelector('.report-header');
-      if (header) header.style.display = 'block';
-  });
-  
-  // Ensure function is available when DOM is ready
-  document.addEventListener('DOMContentLoaded', function() {
-      // Function should be available now
-      if (typeof downloadPDF === 'function') {
-          console.log('downloadPDF function is ready');
-      } else {
-          console.error('downloadPDF function not properly defined');
-      }
-  });
-  
-  // Also try to make it available immediately
-  if (typeof downloadPDF === 'function') {
-      console.log('downloadPDF function loaded successfully');
-  }
-    </script>
-</body>
-</html>"""
+    if content is None:
+        if os.path.exists(os.path.join("reports", filename)):
+            return None
+        db = SessionLocal()
+        try:
+            record = db.query(Report).filter(Report.file_path == filename, Report.is_saved == False).order_by(Report.id.desc()).first()
+        finally:
+            db.close()
+        if not record or not record.content:
+            return None
+        content = record.content
+        meta = {
+            "language": record.language or "en",
+            "form_data": {
+                'brand': record.brand,
+                'product': record.product,
+                'budget': record.budget,
+                'enterprise_size': record.enterprise_size,
+                'other_info': ''
+            },
+            "report_date": record.created_at.strftime('%d %B %Y') if record.created_at else None,
+        }
     
-    return html
+    return {
+        "content": content,
+        "language": meta.get("language") or "en",
+        "form_data": meta.get("form_data"),
+        "report_date": meta.get("report_date"),
+    }
+
+async def render_report_page(filename: str) -> Optional[RenderedPage]:
+    """Render reports/<name>.html through render_cache, or None if it has no source to render from.
+
+    File and cache I/O run on the I/O pool; the render itself runs on the
+    render process pool unless the report is small enough that shipping it
+    to another process would cost more than rendering it.
+    """
+    source = await io_executor.run(load_report_source, filename)
+    if source is None:
+        return None
+    content, language, form_data, report_date = source["content"], source["language"], source["form_data"], source["report_date"]
+    key = render_cache.make_key(
+        content, language=language, form_data=form_data, report_date=report_date, renderer=RENDERER_VERSION,
+        assets=[asset_url('css/report.css'), asset_url('js/report.js')]
+    )
+    page = await io_executor.run(render_cache.lookup, key)
+    if page is None:
+        executor = render_executor if len(content) >= RENDER_PROCESS_MIN_BYTES else io_executor
+        html = await executor.run(render_report_document, content, language, form_data, report_date)
+        page = await io_executor.run(render_cache.store, key, html)
+    return page
+
 
 def get_current_user_from_cookie(request: Request, db: Session = Depends(get_db)):
     """Get current user from cookie token"""
@@ -1875,16 +534,71 @@ def status_check():
             "server_timeout": "15 minutes",
             "keep_alive": "30 seconds"
         },
+        "openai_clients": openai_clients.stats(),
+        "report_cache": report_cache.stats(),
+        "single_flight": report_single_flight.stats(),
+        "job_worker": job_worker.stats(),
+        "job_store": job_sweeper.stats(),
+        "job_events": job_events.stats(),
+        "idempotency": idempotency_store.stats(),
+        "render_cache": render_cache.stats(),
+        "pdf": pdf_renderer.stats(),
+        "executors": {"io": io_executor.stats(), "render": render_executor.stats()},
+        "term_index": term_index.stats(),
+        "term_fts": term_fts.stats(),
+        "fuzzy_terms": fuzzy_terms.stats(),
         "timestamp": datetime.now().isoformat()
     }
 
 
+def term_search_backend() -> str:
+    """The product term search serving requests: "index", "fts", or "db" for the ILIKE query"""
+    if term_index.enabled:
+        return "index"
+    if term_fts.enabled and term_fts.setup():
+        return "fts"
+    return "db"
+
+def ranked_term_search(db: Session, q: str, limit: int, offset: int = 0, after=None):
+    """One page of ranked matches from the configured term search backend, or None to run the ILIKE query"""
+    backend = term_search_backend()
+    if backend == "index":
+        return term_index.search(q, limit=limit, offset=offset, after=rank_from_key(after) if after is not None else None)
+    if backend == "fts":
+        return term_fts.search(db, q, limit=limit, offset=offset, after=after)
+    return None
+
+def encode_term_cursor(backend: str, q: str, key) -> str:
+    """Opaque select2-terms cursor: the sort key of the last row shown, tied to its backend and query"""
+    payload = json.dumps([backend, q, key], ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_term_cursor(cursor: str, backend: str, q: str):
+    """The sort key in a cursor from encode_term_cursor; ValueError if it is malformed or from another search"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"malformed cursor: {e}")
+    if not isinstance(payload, list) or len(payload) != 3 or payload[:2] != [backend, q]:
+        raise ValueError("cursor belongs to another search")
+    return payload[2]
+
 @app.get("/api/search-terms")
 def search_terms(q: str = "", limit: int = 20, db: Session = Depends(get_db)):
     """Search for product terms"""
     if not q or len(q) < 2:
         return {"terms": []}
     
+    ranked = ranked_term_search(db, q, limit=limit)
+    if ranked is not None:
+        rows, _, _ = ranked
+        return {
+            "terms": [
+                {"id": term_id, "term": term, "description": description, "category": category}
+                for term_id, term, description, category in rows
+            ]
+        }
+    
     # Search for terms that contain the query string (case insensitive)
     terms = db.query(ProductTerm).filter(
         ProductTerm.term.ilike(f"%{q}%")
@@ -1903,45 +617,142 @@ def search_terms(q: str = "", limit: int = 20, db: Session = Depends(get_db)):
     }
 
 @app.get("/api/select2-terms")
-def select2_terms(q: str = "", page: int = 1, per_page: int = 20, db: Session = Depends(get_db)):
-    """Search for product terms in Select2 format"""
+def select2_terms(q: str = "", page: int = 1, per_page: int = 20, cursor: Optional[str] = None, db: Session = Depends(get_db)):
+    """Search for product terms in Select2 format.
+
+    Pages are fetched by keyset: each response carries a cursor for the page
+    after it, encoding the sort key of its last row, and a request with that
+    cursor continues from there. `page` without a cursor still works for
+    older clients, by offset.
+    """
     if not q or len(q) < 2:
         return {"results": [], "pagination": {"more": False}}
     
-    # Calculate offset for pagination
-    offset = (page - 1) * per_page
-    
-    # Search for terms that contain the query string (case insensitive)
-    terms_query = db.query(ProductTerm).filter(
-        ProductTerm.term.ilike(f"%{q}%")
-    )
+    backend = term_search_backend()
+    after, offset = None, 0
+    if cursor:
+        try:
+            after = decode_term_cursor(cursor, backend, q)
+        except ValueError:
+            return JSONResponse({"status": "error", "message": "Invalid or expired cursor"}, status_code=400)
+    else:
+        offset = (max(page, 1) - 1) * per_page
     
-    # Get total count for pagination
-    total_count = terms_query.count()
+    try:
+        if backend == "db":
+            page_rows = ilike_term_page(db, q, per_page, offset=offset, after=after)
+        else:
+            page_rows = ranked_term_search(db, q, limit=per_page, offset=offset, after=after)
+    except ValueError:
+        # The cursor decoded but does not hold a sort key this backend understands
+        return JSONResponse({"status": "error", "message": "Invalid or expired cursor"}, status_code=400)
+    # Each backend fetches one extra row to tell whether another page exists
+    rows, has_more, last_key = page_rows
     
-    # Get paginated results
-    terms = terms_query.offset(offset).limit(per_page + 1).all()
+    if not rows and after is None and offset == 0:
+        return fuzzy_select2_terms(q, per_page)
     
-    # Check if there are more results
-    has_more = len(terms) > per_page
+    pagination = {"more": has_more}
     if has_more:
-        terms = terms[:per_page]
-    
+        pagination["cursor"] = encode_term_cursor(backend, q, last_key)
     return {
         "results": [
             {
-                "id": term.term,  # Use term as ID for Select2
-                "text": term.term,
-                "description": term.description,
-                "category": term.category
+                "id": term,  # Use term as ID for Select2
+                "text": term,
+                "description": description,
+                "category": category
             }
-            for term in terms
+            for _, term, description, category in rows
         ],
-        "pagination": {
-            "more": has_more
-        }
+        "pagination": pagination
+    }
+
+def ilike_term_page(db: Session, q: str, per_page: int, offset: int = 0, after: Optional[str] = None):
+    """One page of terms containing q (case insensitive) in term order, resuming after the term `after`"""
+    if after is not None and not isinstance(after, str):
+        raise ValueError("not a term")
+    terms_query = db.query(ProductTerm.id, ProductTerm.term, ProductTerm.description, ProductTerm.category).filter(
+        ProductTerm.term.ilike(f"%{q}%")
+    )
+    if after is not None:
+        terms_query = terms_query.filter(ProductTerm.term > after)
+    # Walks the term index in order, stopping as soon as the page is full: no count(), no rows skipped
+    rows = terms_query.order_by(ProductTerm.term).offset(offset).limit(per_page + 1).all()
+    page_rows = [tuple(row) for row in rows[:per_page]]
+    return page_rows, len(rows) > per_page, page_rows[-1][1] if page_rows else after
+
+def fuzzy_select2_terms(q: str, per_page: int):
+    """Near matches for a query that matched nothing, flagged so the dropdown can show them as suggestions"""
+    if not fuzzy_terms.enabled:
+        return {"results": [], "pagination": {"more": False}}
+    try:
+        matches = fuzzy_terms.search(q, limit=per_page)
+    except Exception as e:
+        print(f"Error in fuzzy term search: {e}")
+        matches = []
+    return {
+        "results": [
+            {"id": term, "text": term, "description": description, "category": category, "fuzzy": True}
+            for (_, term, description, category), _ in matches
+        ],
+        "pagination": {"more": False}
     }
 
+class ClientDisconnected(Exception):
+    """The client went away before its report was ready"""
+
+async def wait_for_disconnect(request: Request):
+    """Return once the client disconnects; only valid after the request body has been read"""
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+async def unless_disconnected(request: Request, coro):
+    """Await coro, cancelling it (and the LLM call under it) if the client disconnects first.
+
+    request.is_disconnected() never sees the disconnect behind BaseHTTPMiddleware
+    (TimeoutMiddleware), so this listens on the receive channel the way
+    StreamingResponse does.
+    """
+    task = asyncio.ensure_future(coro)
+    watcher = asyncio.ensure_future(wait_for_disconnect(request))
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        if task.done():
+            return task.result()
+        raise ClientDisconnected()
+    finally:
+        for pending in (task, watcher):
+            if not pending.done():
+                pending.cancel()
+        await asyncio.gather(task, watcher, return_exceptions=True)
+
+def queued_job_response(job_id: str) -> JSONResponse:
+    return JSONResponse({"status": "queued", "job_id": job_id, "status_url": f"/job-status/{job_id}"}, status_code=202)
+
+async def resolve_idempotency_key(user_id: int, key: str, fingerprint: str) -> Optional[JSONResponse]:
+    """Claim key for this request (returns None), or answer with what the request already holding it produced"""
+    while True:
+        record, created = await asyncio.to_thread(idempotency_store.begin, user_id, key, fingerprint)
+        if created:
+            return None
+        if record["fingerprint"] != fingerprint:
+            return JSONResponse({"status": "error", "message": "Idempotency key was already used for a different report request"}, status_code=422)
+        if not (record["job_id"] or record["response"]):
+            # The original request is still generating inline
+            record = await idempotency_store.wait(user_id, key, IDEMPOTENCY_WAIT_TIMEOUT)
+            if record is None:
+                # It failed and released the key; generate the report in this request instead
+                continue
+            if not (record["job_id"] or record["response"]):
+                return JSONResponse({"status": "error", "message": "This report is still being generated. Please try again shortly."}, status_code=409)
+        print(f"DEBUG: Replaying idempotent request {key}")
+        if record["response"]:
+            return JSONResponse(record["response"])
+        return queued_job_response(record["job_id"])
+
 @app.post("/generate", response_class=JSONResponse)
 async def generate_report(
     request: Request,
@@ -1952,12 +763,18 @@ async def generate_report(
     other_info: str = Form(""),
     ai_model: str = Form("gpt-5"),
     language: str = Form("en"),
-    current_user: User = Depends(get_current_user_from_cookie),
-    db: Session = Depends(get_db)
+    bypass_cache: bool = Form(False),
+    generation_mode: str = Form(DEFAULT_GENERATION_MODE),
+    async_job: bool = Form(DEFAULT_ASYNC_JOBS),
+    idempotency_key: str = Form(""),
+    current_user: User = Depends(get_current_user_from_cookie)
 ):
     if not current_user:
         return JSONResponse({"status": "error", "message": "Authentication required. Please log in to generate reports."}, status_code=401)
     
+    # Retries of the same submission carry the same key, as a header or form field
+    idempotency_key = request.headers.get("Idempotency-Key") or idempotency_key
+    claimed_key = None
     try:
         # Debug: Log received values
         print(f"DEBUG: Received brand: '{brand}'")
@@ -1966,13 +783,40 @@ async def generate_report(
         print(f"DEBUG: Received enterprise_size: '{enterprise_size}'")
         print(f"DEBUG: Received other_info: '{other_info}'")
         
+        if generation_mode not in GENERATION_MODES:
+            return JSONResponse({"status": "error", "message": f"Unknown generation mode: {generation_mode}"}, status_code=400)
+        if language not in REPORT_LANGUAGES:
+            return JSONResponse({"status": "error", "message": f"Unsupported language: {language}"}, status_code=400)
+        
+        if idempotency_key:
+            fingerprint = idempotency_store.fingerprint({
+                "brand": brand, "product": product, "budget": budget, "enterprise_size": enterprise_size,
+                "other_info": other_info, "ai_model": ai_model, "language": language, "generation_mode": generation_mode
+            })
+            replay = await resolve_idempotency_key(current_user.id, idempotency_key, fingerprint)
+            if replay is not None:
+                return replay
+            claimed_key = idempotency_key
+        
+        # Hand the report to the job workers and let the client poll for it
+        if async_job and JOB_WORKER_ENABLED:
+            job_id = await enqueue_report_job(
+                current_user.id, brand=brand, product=product, budget=budget, enterprise_size=enterprise_size,
+                other_info=other_info, ai_model=ai_model, language=language,
+                bypass_cache=bypass_cache, generation_mode=generation_mode
+            )
+            if claimed_key:
+                await asyncio.to_thread(idempotency_store.attach_job, current_user.id, claimed_key, job_id)
+            print(f"DEBUG: Queued report job {job_id}")
+            return queued_job_response(job_id)
+        
         # Build prompt
         spec = InputSpec(brand=brand.strip(), product=product.strip(), budget=budget.strip(), enterprise_size=enterprise_size.strip(), other_info=other_info.strip())
-        prompt_text = build_prompt(spec, analysis_date=datetime.now().strftime("%d %B %Y"), language=language)
+        analysis_date = datetime.now()
+        prompt_text = build_prompt(spec, analysis_date=analysis_date.strftime("%d %B %Y"), language=language)
 
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         user_id = current_user.id
-        report_filename_txt = f"reports/report_{user_id}_{timestamp}.txt"
         report_filename_pdf = f"report_{user_id}_{timestamp}"
 
         # Debug: Log the received AI model
@@ -1981,19 +825,15 @@ async def generate_report(
         # Generate report with timeout
         try:
             print(f"DEBUG: Starting report generation at {datetime.now()}")
-            if ai_model != "none" and ai_model != "undefined":
-                print(f"DEBUG: Generating report with AI model: {ai_model}")
-                print(f"DEBUG: Prompt length: {len(prompt_text)} characters")
-                report_text = call_openai_chat(prompt_text, model=ai_model)
-                print(f"DEBUG: AI generation completed successfully at {datetime.now()}")
-                print(f"DEBUG: Generated report length: {len(report_text) if report_text else 0} characters")
-            else:
-                if ai_model == "undefined":
-                    print("DEBUG: AI model was 'undefined', using gpt-5 as fallback")
-                    report_text = call_openai_chat(prompt_text, model="gpt-5")
-                else:
-                    print("DEBUG: Using prompt text as fallback")
-                    report_text = prompt_text
+            print(f"DEBUG: Generating report with AI model: {ai_model}")
+            print(f"DEBUG: Prompt length: {len(prompt_text)} characters")
+            report_text = await unless_disconnected(
+                request, generate_report_text(spec, prompt_text, ai_model, language, analysis_date, bypass_cache, generation_mode)
+            )
+            print(f"DEBUG: AI generation completed successfully at {datetime.now()}")
+            print(f"DEBUG: Generated report length: {len(report_text) if report_text else 0} characters")
+        except ClientDisconnected:
+            raise
         except Exception as ai_error:
             print(f"AI generation error: {ai_error}")
             # Provide a more informative fallback
@@ -2038,39 +878,9 @@ Please try generating the report again in a few minutes.
 
         # Ensure report_text is not None and not empty
         if report_text is None or report_text.strip() == "":
-            # Handle multiple products in empty report message
-            products = [p.strip() for p in product.split(',') if p.strip()]
-            if len(products) > 1:
-                product_list = "\n".join([f"- {p}" for p in products])
-                product_section = f"## Products/Services:\n{product_list}"
-            else:
-                product_section = f"## Product: {product}"
-            
-            report_text = f"""# AI Trade Report - {brand}
-
-**Error:** Unable to generate report content. Please try again.
-
-{product_section}
-## Brand: {brand}
-## Enterprise Size: {enterprise_size}
-## Budget: {budget if budget else 'Not specified'}
-
-## Troubleshooting
-
-If you continue to experience issues, please:
-1. Check your internet connection
-2. Verify your OpenAI API key is valid
-3. Try again in a few minutes
-4. Contact support if the problem persists
-
----
-*Report generated on {datetime.now().strftime('%d %B %Y')}*"""
-
-        # Save text version
-        with open(report_filename_txt, "w", encoding="utf-8") as f:
-            f.write(report_text)
+            report_text = empty_report_text(brand, product, budget, enterprise_size)
 
-        # Create HTML version
+        # Save text version and what the report page is rendered with
         form_data = {
             'brand': brand,
             'product': product,
@@ -2078,67 +888,269 @@ If you continue to experience issues, please:
             'enterprise_size': enterprise_size,
             'other_info': other_info
         }
-        html_path = create_html_report(report_text, report_filename_pdf, language, form_data)
+        await io_executor.run(write_report_files, report_filename_pdf, report_text, language, form_data)
         actual_filename = f"{report_filename_pdf}.html"
 
         # Save report metadata to database
-        try:
-            print(f"DEBUG: Saving report to database with form data:")
-            print(f"  Brand: '{brand}'")
-            print(f"  Product: '{product}'")
-            print(f"  Budget: '{budget}'")
-            print(f"  Enterprise Size: '{enterprise_size}'")
-            
-            report_record = Report(
-                user_id=user_id,
-                title=f"AI Trade Report - {brand}",
-                brand=brand,
-                product=product,
-                budget=budget,
-                enterprise_size=enterprise_size,
-                ai_model=ai_model,
-                language=language,
-                content=report_text,  # Store the text content
-                file_path=actual_filename,
-                is_saved=False  # Not saved by user yet
-            )
-            db.add(report_record)
-            db.commit()
-            db.refresh(report_record)
-            print(f"DEBUG: Report saved successfully with ID: {report_record.id}")
-        except Exception as e:
-            print(f"Warning: Could not save report metadata to database: {e}")
+        await io_executor.run(store_report_record, user_id, form_data, ai_model, language, actual_filename)
 
         # Return JSON with redirect URL for AJAX handling, including form data
-        form_data_params = f"?brand={brand}&product={product}&budget={budget}&enterprise_size={enterprise_size}"
-        return JSONResponse({
+        response = {
             "status": "success",
-            "redirect_url": f"/report/{actual_filename}{form_data_params}",
+            "redirect_url": report_redirect_url(actual_filename, form_data),
             "report_name": actual_filename
-        })
-        
+        }
+        if claimed_key:
+            await asyncio.to_thread(idempotency_store.complete, user_id, claimed_key, response)
+        return JSONResponse(response)
+        
+    except asyncio.CancelledError:
+        if claimed_key:
+            await asyncio.to_thread(idempotency_store.release, current_user.id, claimed_key)
+        raise
+    except ClientDisconnected:
+        if claimed_key:
+            await asyncio.to_thread(idempotency_store.release, current_user.id, claimed_key)
+        # Nobody is listening; the status only shows up in access logs
+        return JSONResponse({"status": "cancelled", "message": "Client disconnected"}, status_code=499)
     except Exception as e:
         print(f"Error generating report: {e}")
+        if claimed_key:
+            await asyncio.to_thread(idempotency_store.release, current_user.id, claimed_key)
         return HTMLResponse(f"<h1>Error generating report: {str(e)}</h1>", status_code=500)
 
-@app.get("/job-status/{job_id}")
-def get_job_status(job_id: str):
-    """Get the status of a report generation job"""
-    with job_lock:
-        if job_id in job_status:
-            return job_status[job_id]
+def sse_event(event: str, data: dict) -> str:
+    """Format one Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def iter_text(text: str):
+    """Async iterator yielding a whole text as one chunk"""
+    yield text
+
+async def join_sections(sections):
+    """Separate section texts the same way call_openai_chat_sections_async merges them"""
+    first = True
+    async for text in sections:
+        yield text if first else "\n\n" + text
+        first = False
+
+SECTION_HEADING_RE = re.compile(r'^(?:#{1,2} (?P<heading>.+)|\*\*(?P<bold>[^*]{1,120})\*\*)$')
+
+@app.post("/generate-stream")
+async def generate_report_stream(
+    request: Request,
+    brand: str = Form(...),
+    product: str = Form(...),
+    budget: str = Form(""),
+    enterprise_size: str = Form(...),
+    other_info: str = Form(""),
+    ai_model: str = Form("gpt-5"),
+    language: str = Form("en"),
+    bypass_cache: bool = Form(False),
+    generation_mode: str = Form(DEFAULT_GENERATION_MODE),
+    current_user: User = Depends(get_current_user_from_cookie)
+):
+    """Generate a report and stream it to the browser as Server-Sent Events.
+
+    Emits `token` events with text chunks, `section` events when a heading line
+    completes, then `done` with the report URL (or `error`). The .txt file is
+    written once the whole text has arrived.
+
+    If the client disconnects, Starlette cancels the stream, which aborts the
+    upstream LLM stream before anything is written.
+    """
+    if not current_user:
+        return JSONResponse({"status": "error", "message": "Authentication required. Please log in to generate reports."}, status_code=401)
+    
+    if generation_mode not in GENERATION_MODES:
+        return JSONResponse({"status": "error", "message": f"Unknown generation mode: {generation_mode}"}, status_code=400)
+    if language not in REPORT_LANGUAGES:
+        return JSONResponse({"status": "error", "message": f"Unsupported language: {language}"}, status_code=400)
+    
+    spec = InputSpec(brand=brand.strip(), product=product.strip(), budget=budget.strip(), enterprise_size=enterprise_size.strip(), other_info=other_info.strip())
+    analysis_date = datetime.now()
+    prompt_text = build_prompt(spec, analysis_date=analysis_date.strftime("%d %B %Y"), language=language)
+    
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    user_id = current_user.id
+    report_filename_pdf = f"report_{user_id}_{timestamp}"
+    form_data = {
+        'brand': brand,
+        'product': product,
+        'budget': budget,
+        'enterprise_size': enterprise_size,
+        'other_info': other_info
+    }
+    model = "gpt-5" if ai_model == "undefined" else ai_model
+    cache_key = None
+    if model != "none":
+        if bypass_cache:
+            report_cache.record_bypass()
         else:
-            return {"status": "not_found", "message": "Job not found"}
+            cache_key = report_cache.make_key(spec, language, model, PROMPT_TEMPLATE_VERSION, analysis_date.date(), generation_mode)
+    
+    async def event_stream():
+        cached_text = await cached_report_text(cache_key) if cache_key else None
+        if cache_key and cached_text is None and report_single_flight.in_flight(cache_key):
+            # An identical non-streaming generation is running; wait for its text instead of paying twice
+            cached_text = await report_single_flight.join(cache_key)
+            if cached_text is not None and cached_text.startswith(LLM_ERROR_PREFIX):
+                # The generation we waited for failed; its error text is not a report
+                yield sse_event("error", {"message": cached_text})
+                return
+        chunks = []
+        pending_line = ""
+        try:
+            if cached_text is not None:
+                source = iter_text(cached_text)
+            elif model != "none" and generation_mode == "sections":
+                source = join_sections(iter_openai_chat_sections_async(prompt_text, section_groups_for(spec), model=model))
+            elif model != "none":
+                source = stream_openai_chat_async(prompt_text, model=model)
+            else:
+                source = iter_text(prompt_text)
+            async for chunk in source:
+                chunks.append(chunk)
+                yield sse_event("token", {"text": chunk})
+                
+                # Announce section boundaries once a heading line is complete
+                pending_line += chunk
+                *complete_lines, pending_line = pending_line.split('\n')
+                for line in complete_lines:
+                    match = SECTION_HEADING_RE.match(line.strip())
+                    if match:
+                        yield sse_event("section", {"title": match.group('heading') or match.group('bold')})
+            
+            report_text = "".join(chunks)
+            if report_text.strip() == "":
+                report_text = empty_report_text(brand, product, budget, enterprise_size)
+            elif cache_key and cached_text is None and not report_text.startswith(LLM_ERROR_PREFIX):
+                # Never cache failures, same as generate_report_text
+                await io_executor.run(report_cache.put, cache_key, report_text)
+        except Exception as e:
+            print(f"AI streaming error: {e}")
+            yield sse_event("error", {"message": f"Error generating report: {str(e)}. Please try again or contact support."})
+            return
+        
+        # Written once the text is complete, so an aborted stream leaves no partial file behind
+        await io_executor.run(write_report_files, report_filename_pdf, report_text, language, form_data)
+        actual_filename = f"{report_filename_pdf}.html"
+        
+        await io_executor.run(store_report_record, user_id, form_data, ai_model, language, actual_filename)
+        
+        yield sse_event("done", {
+            "status": "success",
+            "redirect_url": report_redirect_url(actual_filename, form_data),
+            "report_name": actual_filename
+        })
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/job-status/{job_id}")
+async def get_job_status(job_id: str, wait: float = 0, since: Optional[str] = None):
+    """Get the status of a report generation job.
+
+    With wait > 0 this long-polls: the request blocks up to `wait` seconds
+    (capped at JOB_STATUS_MAX_WAIT) until the job's version differs from `since`.
+    """
+    if wait > 0:
+        job = await job_events.wait_for_change(job_id, since, min(wait, JOB_STATUS_MAX_WAIT))
+    else:
+        job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None:
+        return {"status": "not_found", "message": "Job not found"}
+    return job
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str, current_user: User = Depends(get_current_user_from_cookie)):
+    """Cancel one of the current user's queued or running report jobs"""
+    if not current_user:
+        return JSONResponse({"status": "error", "message": "Authentication required"}, status_code=401)
+    status = await asyncio.to_thread(job_store.request_cancel, job_id, current_user.id)
+    if status is None:
+        return JSONResponse({"status": "not_found", "message": "Job not found"}, status_code=404)
+    if status == "cancelling":
+        # Stop it now if it runs here; workers elsewhere notice on their next heartbeat
+        job_worker.cancel(job_id)
+    return {"job_id": job_id, "status": status}
+
+@app.get("/admin/job-queue")
+async def admin_job_queue(current_user: User = Depends(get_current_user_from_cookie)):
+    """Fair-share queue order and each user's share of report generation (admins only)"""
+    if not current_user or current_user.email.lower() not in ADMIN_EMAILS:
+        return JSONResponse({"status": "error", "message": "Admin access required"}, status_code=403)
+    queued = await asyncio.to_thread(job_store.list_queued, 500, job_worker.queue_window)
+    snapshot = await asyncio.to_thread(fair_scheduler.snapshot, queued)
+    return dict(snapshot, worker=job_worker.stats())
+
+@app.get("/job-events/{job_id}")
+async def job_events_stream(job_id: str, request: Request):
+    """Push job status changes as Server-Sent Events until the job finishes"""
+    since = request.headers.get("last-event-id")
+
+    async def event_stream():
+        async for job in job_events.subscribe(job_id, since):
+            if await request.is_disconnected():
+                return
+            if job is None:
+                # Comment line keeps proxies from closing an idle stream
+                yield ": keepalive\n\n"
+            elif "version" in job:
+                yield f"id: {job['version']}\n" + sse_event("status", job)
+            else:
+                yield sse_event("status", job)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def rendered_page_response(request: Request, page: RenderedPage, headers: dict = None) -> Response:
+    """Serve a rendered report with its ETag, compressed variants and Range support"""
+    return cached_bytes_response(
+        request, page.body, page.etag, "text/html; charset=utf-8",
+        variants=page.variants, last_modified=page.rendered_at,
+        headers=dict(headers or {}, **{"Cache-Control": REPORT_CACHE_CONTROL})
+    )
 
 @app.get("/report/{filename}")
-def view_report(filename: str):
+async def view_report(filename: str, request: Request):
+    if filename.endswith('.html'):
+        page = await render_report_page(filename)
+        if page is not None:
+            return rendered_page_response(request, page)
     filepath = os.path.join("reports", filename)
     if os.path.exists(filepath):
-        return FileResponse(filepath, media_type="text/html")
+        return cached_file_response(request, filepath, "text/html", headers={"Cache-Control": REPORT_CACHE_CONTROL})
     return {"status": "error", "message": "Report not found"}
 
+@app.get("/download/{name}.pdf")
+async def download_report_pdf(name: str, request: Request):
+    """Render a report to PDF on the server (cached), or 503 so the page can fall back to printing"""
+    stored_path = os.path.join("reports", f"{name}.pdf")
+    if os.path.exists(stored_path):
+        return cached_file_response(request, stored_path, "application/pdf", filename=f"{name}.pdf")
+    if not pdf_renderer.available:
+        return JSONResponse({"status": "unavailable", "message": "Server-side PDF export is not installed"}, status_code=503)
+    source = await io_executor.run(load_report_source, f"{name}.html")
+    if source is None:
+        return JSONResponse({"status": "error", "message": "Report not found"}, status_code=404)
+    try:
+        pdf_path = await pdf_renderer.render(source["content"], source["language"], source["form_data"], source["report_date"])
+    except PdfBusy:
+        return JSONResponse({"status": "busy", "message": "Too many PDFs are being generated; try again shortly"}, status_code=503, headers={"Retry-After": "10"})
+    except Exception as e:
+        print(f"PDF rendering error for {name}: {e}")
+        return JSONResponse({"status": "error", "message": "PDF rendering failed"}, status_code=500)
+    return cached_file_response(request, pdf_path, "application/pdf", filename=f"{name}.pdf", headers={"Cache-Control": REPORT_CACHE_CONTROL})
+
 @app.get("/download/{filename}")
-def download_report(filename: str):
+async def download_report(filename: str, request: Request):
+    if filename.endswith('.html'):
+        page = await render_report_page(filename)
+        if page is not None:
+            return rendered_page_response(request, page, {"Content-Disposition": f'attachment; filename="{filename}"'})
     filepath = os.path.join("reports", filename)
     if os.path.exists(filepath):
         # Determine media type based on file extension
@@ -2151,7 +1163,7 @@ def download_report(filename: str):
         else:
             media_type = "application/octet-stream"
         
-        return FileResponse(filepath, media_type=media_type, filename=filename)
+        return cached_file_response(request, filepath, media_type, filename=filename, headers={"Cache-Control": REPORT_CACHE_CONTROL})
     return {"status": "error", "message": "File not found"}
 
 @app.post("/save-report")
@@ -7,6 +7,7 @@ from database.models import User, get_db, create_tables
 from auth.auth import authenticate_user, create_access_token, get_password_hash, get_current_user, verify_token
 from schemas.schemas import UserCreate, UserLogin, UserResponse, Token, UserUpdate
 from services.email_service import email_service
+from services.static_assets import asset_url
 import os
 import secrets
 from dotenv import load_dotenv
@@ -17,6 +18,7 @@ load_dotenv()
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
+templates.env.globals["asset_url"] = asset_url
 
 # Token expiration time
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Benchmark the report markdown renderer against the previous implementation.
+
+Builds synthetic reports of increasing size, made of the sections, bullet
+lists and markdown tables the LLM prompt asks for, renders each with
+services.report_renderer.render_report_body and with a verbatim copy of the
+loop that used to live in create_html_document, checks the HTML is
+identical and prints the timings.
+
+Two table shapes are generated: "separated" tables have a |---| row under the
+header, as the model normally writes them; "bare" tables have none, which
+made the old header check rescan the whole document for every row.
+
+Usage:
+    python benchmarks/bench_render.py --sizes 100,500,1000,2000
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from services.report_renderer import render_report_body
+
+
+def legacy_render_report_body(content: str) -> str:
+    """The body loop of create_html_document before the single-pass renderer"""
+    html = ""
+    
+    # Escape HTML special characters
+    def escape_html(text):
+        special_chars = {
+            '&': '&amp;',
+            '<': '&lt;',
+            '>': '&gt;',
+            '"': '&quot;',
+            "'": '&#x27;'
+        }
+        for char, replacement in special_chars.items():
+            text = text.replace(char, replacement)
+        return text
+    
+    # Process content line by line
+    lines = content.split('\n')
+    in_table = False
+    in_list = False
+    list_type = 'ul'
+    
+    for line in lines:
+        line = line.strip()
+        
+        if not line:
+            if in_table:
+                # End table
+                html += "        </table>\n"
+                in_table = False
+            elif in_list:
+                # End list
+                html += f"        </{list_type}>\n"
+                in_list = False
+            else:
+                html += "        <br>\n"
+            continue
+        
+        # Handle different line types
+        if line.startswith('# '):
+            # Main title
+            title = escape_html(line[2:])
+            html += f"        <h1>{title}</h1>\n"
+        elif line.startswith('## '):
+            # Section heading
+            title = escape_html(line[3:])
+            html += f"        <h2>{title}</h2>\n"
+        elif line.startswith('### '):
+            # Subsection heading
+            title = escape_html(line[4:])
+            html += f"        <h3>{title}</h3>\n"
+        elif line.startswith('#### '):
+            # Sub-subsection heading
+            title = escape_html(line[5:])
+            html += f"        <h4>{title}</h4>\n"
+        elif line.startswith('|') and '|' in line[1:]:
+            # Table row
+            if not in_table:
+                # Start table
+                html += "        <table>\n"
+                in_table = True
+            
+            # Process table row
+            cells = [cell.strip() for cell in line.split('|')[1:-1]]
+            escaped_cells = [escape_html(cell) for cell in cells]
+            
+            # Check if this is a header row (contains dashes or is the first row)
+            if any('---' in cell or '--' in cell for cell in cells) or not any('---' in prev_line for prev_line in lines if '|' in prev_line):
+                html += "            <tr>\n"
+                for cell in escaped_cells:
+                    html += f"                <th>{cell}</th>\n"
+                html += "            </tr>\n"
+            else:
+                html += "            <tr>\n"
+                for cell in escaped_cells:
+                    html += f"                <td>{cell}</td>\n"
+                html += "            </tr>\n"
+        elif line.startswith('- ') or line.startswith('* '):
+            # Bullet point
+            if not in_list:
+                html += "        <ul>\n"
+                in_list = True
+                list_type = 'ul'
+            text = escape_html(line[2:])
+            html += f"            <li>{text}</li>\n"
+        elif line.startswith('1. ') or line.startswith('2. ') or line.startswith('3. ') or line.startswith('4. ') or line.startswith('5. '):
+            # Numbered list
+            if not in_list:
+                html += "        <ol>\n"
+                in_list = True
+                list_type = 'ol'
+            text = escape_html(line[3:])
+            html += f"            <li>{text}</li>\n"
+        elif line.startswith('**') and line.endswith('**'):
+            # Bold text
+            text = escape_html(line[2:-2])
+            html += f"        <p><strong>{text}</strong></p>\n"
+        elif line.startswith('```'):
+            # Code block
+            if line == '```':
+                html += "        <div class=\"code-block\">\n"
+            else:
+                html += f"        <div class=\"code-block\">\n            {escape_html(line[3:])}\n"
+        elif line.endswith('```'):
+            # End code block
+            html += "        </div>\n"
+        elif line.startswith('> '):
+            # Quote/note
+            text = escape_html(line[2:])
+            html += f"        <div class=\"highlight\">{text}</div>\n"
+        else:
+            # Regular paragraph
+            if line:
+                text = escape_html(line)
+                html += f"        <p>{text}</p>\n"
+    
+    # Close any open tags
+    if in_table:
+        html += "        </table>\n"
+    if in_list:
+        html += f"        </{list_type}>\n"
+    return html
+
+
+def build_report(target_kb: int, separated: bool) -> str:
+    """Synthetic report of roughly target_kb kilobytes with a table in every section"""
+    parts = ["# AI Trade Report - Benchmark Brand", ""]
+    section = 0
+    size = 0
+    while size < target_kb * 1024:
+        section += 1
+        block = [
+            f"## {section}. Market Section {section}",
+            "",
+            f"The market for product line {section} keeps growing & shifting; buyers compare <price>, \"quality\" and the brand's reputation.",
+            "",
+            f"### Key Drivers {section}",
+            "- Rising demand in urban areas",
+            "- Distribution partners' margins under pressure",
+            "* Online channels > 40% of sales",
+            "",
+            "1. Enter through regional distributors",
+            "2. Build brand awareness online",
+            "3. Expand to wholesale",
+            "",
+            f"**Competitor landscape {section}**",
+            "",
+            "| Competitor | Market Share | Price Range | Strength |",
+        ]
+        if separated:
+            block.append("|------------|--------------|-------------|----------|")
+        for row in range(12):
+            block.append(f"| Company {section}-{row} | {row * 3 % 40}% | EUR {10 + row}-{20 + row} | Strong retail presence |")
+        block += ["", "> Note: figures are estimates & should be verified.", "", "```", "code sample", "```", ""]
+        text = "\n".join(block)
+        parts.append(text)
+        size += len(text) + 1
+    return "\n".join(parts)
+
+
+def time_it(fn, content: str, repeat: int) -> list:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(content)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,500,1000,2000", help="comma-separated report sizes in KB")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per renderer and size")
+    parser.add_argument("--legacy-bare-max-kb", type=int, default=500,
+                        help="skip the legacy renderer on bare tables above this size (it is quadratic there)")
+    args = parser.parse_args()
+
+    print(f"{'shape':<10} {'size':>8} {'rows':>7} {'legacy ms':>11} {'new ms':>9} {'speedup':>8}")
+    for separated in (True, False):
+        shape = "separated" if separated else "bare"
+        for kb in (int(s) for s in args.sizes.split(",")):
+            content = build_report(kb, separated)
+            rows = sum(1 for line in content.split("\n") if line.startswith("|"))
+            new = statistics.median(time_it(render_report_body, content, args.repeat)) * 1000
+            if separated or kb <= args.legacy_bare_max_kb:
+                if legacy_render_report_body(content) != render_report_body(content):
+                    raise SystemExit(f"Output differs for {shape} {kb}KB")
+                legacy = statistics.median(time_it(legacy_render_report_body, content, 1 if not separated else args.repeat)) * 1000
+                legacy_text, speedup = f"{legacy:11.1f}", f"{legacy / new:7.1f}x"
+            else:
+                legacy_text, speedup = f"{'skipped':>11}", f"{'-':>8}"
+            print(f"{shape:<10} {len(content) // 1024:>6}KB {rows:>7} {legacy_text} {new:9.1f} {speedup}")
+
+
+if __name__ == "__main__":
+    main()
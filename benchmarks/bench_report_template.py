@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Benchmark the Jinja2 report template against the string-concatenation shell.
+
+Renders synthetic reports (see bench_render.build_report) through
+services.report_renderer.render_report_document and through a verbatim copy
+of the create_html_document that built the page with string concatenation
+and a per-call translations dict, and prints the best per-report time
+(the minimum over --repeat runs, which is the least noisy figure here).
+Both share render_report_body, so the difference is the page shell: template
+compile and lookup happen once at import, the i18n catalog is a module
+constant, and the shell is emitted by compiled template code.
+
+The "import" line times a fresh template compile with and without the
+bytecode cache, which is what each new worker process pays once.
+
+Usage:
+    python benchmarks/bench_report_template.py --sizes 0,5,20,100 --repeat 200
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+from benchmarks.bench_render import build_report
+from services.report_renderer import render_report_body, render_report_document
+from services.static_assets import asset_url
+
+FORM_DATA = {
+    "brand": "Benchmark Brand",
+    "product": "Olive oil, Pasta",
+    "budget": "50000-100000",
+    "enterprise_size": "medium",
+    "other_info": "Focus on the German retail market",
+}
+
+
+def legacy_create_html_document(content: str, language: str = "en", form_data: dict = None) -> str:
+    """create_html_document before the Jinja template (DEBUG prints removed)"""
+    
+    # Language-specific translations
+    translations = {
+        "en": {
+            "title": "AI Trade Report - Professional Market Analysis",
+            "report_title": "AI Trade Report",
+            "report_overview": "Report Overview",
+            "generated_by": "Generated by:",
+            "ai_powered": "AI-Powered Market Research",
+            "date": "Date:",
+            "report_type": "Report Type:",
+            "comprehensive_analysis": "Comprehensive Market Analysis",
+            "footer_text1": "This report was generated using AI-powered market research technology.",
+            "footer_text2": "For questions or additional analysis, please contact your research team.",
+            "print": "Print",
+            "download_pdf": "Download PDF",
+            "save": "Save",
+            "return_home": "Home",
+            "saved_reports_title": "Your Saved Reports",
+            "saved_reports_subtitle": "Access and manage your previously generated reports",
+            "saved_reports_nav": "Saved Reports",
+            "no_reports_title": "No Saved Reports Yet",
+            "no_reports_description": "Generate your first report to see it saved here for easy access."
+        },
+        "it": {
+            "title": "AI Trade Report - Analisi di Mercato Professionale",
+            "report_title": "AI Trade Report",
+            "report_overview": "Panoramica del Report",
+            "generated_by": "Generato da:",
+            "ai_powered": "Ricerca di Mercato basata su AI",
+            "date": "Data:",
+            "report_type": "Tipo di Report:",
+            "comprehensive_analysis": "Analisi di Mercato Completa",
+            "footer_text1": "Questo report è stato generato utilizzando tecnologia di ricerca di mercato basata su AI.",
+            "footer_text2": "Per domande o analisi aggiuntive, contatta il tuo team di ricerca.",
+            "print": "Stampa",
+            "download_pdf": "Scarica PDF",
+            "save": "Salva",
+            "return_home": "Home",
+            "saved_reports_title": "I Tuoi Report Salvati",
+            "saved_reports_subtitle": "Accedi e gestisci i tuoi report generati in precedenza",
+            "saved_reports_nav": "Report Salvati",
+            "no_reports_title": "Nessun Report Salvato Ancora",
+            "no_reports_description": "Genera il tuo primo report per vederlo salvato qui per un accesso facile."
+        }
+    }
+    
+    t = translations.get(language, translations["en"])
+    
+    # Start HTML document
+    html = """<!DOCTYPE html>
+<html lang=""" + language + """>
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0, maximum-scale=1.0, user-scalable=no">
+    <title>""" + t['title'] + """</title>
+    <link rel="preconnect" href="https://fonts.googleapis.com">
+    <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
+    <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&family=JetBrains+Mono:wght@400;500&display=swap" rel="stylesheet">
+    <script src="https://cdnjs.cloudflare.com/ajax/libs/html2pdf.js/0.10.1/html2pdf.bundle.min.js"></script>
+    <link rel="stylesheet" href='""" + asset_url('css/report.css') + """'>
+</head>
+<body>
+    <!-- Professional Report Header -->
+    <header class="report-header">
+        <div class="header-content">
+            <div class="header-brand">
+                <img src="/static/logo_trade_on_chain.png" alt="AI Trade Report" class="brand-logo" style="height: 32px; width: auto; margin-right: 12px;">
+                <img src="/static/logo2.png" alt="AI Trade Report" class="brand-logo" style="height: 32px; width: auto; margin-right: 12px;">
+                <span class="brand-text">AI Trade Report</span>
+            </div>
+            <div class="header-actions">
+                <button class="action-btn save" onclick="saveReport()">
+                    <span class="btn-icon">💾</span>
+                    <span class="btn-text">""" + t['save'] + """</span>
+                </button>
+                <button class="action-btn home" onclick="returnToMain()">
+                    <span class="btn-icon">🏠</span>
+                    <span class="btn-text">""" + t['return_home'] + """</span>
+                </button>
+                <button class="action-btn print" onclick="window.print()">
+                    <span class="btn-icon">🖨️</span>
+                    <span class="btn-text">""" + t['print'] + """</span>
+                </button>
+                <button class="action-btn pdf" onclick="downloadPDF()">
+                    <span class="btn-icon">📄</span>
+                    <span class="btn-text">""" + t['download_pdf'] + """</span>
+                </button>
+            </div>
+        </div>
+    </header>
+    
+    <div class="container" id="report-content">
+        <div class="report-title-section">
+            <h1>""" + t['report_title'] + """</h1>
+            <div class="title-underline"></div>
+        </div>
+        <div class="summary-box">
+            <div class="summary-header">
+                <span class="summary-icon">📋</span>
+                <span class="summary-title">""" + t['report_overview'] + """</span>
+            </div>
+            <div class="report-logos" style="text-align: center; margin: 20px 0; padding: 15px; background: linear-gradient(135deg, #f8fafc 0%, #e2e8f0 100%); border-radius: 8px; border: 1px solid #e2e8f0;">
+                <div style="display: flex; justify-content: center; align-items: center; gap: 20px; flex-wrap: wrap;">
+                    <img src="/static/logo2.png" alt="AI Trade Report" style="height: 40px; width: auto; border-radius: 9px; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">
+                </div>
+                <div style="margin-top: 10px; font-size: 0.9em; color: #64748b; font-weight: 500;">
+                    Professional Market Analysis • Powered by AI Technology
+                </div>
+            </div>
+            <div class="summary-content">
+                <div class="summary-item">
+                    <span class="item-label">""" + t['generated_by'] + """</span>
+                    <span class="item-value">""" + t['ai_powered'] + """</span>
+                </div>
+                <div class="summary-item">
+                    <span class="item-label">""" + t['date'] + """</span>
+                    <span class="item-value">""" + datetime.now().strftime('%d %B %Y') + """</span>
+                </div>
+                <div class="summary-item">
+                    <span class="item-label">""" + t['report_type'] + """</span>
+                    <span class="item-value">""" + t['comprehensive_analysis'] + """</span>
+                </div>"""
+    
+    # Add form data if available
+    if form_data:
+        html += """
+                <div class="summary-item">
+                    <span class="item-label">Brand Name</span>
+                    <span class="item-value">""" + form_data.get('brand', 'N/A') + """</span>
+                </div>
+                <div class="summary-item">
+                    <span class="item-label">Product/Service</span>
+                    <span class="item-value">""" + form_data.get('product', 'N/A') + """</span>
+                </div>
+                <div class="summary-item">
+                    <span class="item-label">Investment Budget</span>
+                    <span class="item-value">""" + form_data.get('budget', 'N/A') + """</span>
+                </div>
+                <div class="summary-item">
+                    <span class="item-label">Enterprise Size</span>
+                    <span class="item-value">""" + form_data.get('enterprise_size', 'N/A') + """</span>
+                </div>"""
+        
+        # Add other information if provided
+        if form_data.get('other_info') and form_data.get('other_info').strip():
+            html += """
+                <div class="summary-item">
+                    <span class="item-label">Other Information</span>
+                    <span class="item-value">""" + form_data.get('other_info', 'N/A') + """</span>
+                </div>"""
+        
+        # Add hidden form data for JavaScript to extract
+        html += f"""
+        <script>
+        // Store form data for save function
+        window.formData = {{
+            brand: '{form_data.get('brand', '')}',
+            product: '{form_data.get('product', '')}',
+            budget: '{form_data.get('budget', '')}',
+            enterprise_size: '{form_data.get('enterprise_size', '')}',
+            other_info: '{form_data.get('other_info', '')}'
+        }};
+        console.log('Form data stored:', window.formData);
+        </script>"""
+    
+    html += """
+            </div>
+        </div>
+"""
+    
+    # Render the report body
+    html += render_report_body(content)
+    
+    # Add Other Information section if provided and not already in content
+    if form_data and form_data.get('other_info') and form_data.get('other_info').strip():
+        other_info_content = form_data.get('other_info', '').strip()
+        # Check if Other Information section already exists in content
+        content_lower = content.lower()
+        if not any(keyword in content_lower for keyword in ['other information', 'additional client requirements', 'altre informazioni', 'requisiti aggiuntivi']):
+            # Add fallback Other Information section
+            if language == "it":
+                html += f"""
+        <h2>Altre Informazioni</h2>
+        <p>Il cliente ha fornito le seguenti informazioni aggiuntive che devono essere considerate nell'analisi:</p>
+        <div style="background: #f8f9fa; padding: 15px; border-left: 4px solid #007bff; margin: 15px 0;">
+            <p style="margin: 0; font-style: italic;">"{other_info_content}"</p>
+        </div>
+        <p>Queste informazioni dovrebbero essere integrate nell'analisi di mercato e nelle raccomandazioni strategiche.</p>
+"""
+            else:
+                html += f"""
+        <h2>Other Information</h2>
+        <p>The client has provided the following additional information that should be considered in the analysis:</p>
+        <div style="background: #f8f9fa; padding: 15px; border-left: 4px solid #007bff; margin: 15px 0;">
+            <p style="margin: 0; font-style: italic;">"{other_info_content}"</p>
+        </div>
+        <p>This information should be integrated into the market analysis and strategic recommendations.</p>
+"""
+    
+    # End HTML document
+    html += """        <div class="footer">
+            <div style="margin-bottom: 20px;">
+                <div style="display: flex; justify-content: center; align-items: center; gap: 15px; margin-bottom: 15px;">
+                    <img src="/static/logo_trade_on_chain.png" alt="TradeOnChain" style="height: 30px; width: auto; opacity: 0.8; border-radius: 9px;">
+                    <span style="font-size: 1.1em; color: #1e293b; font-weight: 600;">TradeOnChain</span>
+                </div>
+                <div style="font-size: 0.85em; color: #94a3b8; font-weight: 500; margin-bottom: 10px;">
+                    AI Trade Report • Professional Market Analysis
+                </div>
+            </div>
+            <p>""" + t['footer_text1'] + """</p>
+            <p>""" + t['footer_text2'] + """</p>
+        </div>
+    </div>
+    
+    <script src='""" + asset_url('js/report.js') + """'></script>
+</body>
+</html>"""
+    
+    return html
+
+
+def time_it(fn, repeat: int) -> list:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def compile_time(bytecode_dir: str) -> float:
+    """Load report.html into a fresh environment, as a new worker process would"""
+    env = Environment(loader=FileSystemLoader(str(ROOT / "templates")), autoescape=True,
+                      trim_blocks=True, lstrip_blocks=True,
+                      bytecode_cache=FileSystemBytecodeCache(bytecode_dir) if bytecode_dir else None)
+    start = time.perf_counter()
+    env.get_template("report.html")
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="0,5,20,100", help="comma-separated report sizes in KB")
+    parser.add_argument("--repeat", type=int, default=200, help="timed renders per implementation and size")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as bytecode_dir:
+        cold = statistics.median(compile_time("") for _ in range(20)) * 1000
+        compile_time(bytecode_dir)
+        warm = statistics.median(compile_time(bytecode_dir) for _ in range(20)) * 1000
+    print(f"import: template compile {cold:.2f} ms, from bytecode cache {warm:.2f} ms")
+    print()
+
+    print(f"{'size':>8} {'body ms':>9} {'legacy ms':>11} {'template ms':>13} {'shell legacy':>14} {'shell template':>16}")
+    for kb in (int(s) for s in args.sizes.split(",")):
+        content = build_report(kb, True)
+        body = min(time_it(lambda: render_report_body(content), args.repeat)) * 1000
+        legacy = min(time_it(lambda: legacy_create_html_document(content, "it", FORM_DATA), args.repeat)) * 1000
+        new = min(time_it(lambda: render_report_document(content, "it", FORM_DATA), args.repeat)) * 1000
+        print(f"{len(content) // 1024:>6}KB {body:9.3f} {legacy:11.3f} {new:13.3f} {legacy - body:14.3f} {new - body:16.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark product term autocomplete: the in-process term index and the
+SQLite FTS5 search against the ILIKE '%q%' query the endpoints used to run.
+
+Loads unique_terms.json (no database needed), builds
+services.term_index.TermIndex from it and copies the same rows into an
+in-memory SQLite table with the same B-tree index on term and the
+product_terms_fts table from services.term_fts. Queries are
+random substrings of real terms, grouped by length, plus a share of
+strings that match nothing. Each query is timed cold (the index's per-query
+result cache is disabled) for a first page of 20, as /api/select2-terms asks
+for; the ILIKE column includes the count() that endpoint also ran. FTS
+matches word prefixes only, so its hit counts are lower for queries cut
+from the middle of a word.
+
+Usage:
+    python benchmarks/bench_terms.py --lengths 2,3,4,6,8,12 --queries 300
+"""
+
+import argparse
+import json
+import random
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from services.term_fts import _FTS_DDL, _SEARCH_SQL, match_expression, search_params
+from services.term_index import TermIndex
+
+
+def percentile(samples: list, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+
+def make_queries(terms: list, length: int, count: int, rng: random.Random) -> list:
+    queries = []
+    while len(queries) < count:
+        if rng.random() < 0.1:
+            # No match: shuffled letters rarely occur in a real term
+            queries.append("".join(rng.choice("QXZJKV") for _ in range(length)))
+            continue
+        term = rng.choice(terms)
+        if len(term) < length:
+            continue
+        start = rng.randrange(len(term) - length + 1)
+        query = term[start:start + length]
+        if query.strip():
+            queries.append(query.lower() if rng.random() < 0.5 else query)
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--terms", default=str(ROOT / "unique_terms.json"), help="JSON list of terms")
+    parser.add_argument("--lengths", default="2,3,4,6,8,12", help="comma-separated query lengths")
+    parser.add_argument("--queries", type=int, default=300, help="queries per length")
+    parser.add_argument("--per-page", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with open(args.terms, encoding="utf-8") as f:
+        terms = list(dict.fromkeys(t.strip() for t in json.load(f) if t and t.strip()))
+    rows = [(i, term, None, None) for i, term in enumerate(terms, 1)]
+
+    index = TermIndex()
+    index.cache_size = 0
+    index.check_interval = 0
+    index.build_from_rows(rows)
+    stats = index.stats()
+    print(f"index: {stats['terms']} terms, {stats['prefix_keys']} prefix keys, "
+          f"{stats['grams']} bigrams and trigrams, built in {stats['build_seconds'] * 1000:.0f} ms")
+
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE product_terms (id INTEGER PRIMARY KEY, term VARCHAR(500) NOT NULL UNIQUE, description TEXT, category VARCHAR(100))")
+    db.execute("CREATE INDEX ix_product_terms_term ON product_terms (term)")
+    for statement in _FTS_DDL:
+        db.execute(statement)
+    db.executemany("INSERT INTO product_terms VALUES (?, ?, ?, ?)", rows)
+    db.commit()
+
+    def db_search(q: str):
+        # What SQLAlchemy's ilike() compiles to on SQLite, plus select2_terms' count()
+        pattern = f"%{q}%"
+        db.execute("SELECT count(*) FROM product_terms WHERE lower(term) LIKE lower(?)", (pattern,)).fetchone()
+        return db.execute("SELECT id, term, description, category FROM product_terms WHERE lower(term) LIKE lower(?) "
+                          "LIMIT ? OFFSET 0", (pattern, args.per_page + 1)).fetchall()
+
+    def fts_search(q: str):
+        match = match_expression(q)
+        if match is None:
+            return []
+        return db.execute(str(_SEARCH_SQL), search_params(q, args.per_page + 1)).fetchall()
+
+    rng = random.Random(args.seed)
+    print()
+    print(f"{'length':>6} {'hits/q':>7} {'index p50':>10} {'index p99':>10} {'fts hits/q':>11} {'fts p50':>8} {'fts p99':>8} "
+          f"{'ilike p50':>10} {'ilike p99':>10}   (ms)")
+    for length in (int(n) for n in args.lengths.split(",")):
+        queries = make_queries(terms, length, args.queries, rng)
+        index_times, fts_times, db_times, hits, fts_hits = [], [], [], 0, 0
+        for q in queries:
+            start = time.perf_counter()
+            results, _, _ = index.search(q, limit=args.per_page)
+            index_times.append(time.perf_counter() - start)
+            hits += len(results)
+            start = time.perf_counter()
+            fts_hits += min(len(fts_search(q)), args.per_page)
+            fts_times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            db_search(q)
+            db_times.append(time.perf_counter() - start)
+        print(f"{length:>6} {hits / len(queries):7.1f} {percentile(index_times, 0.5):10.3f} {percentile(index_times, 0.99):10.3f} "
+              f"{fts_hits / len(queries):11.1f} {percentile(fts_times, 0.5):8.3f} {percentile(fts_times, 0.99):8.3f} "
+              f"{percentile(db_times, 0.5):10.3f} {percentile(db_times, 0.99):10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Load test for the /generate endpoint against a local OpenAI-compatible stub.
+
+Starts a stub chat-completions server that sleeps before answering, starts the
+application with OPENAI_BASE_URL pointing at the stub, then fires N concurrent
+report generations while sampling /health latency. Each request has its own
+brand and bypasses the report cache, so all N really are in flight at once. If the LLM path blocks the
+event loop, /health latency grows with the stub delay; on the async path it
+stays flat.
+
+Usage:
+    python benchmarks/load_test_generate.py --concurrency 30 --delay 5
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+STUB_REPORT = """# Stub Market Report
+
+## Market Overview
+This report was produced by the load-test stub.
+
+| Country | TAM (Estimate) |
+|---------|----------------|
+| Germany | 100 EUR M |
+"""
+
+
+def build_stub_app(delay: float) -> Starlette:
+    """OpenAI chat-completions stub that answers after `delay` seconds"""
+    async def chat_completions(request: Request):
+        body = await request.json()
+        if body.get("stream"):
+            return StreamingResponse(stream_chunks(body.get("model", "stub")), media_type="text/event-stream")
+        await asyncio.sleep(delay)
+        return JSONResponse({
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": STUB_REPORT},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        })
+
+    async def stream_chunks(model: str):
+        # Spread the delay over one chunk per line, as a streaming model would
+        lines = STUB_REPORT.splitlines(keepends=True)
+        for line in lines:
+            await asyncio.sleep(delay / len(lines))
+            chunk = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": line}, "finish_reason": None}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return Starlette(routes=[Route("/v1/chat/completions", chat_completions, methods=["POST"])])
+
+
+async def start_server(app, port: int) -> uvicorn.Server:
+    """Serve `app` on the current event loop and wait until it accepts requests"""
+    # The app's lifespan installs process signal handlers and cancels every task on
+    # shutdown, which would take the load driver down with it; tables are created on import.
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False, lifespan="off")
+    server = uvicorn.Server(config)
+    server.task = asyncio.create_task(server.serve())
+    while not server.started:
+        if server.task.done():
+            raise RuntimeError(f"server on port {port} failed to start")
+        await asyncio.sleep(0.05)
+    return server
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(label: str, values):
+    if not values:
+        print(f"{label}: no samples")
+        return
+    print(
+        f"{label}: n={len(values)} "
+        f"p50={statistics.median(values) * 1000:.1f}ms "
+        f"p95={percentile(values, 95) * 1000:.1f}ms "
+        f"max={max(values) * 1000:.1f}ms"
+    )
+
+
+async def sample_health(client: httpx.AsyncClient, stop: asyncio.Event, interval: float):
+    latencies = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.get("/health")
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def run_load(app, args, token: str):
+    stub = await start_server(build_stub_app(args.delay), args.stub_port)
+    server = await start_server(app, args.app_port)
+    try:
+        return await drive_load(f"http://127.0.0.1:{args.app_port}", token, args.concurrency, args.interval, args.baseline)
+    finally:
+        for running in (server, stub):
+            running.should_exit = True
+            await running.task
+
+
+async def drive_load(base_url: str, token: str, concurrency: int, interval: float, baseline_seconds: float):
+    cookies = {"access_token": token}
+    form = {
+        "brand": "LoadTest",
+        "product": "Olive oil",
+        "budget": "100000",
+        "enterprise_size": "small",
+        "other_info": "",
+        "ai_model": "gpt-4o",
+        "language": "en",
+        # Every request must reach the stub: no report cache hits, no coalescing onto another request's call
+        "bypass_cache": "true",
+        "async_job": "false",
+    }
+    async with httpx.AsyncClient(base_url=base_url, cookies=cookies, timeout=900) as client:
+        # Baseline /health latency with no generations in flight
+        stop = asyncio.Event()
+        baseline_task = asyncio.create_task(sample_health(client, stop, interval))
+        await asyncio.sleep(baseline_seconds)
+        stop.set()
+        baseline = await baseline_task
+
+        # /health latency while N generations are in flight
+        async def generate(i: int):
+            started = time.perf_counter()
+            response = await client.post("/generate", data=dict(form, brand=f"LoadTest {i}"))
+            response.raise_for_status()
+            return time.perf_counter() - started, response.json().get("report_name")
+
+        stop = asyncio.Event()
+        load_task = asyncio.create_task(sample_health(client, stop, interval))
+        started = time.perf_counter()
+        results = await asyncio.gather(*(generate(i) for i in range(concurrency)))
+        wall = time.perf_counter() - started
+        stop.set()
+        under_load = await load_task
+
+    return baseline, under_load, results, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=20, help="number of concurrent /generate requests")
+    parser.add_argument("--delay", type=float, default=3.0, help="stub LLM latency in seconds")
+    parser.add_argument("--interval", type=float, default=0.05, help="seconds between /health samples")
+    parser.add_argument("--baseline", type=float, default=1.0, help="seconds of baseline sampling")
+    parser.add_argument("--stub-port", type=int, default=8765)
+    parser.add_argument("--app-port", type=int, default=8766)
+    parser.add_argument("--keep-reports", action="store_true", help="do not delete the generated report files")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="ai_trade_report_load_")
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.stub_port}/v1"
+    os.environ["OPENAI_API_KEY"] = "sk-load-test"
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/load_test.db"
+    os.chdir(ROOT)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    from app import app
+    from auth.auth import create_access_token, get_password_hash
+    from database.models import SessionLocal, User
+
+    db = SessionLocal()
+    user = User(
+        name="Load", surname="Test", email="load-test@example.com",
+        company_name="Load Test", hashed_password=get_password_hash("load-test"),
+    )
+    db.add(user)
+    db.commit()
+    token = create_access_token({"sub": str(user.id)})
+    db.close()
+
+    existing_reports = set(os.listdir("reports"))
+    baseline, under_load, results, wall = asyncio.run(run_load(app, args, token))
+
+    print(f"{args.concurrency} concurrent generations, stub delay {args.delay:.1f}s, wall time {wall:.2f}s")
+    summarize("/health baseline  ", baseline)
+    summarize("/health under load", under_load)
+    summarize("/generate         ", [duration for duration, _ in results])
+
+    if not args.keep_reports:
+        for name in set(os.listdir("reports")) - existing_reports:
+            os.remove(os.path.join("reports", name))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Load product terms from unique_terms.json into product_terms.
+
+The file is streamed, so it never has to fit in memory as one list. Each
+entry is either a term string or an object with "term" and optional
+"description" and "category". Terms are normalized (Unicode NFC, runs of
+whitespace collapsed, trimmed) and deduplicated case-insensitively, keeping
+the spelling already stored, else the first one in the file.
+
+Terms already in the table with the same description and category are
+skipped, so re-running after editing the file only writes what changed.
+New and changed terms are upserted with executemany in batches, all inside
+one transaction: a failed run leaves the table as it was. Afterwards the
+full-text index (if TERM_SEARCH_BACKEND=fts created one) is rebuilt and the
+planner statistics refreshed; running servers with the in-process term index
+notice the change within TERM_INDEX_CHECK_INTERVAL seconds.
+
+Usage:
+    python -m database.load_terms [unique_terms.json] [--batch-size 5000] [--dry-run]
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+import unicodedata
+from pathlib import Path
+from typing import Iterator, Optional
+
+from sqlalchemy import or_, select, text
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from database.models import ProductTerm, SessionLocal, create_tables, engine
+from services.term_fts import term_fts
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def iter_json_array(f, chunk_size: int = 1 << 16) -> Iterator[object]:
+    """Yield the items of a top-level JSON array one by one while reading the file in chunks"""
+    decoder = json.JSONDecoder()
+    buffer, position, eof = "", 0, False
+
+    def next_char() -> Optional[str]:
+        nonlocal buffer, position, eof
+        while True:
+            while position < len(buffer) and buffer[position].isspace():
+                position += 1
+            if position < len(buffer) or eof:
+                return buffer[position] if position < len(buffer) else None
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+
+    if next_char() != "[":
+        raise ValueError("expected a JSON array of terms")
+    position += 1
+    while True:
+        char = next_char()
+        if char is None:
+            raise ValueError("unexpected end of file inside the terms array")
+        if char == "]":
+            return
+        if char == ",":
+            position += 1
+            continue
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            item = end = None
+        if end is None or (end == len(buffer) and not eof):
+            # The item runs past the end of the buffer; read more and decode it again
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        position = end
+        yield item
+
+
+def normalize_term(term: str) -> str:
+    return _WHITESPACE_RE.sub(" ", unicodedata.normalize("NFC", term)).strip()
+
+
+def _optional_text(value) -> Optional[str]:
+    value = normalize_term(str(value)) if value is not None else ""
+    return value or None
+
+
+def _upsert_statement():
+    """INSERT ... ON CONFLICT (term) DO UPDATE, only when description or category actually differ"""
+    if engine.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        raise SystemExit(f"Upserts are not supported on {engine.dialect.name}")
+    table = ProductTerm.__table__
+    statement = insert(table)
+    return statement.on_conflict_do_update(
+        index_elements=[table.c.term],
+        set_={"description": statement.excluded.description, "category": statement.excluded.category},
+        where=or_(
+            table.c.description.is_distinct_from(statement.excluded.description),
+            table.c.category.is_distinct_from(statement.excluded.category),
+        ),
+    )
+
+
+def load_terms(path: str, batch_size: int = 5000, dry_run: bool = False) -> dict:
+    counts = {"read": 0, "duplicates": 0, "invalid": 0, "too_long": 0, "inserted": 0, "updated": 0, "unchanged": 0}
+    max_length = ProductTerm.__table__.c.term.type.length
+    started = time.perf_counter()
+
+    create_tables()
+    db = SessionLocal()
+    try:
+        # Keyed like the deduplication, so a different capitalization updates the stored term instead of adding one
+        existing = {term.casefold(): (term, description, category) for term, description, category in
+                    db.execute(select(ProductTerm.term, ProductTerm.description, ProductTerm.category))}
+        print(f"{len(existing)} terms already in product_terms")
+
+        statement = _upsert_statement()
+        seen = set()
+        batch = []
+
+        def flush():
+            if batch and not dry_run:
+                db.execute(statement, batch)
+            batch.clear()
+            elapsed = time.perf_counter() - started
+            print(f"  {counts['read']:>7} read, {counts['inserted']:>6} new, {counts['updated']:>6} changed "
+                  f"({counts['read'] / elapsed:,.0f} rows/s)")
+
+        with open(path, encoding="utf-8") as f:
+            for item in iter_json_array(f):
+                counts["read"] += 1
+                if isinstance(item, dict):
+                    raw_term, description, category = item.get("term"), item.get("description"), item.get("category")
+                else:
+                    raw_term, description, category = item, None, None
+                if not isinstance(raw_term, str) or not normalize_term(raw_term):
+                    counts["invalid"] += 1
+                    continue
+                term = normalize_term(raw_term)
+                if max_length and len(term) > max_length and engine.dialect.name != "sqlite":
+                    # SQLite does not enforce VARCHAR lengths; other databases would reject the whole batch
+                    counts["too_long"] += 1
+                    continue
+                key = term.casefold()
+                if key in seen:
+                    counts["duplicates"] += 1
+                    continue
+                seen.add(key)
+
+                values = (_optional_text(description), _optional_text(category))
+                current = existing.get(key)
+                if current is not None:
+                    term = current[0]
+                    if current[1:] == values:
+                        counts["unchanged"] += 1
+                        continue
+                counts["inserted" if current is None else "updated"] += 1
+                batch.append({"term": term, "description": values[0], "category": values[1]})
+                if len(batch) >= batch_size:
+                    flush()
+        flush()
+
+        if dry_run:
+            db.rollback()
+        else:
+            if counts["inserted"] or counts["updated"]:
+                term_fts.rebuild(db)
+            db.commit()
+            # Outside the transaction: refresh the planner's statistics for the new rows
+            with engine.begin() as conn:
+                conn.execute(text("ANALYZE"))
+    except BaseException:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    counts["seconds"] = round(time.perf_counter() - started, 2)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default=str(ROOT / "unique_terms.json"), help="JSON array of terms")
+    parser.add_argument("--batch-size", type=int, default=5000, help="rows per executemany batch")
+    parser.add_argument("--dry-run", action="store_true", help="report what would change without writing")
+    args = parser.parse_args()
+
+    counts = load_terms(args.path, batch_size=max(1, args.batch_size), dry_run=args.dry_run)
+    written = counts["inserted"] + counts["updated"]
+    print(f"{'Would write' if args.dry_run else 'Wrote'} {written} terms ({counts['inserted']} new, {counts['updated']} changed); "
+          f"{counts['unchanged']} unchanged, {counts['duplicates']} duplicates, {counts['invalid']} empty or invalid"
+          + (f", {counts['too_long']} too long" if counts["too_long"] else "")
+          + f" in {counts['seconds']}s ({counts['read'] / max(counts['seconds'], 0.001):,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import create_engine
@@ -62,6 +62,41 @@ class Report(Base):
     def __repr__(self):
         return f"<Report(id={self.id}, title='{self.title[:50]}...', user_id={self.user_id})>"
 
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(String(64), primary_key=True, index=True)
+    user_id = Column(Integer, nullable=True, index=True)
+    status = Column(String(20), nullable=False, default="queued", index=True)  # queued, processing, cancelling, completed, error, cancelled
+    progress = Column(Integer, default=0)
+    payload = Column(Text, nullable=False)  # JSON-encoded generation parameters
+    result = Column(Text, nullable=True)  # JSON-encoded redirect_url / report_name
+    error = Column(Text, nullable=True)
+    worker_id = Column(String(255), nullable=True)
+    attempts = Column(Integer, default=0)
+    heartbeat_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<Job(id={self.id}, status='{self.status}', user_id={self.user_id})>"
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (UniqueConstraint("user_id", "key", name="uq_idempotency_user_key"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    key = Column(String(255), nullable=False)
+    fingerprint = Column(String(64), nullable=False)  # Hash of the submitted form, to reject reused keys
+    job_id = Column(String(64), nullable=True)  # Set when the request was queued as a job
+    response = Column(Text, nullable=True)  # JSON-encoded response replayed for repeats
+    claimed_at = Column(DateTime, default=datetime.utcnow)  # When the request now holding the key took it
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f"<IdempotencyKey(user_id={self.user_id}, key='{self.key}', job_id={self.job_id})>"
+
 # Database configuration
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./ai_trade_report.db")
 
@@ -1,13 +1,28 @@
+import asyncio
 from dataclasses import dataclass
-from typing import Optional
+from typing import AsyncIterator, Optional
 from datetime import datetime
 import os
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
+from services.openai_clients import openai_clients
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Bump whenever build_prompt or RESEARCH_INSTRUCTIONS change, so cached reports are not reused
+PROMPT_TEMPLATE_VERSION = "1"
+
+# Prefix of the text returned instead of a report when the API call fails
+LLM_ERROR_PREFIX = "Error generating report:"
+
+# Extra attempts for a section group whose call failed, before the whole report fails
+SECTION_RETRIES = max(0, int(os.getenv("REPORT_SECTION_RETRIES", "1")))
+
+
+class SectionGenerationError(RuntimeError):
+    """A section group still failed after its retries; the report would be incomplete"""
+
 
 @dataclass
 class InputSpec:
@@ -250,18 +265,8 @@ IMPORTANT: You MUST include a dedicated section in your report titled "Additiona
 
     return f"{system_preamble}\n\n{user_instruction}"
 
-def call_openai_chat(prompt: str, model="gpt-5", temperature=0.0) -> str:
-    if OpenAI is None:
-        raise RuntimeError("openai package not installed")
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise RuntimeError("OPENAI_API_KEY environment variable not set")
-    
-    # Initialize OpenAI client with new API format
-    client = OpenAI(api_key=api_key)
-    
-    # Research task instructions for market analysis
-    research_instructions = """
+# Research task instructions for market analysis
+RESEARCH_INSTRUCTIONS = """
 You will be given a market analysis research task by a user. Your job is to produce a comprehensive 
 Strategic Market Analysis Report that will help with business expansion decisions. Complete the full 
 analysis with detailed research and actionable insights.
@@ -369,31 +374,148 @@ PROFESSIONAL REPORT FORMATTING REQUIREMENTS:
    - **Trade Agreements:** EU trade benefits vs. international trade agreements and tariffs
    - **Currency Considerations:** Euro stability vs. international currency risks
 """
+
+def _build_chat_params(prompt: str, model: str, temperature: float) -> dict:
+    """Build the chat completion parameters shared by the sync and async clients"""
+    messages = [
+        {"role": "system", "content": RESEARCH_INSTRUCTIONS},
+        {"role": "user", "content": prompt},
+    ]
+    
+    api_params = {
+        "model": model,
+        "messages": messages,
+    }
+    
+    # Add appropriate parameters based on model
+    if model == "gpt-5":
+        # GPT-5 only supports default temperature (1) and no custom token limits
+        pass  # Let GPT-5 use its default settings
+    else:
+        api_params["temperature"] = temperature
+        api_params["max_tokens"] = 4000
+    
+    return api_params
+
+def call_openai_chat(prompt: str, model="gpt-5", temperature=0.0) -> str:
+    if OpenAI is None:
+        raise RuntimeError("openai package not installed")
+    
+    # Reuse the pooled client so connections stay alive between reports
+    client = openai_clients.get_client()
     
     # Use the standard chat completion API
     try:
-        messages = [
-            {"role": "system", "content": research_instructions},
-            {"role": "user", "content": prompt},
-        ]
-        
-        api_params = {
-            "model": model,
-            "messages": messages,
-        }
-        
-        # Add appropriate parameters based on model
-        if model == "gpt-5":
-            # GPT-5 only supports default temperature (1) and no custom token limits
-            pass  # Let GPT-5 use its default settings
-        else:
-            api_params["temperature"] = temperature
-            api_params["max_tokens"] = 4000
+        response = client.chat.completions.create(**_build_chat_params(prompt, model, temperature))
+        return response.choices[0].message.content
         
-        response = client.chat.completions.create(**api_params)
+    except Exception as e:
+        print(f"OpenAI API error: {e}")
+        # Return a more helpful error message
+        return f"{LLM_ERROR_PREFIX} {str(e)}. Please try again or contact support."
+
+async def call_openai_chat_async(prompt: str, model="gpt-5", temperature=0.0) -> str:
+    """Awaitable variant of call_openai_chat that does not block the event loop"""
+    if AsyncOpenAI is None:
+        raise RuntimeError("openai package not installed")
+    client = openai_clients.get_async_client()
+    
+    try:
+        response = await client.chat.completions.create(**_build_chat_params(prompt, model, temperature))
         return response.choices[0].message.content
         
     except Exception as e:
         print(f"OpenAI API error: {e}")
         # Return a more helpful error message
-        return f"Error generating report: {str(e)}. Please try again or contact support."
+        return f"{LLM_ERROR_PREFIX} {str(e)}. Please try again or contact support."
+
+async def stream_openai_chat_async(prompt: str, model="gpt-5", temperature=0.0) -> AsyncIterator[str]:
+    """Yield the report text chunk by chunk as the model produces it"""
+    if AsyncOpenAI is None:
+        raise RuntimeError("openai package not installed")
+    client = openai_clients.get_async_client()
+    
+    stream = await client.chat.completions.create(stream=True, **_build_chat_params(prompt, model, temperature))
+    try:
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        # Closing the stream releases the upstream connection even if the consumer stops early
+        await stream.close()
+
+# Report sections in canonical order, grouped for parallel generation.
+# Groups are merged in this order regardless of which call finishes first.
+REPORT_SECTION_GROUPS = [
+    ["Executive Summary"],
+    ["Market Overview", "Target Market Analysis"],
+    ["Competitive Landscape", "Regulatory Environment"],
+    ["Consumer Analysis", "Distribution Channels"],
+    ["Financial Projections", "Risk Assessment"],
+    ["Strategic Recommendations", "Implementation Plan"],
+    ["Sources & References"],
+]
+
+CLIENT_REQUIREMENTS_SECTION = "Additional Client Requirements"
+
+def section_groups_for(spec: InputSpec) -> list:
+    """Section groups for a spec; the client requirements section goes before the references"""
+    groups = [list(group) for group in REPORT_SECTION_GROUPS]
+    if spec.other_info and spec.other_info.strip():
+        groups.insert(len(groups) - 1, [CLIENT_REQUIREMENTS_SECTION])
+    return groups
+
+def build_section_prompt(prompt: str, sections: list) -> str:
+    """Append a section assignment to the shared report prompt"""
+    section_list = "\n".join(f"- {section}" for section in sections)
+    return (
+        f"{prompt}\n"
+        "**SECTION ASSIGNMENT:**\n"
+        "This report is being written in parts, in parallel. Write ONLY the following section(s), "
+        "in this order, each starting with its heading as bold text on its own line (for example **Market Overview**):\n"
+        f"{section_list}\n"
+        "Do NOT write a title page, an introduction, a conclusion or any other section. "
+        "Other sections are written separately and will be merged with yours.\n"
+    )
+
+async def _generate_section_group(prompt: str, group: list, model: str, temperature: float) -> str:
+    """One section group's text, retried up to SECTION_RETRIES times; raises SectionGenerationError"""
+    for attempt in range(SECTION_RETRIES + 1):
+        text = await call_openai_chat_async(build_section_prompt(prompt, group), model=model, temperature=temperature)
+        if text and not text.startswith(LLM_ERROR_PREFIX):
+            return text.strip()
+        print(f"Section group {group} failed (attempt {attempt + 1} of {SECTION_RETRIES + 1}): {text}")
+    raise SectionGenerationError(f"section {', '.join(group)} could not be generated ({text or 'empty response'})")
+
+async def iter_openai_chat_sections_async(prompt: str, sections: list, model="gpt-5", temperature=0.0) -> AsyncIterator[str]:
+    """Generate every section group concurrently and yield their texts in canonical order.
+
+    Each group is yielded as soon as it and all groups before it are done. A
+    group whose call fails is retried; if it still fails, SectionGenerationError
+    is raised and the remaining calls are cancelled, so a report is never
+    produced with sections missing.
+    """
+    tasks = [
+        asyncio.ensure_future(_generate_section_group(prompt, group, model, temperature))
+        for group in sections
+    ]
+    try:
+        for task in tasks:
+            yield await task
+    finally:
+        # Stop outstanding section calls if the consumer goes away early or a group failed
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+async def call_openai_chat_sections_async(prompt: str, sections: list, model="gpt-5", temperature=0.0) -> str:
+    """Section-parallel variant of call_openai_chat_async; latency is that of the slowest group.
+
+    Like call_openai_chat_async, a failure comes back as error text (LLM_ERROR_PREFIX), never
+    as a report with sections missing.
+    """
+    try:
+        texts = [text async for text in iter_openai_chat_sections_async(prompt, sections, model=model, temperature=temperature)]
+    except SectionGenerationError as e:
+        return f"{LLM_ERROR_PREFIX} {e}. Please try again or contact support."
+    return "\n\n".join(texts)
@@ -0,0 +1,121 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Recent tasks kept per executor for the latency percentiles on /status
+_SAMPLE_SIZE = 500
+
+
+def _timed_call(fn: Callable, args: tuple):
+    """Run fn in the worker and report when it started; wall-clock time so it works across processes"""
+    started_at = time.time()
+    return started_at, fn(*args)
+
+
+def _percentile(samples, fraction: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 2)
+
+
+class InstrumentedExecutor:
+    """A thread or process pool that coroutines can await, with queue and latency metrics.
+
+    Every task records how long it waited for a free worker and how long it
+    ran, so /status shows rendering and file I/O separately from LLM time.
+    The pool is created on first use; a process pool that breaks (a worker
+    was killed) is replaced on the next submission.
+    """
+
+    def __init__(self, name: str, kind: str, max_workers: int):
+        self.name = name
+        self.kind = kind
+        self.max_workers = max(1, max_workers)
+        self._pool: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self._waits = deque(maxlen=_SAMPLE_SIZE)
+        self._runs = deque(maxlen=_SAMPLE_SIZE)
+
+    def _get_pool(self) -> Executor:
+        with self._lock:
+            if self._pool is None:
+                if self.kind == "process":
+                    # Spawned, not forked: the server process has threads and an event loop running
+                    self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+                else:
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+            return self._pool
+
+    async def run(self, fn: Callable, *args):
+        """Run fn(*args) on the pool and return its result without blocking the event loop"""
+        submitted_at = time.time()
+        with self._lock:
+            self.submitted += 1
+            self.in_flight += 1
+        try:
+            started_at, result = await asyncio.get_running_loop().run_in_executor(self._get_pool(), _timed_call, fn, args)
+        except BrokenProcessPool:
+            with self._lock:
+                self.failed += 1
+            self.shutdown()
+            raise
+        except BaseException:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        finished_at = time.time()
+        with self._lock:
+            self.completed += 1
+            self._waits.append(max(0.0, started_at - submitted_at))
+            self._runs.append(max(0.0, finished_at - started_at))
+        return result
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = list(self._waits)
+            runs = list(self._runs)
+            return {
+                "kind": self.kind,
+                "workers": self.max_workers,
+                "in_flight": self.in_flight,
+                # Tasks beyond the worker count are waiting in the pool's queue
+                "queued": max(0, self.in_flight - self.max_workers),
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "queue_wait_ms_p50": _percentile(waits, 0.5),
+                "queue_wait_ms_p95": _percentile(waits, 0.95),
+                "run_ms_p50": _percentile(runs, 0.5),
+                "run_ms_p95": _percentile(runs, 0.95),
+            }
+
+
+# Create global instances
+# File and database writes that would otherwise run on the event loop
+io_executor = InstrumentedExecutor("io", "thread", int(os.getenv("IO_EXECUTOR_WORKERS", "8")))
+# CPU-heavy rendering: report pages and PDFs
+render_executor = InstrumentedExecutor("render", "process", int(os.getenv("RENDER_EXECUTOR_WORKERS", "2")))
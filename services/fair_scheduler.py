@@ -0,0 +1,174 @@
+import heapq
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from database.models import SessionLocal, User
+
+load_dotenv()
+
+# Virtual time a job of weight 1 costs its flow; only the ratio between weights matters
+STRIDE = 1000.0
+
+
+class FairShareScheduler:
+    """Orders queued report jobs by weighted fair share between users.
+
+    Each flow (a user, or a company when FAIR_SHARE_KEY=company) has a pass
+    value that advances by STRIDE / weight every time one of its jobs starts;
+    the next job comes from the flow with the lowest pass, oldest job first,
+    so a flow with weight 2 gets twice the starts of a flow with weight 1
+    while both have work queued. Flows that were idle rejoin at the current
+    virtual time instead of cashing in the share they did not use.
+
+    Priority classes (FAIR_SHARE_CLASS_ORDER, highest first) are strict: jobs
+    in a lower class only start when no higher class job can. A flow is also
+    held back while it already runs FAIR_SHARE_MAX_RUNNING jobs (0 disables
+    the cap). Weights and classes are keyed by user id, email or company name.
+    """
+
+    def __init__(self):
+        self.key = os.getenv("FAIR_SHARE_KEY", "user")
+        self.weights: Dict[str, float] = json.loads(os.getenv("FAIR_SHARE_WEIGHTS", "{}"))
+        self.classes: Dict[str, str] = json.loads(os.getenv("FAIR_SHARE_PRIORITY_CLASSES", "{}"))
+        self.class_order: List[str] = [c.strip() for c in os.getenv("FAIR_SHARE_CLASS_ORDER", "high,normal,low").split(",") if c.strip()]
+        self.default_class = os.getenv("FAIR_SHARE_DEFAULT_CLASS", "normal")
+        self.max_running = int(os.getenv("FAIR_SHARE_MAX_RUNNING", "2"))
+        self._lock = threading.Lock()
+        self._users: Dict[int, tuple] = {}
+        self._pass: Dict[str, float] = {}
+        self._running: Dict[str, int] = {}
+        self._started: Dict[str, int] = {}
+        self._vtime = 0.0
+
+    def _user(self, user_id: Optional[int]) -> tuple:
+        """(email, company_name) for a user, cached for the life of the process"""
+        if user_id is None:
+            return "", ""
+        user = self._users.get(user_id)
+        if user is None:
+            db = SessionLocal()
+            try:
+                row = db.query(User.email, User.company_name).filter(User.id == user_id).first()
+            finally:
+                db.close()
+            user = (row.email, row.company_name) if row else ("", "")
+            self._users[user_id] = user
+        return user
+
+    def _lookup(self, table: dict, user_id: Optional[int], default):
+        email, company = self._user(user_id)
+        for name in (str(user_id), email, company):
+            if name and name in table:
+                return table[name]
+        return default
+
+    def flow(self, job: dict) -> str:
+        """The fair-share flow a job belongs to"""
+        if self.key == "company":
+            company = self._user(job["user_id"])[1]
+            if company:
+                return f"company:{company}"
+        return f"user:{job['user_id']}"
+
+    def weight(self, job: dict) -> float:
+        return max(float(self._lookup(self.weights, job["user_id"], 1)), 0.001)
+
+    def priority_class(self, job: dict) -> str:
+        return self._lookup(self.classes, job["user_id"], self.default_class)
+
+    def _class_rank(self, name: str) -> int:
+        return self.class_order.index(name) if name in self.class_order else len(self.class_order)
+
+    def order(self, jobs: List[dict], include_held: bool = False) -> List[dict]:
+        """Return queued jobs in the order they would start.
+
+        Jobs from flows at their running cap are left out unless include_held,
+        in which case they follow the runnable jobs.
+        """
+        with self._lock:
+            flows: Dict[str, list] = {}
+            for job in sorted(jobs, key=lambda j: j["created_at"]):
+                flows.setdefault(self.flow(job), []).append(job)
+
+            passes = {flow: max(self._pass.get(flow, 0.0), self._vtime) for flow in flows}
+            heap = []
+            held = []
+            for flow, queue in flows.items():
+                if self.max_running and self._running.get(flow, 0) >= self.max_running:
+                    held.extend(queue)
+                    continue
+                head = queue[0]
+                heapq.heappush(heap, (self._class_rank(self.priority_class(head)), passes[flow], head["created_at"], flow))
+
+            ordered = []
+            while heap:
+                _, _, _, flow = heapq.heappop(heap)
+                queue = flows[flow]
+                job = queue.pop(0)
+                ordered.append(job)
+                passes[flow] += STRIDE / self.weight(job)
+                if queue:
+                    head = queue[0]
+                    heapq.heappush(heap, (self._class_rank(self.priority_class(head)), passes[flow], head["created_at"], flow))
+            return ordered + held if include_held else ordered
+
+    def started(self, job: dict):
+        """Charge a job's flow when a worker starts it"""
+        flow = self.flow(job)
+        with self._lock:
+            start = max(self._pass.get(flow, 0.0), self._vtime)
+            self._vtime = start
+            self._pass[flow] = start + STRIDE / self.weight(job)
+            self._running[flow] = self._running.get(flow, 0) + 1
+            self._started[flow] = self._started.get(flow, 0) + 1
+
+    def finished(self, job: dict):
+        flow = self.flow(job)
+        with self._lock:
+            self._running[flow] = max(self._running.get(flow, 0) - 1, 0)
+
+    def snapshot(self, queued: List[dict]) -> dict:
+        """Queue order and per-flow shares for admin introspection"""
+        order = self.order(queued, include_held=True)
+        with self._lock:
+            total_started = sum(self._started.values())
+            flows = set(self._pass) | {self.flow(job) for job in queued}
+            shares = {}
+            for flow in sorted(flows):
+                jobs = [job for job in queued if self.flow(job) == flow]
+                sample = jobs[0] if jobs else None
+                shares[flow] = {
+                    "queued": len(jobs),
+                    "running": self._running.get(flow, 0),
+                    "started": self._started.get(flow, 0),
+                    "share": round(self._started.get(flow, 0) / total_started, 3) if total_started else 0.0,
+                    "pass": round(self._pass.get(flow, 0.0), 1),
+                    "weight": self.weight(sample) if sample else None,
+                    "priority_class": self.priority_class(sample) if sample else None,
+                }
+            held = {flow for flow in flows if self.max_running and self._running.get(flow, 0) >= self.max_running}
+        return {
+            "key": self.key,
+            "virtual_time": round(self._vtime, 1),
+            "max_running_per_flow": self.max_running,
+            "queue": [
+                {
+                    "job_id": job["id"],
+                    "flow": self.flow(job),
+                    "priority_class": self.priority_class(job),
+                    "model": job["payload"].get("ai_model"),
+                    "created_at": job["created_at"].isoformat(),
+                    "held": self.flow(job) in held,
+                }
+                for job in order
+            ],
+            "flows": shares,
+        }
+
+
+# Create global instance
+fair_scheduler = FairShareScheduler()
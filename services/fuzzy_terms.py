@@ -0,0 +1,287 @@
+import heapq
+import os
+import re
+import threading
+import time
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+
+from database.models import ProductTerm, SessionLocal
+from services.term_index import TermRow, table_signature
+
+load_dotenv()
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Words are indexed by the deletes of their first few characters only (SymSpell's
+# prefix length): far fewer keys, and candidates are verified on the whole word anyway
+_PREFIX_LENGTH = 6
+# Query words shorter than this are too ambiguous to correct
+_MIN_WORD_LENGTH = 3
+
+
+def fold_accents(text: str) -> str:
+    """Case- and accent-insensitive form: "Gruyère" and "GRUYERE" both become "gruyere\""""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+
+
+def _max_distance(word: str) -> int:
+    return 1 if len(word) <= 4 else 2
+
+
+def _delete_levels(word: str, distance: int) -> List[Set[str]]:
+    """Strings made by deleting 0, 1, ... up to `distance` characters from word, one set per count"""
+    levels = [{word}]
+    for _ in range(distance):
+        levels.append({w[:i] + w[i + 1:] for w in levels[-1] for i in range(len(w))})
+    return levels
+
+
+def edit_distance(a: str, b: str, limit: int, prefix: bool = False) -> int:
+    """Optimal string alignment distance between a and b (insertions, deletions,
+    substitutions and adjacent transpositions), capped at limit + 1.
+
+    With prefix=True it is the distance from a to the closest prefix of b.
+    Only cells within `limit` of the diagonal are computed, and the
+    computation stops once every cell in a row exceeds the limit.
+    """
+    over = limit + 1
+    if prefix:
+        # Prefixes longer than this are more than `limit` insertions away
+        b = b[:len(a) + limit]
+    elif abs(len(a) - len(b)) > limit:
+        return over
+    n, m = len(a), len(b)
+    before = None
+    previous = [j if j <= limit else over for j in range(m + 1)]
+    for i in range(1, n + 1):
+        current = [over] * (m + 1)
+        if i <= limit:
+            current[0] = i
+        low, high = max(1, i - limit), min(m, i + limit)
+        a_char = a[i - 1]
+        for j in range(low, high + 1):
+            b_char = b[j - 1]
+            value = previous[j - 1] + (a_char != b_char)
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            if i > 1 and j > 1 and a_char == b[j - 2] and a[i - 2] == b_char and before[j - 2] + 1 < value:
+                value = before[j - 2] + 1
+            current[j] = value if value < over else over
+        if min(current) > limit:
+            return over
+        before, previous = previous, current
+    return min(previous) if prefix else previous[m]
+
+
+class _Vocabulary:
+    """Immutable snapshot of the term words and their delete keys, built in one pass"""
+
+    def __init__(self, rows: Iterable[TermRow]):
+        # Terms in rank order (shorter first, then alphabetical); everything below refers to them by position
+        self.rows: List[TermRow] = sorted((tuple(row) for row in rows), key=lambda row: (len(row[1]), fold_accents(row[1]), row[0]))
+        postings: Dict[str, List[int]] = {}
+        for ordinal, row in enumerate(self.rows):
+            for word in set(_TOKEN_RE.findall(fold_accents(row[1]))):
+                postings.setdefault(word, []).append(ordinal)
+        self.words: List[str] = list(postings)
+        self.word_ids: Dict[str, int] = {word: word_id for word_id, word in enumerate(self.words)}
+        self.postings: List[Tuple[int, ...]] = [tuple(postings[word]) for word in self.words]
+
+        deletes: Dict[str, List[int]] = {}
+        for word_id, word in enumerate(self.words):
+            if len(word) < _MIN_WORD_LENGTH:
+                continue
+            for level in _delete_levels(word[:_PREFIX_LENGTH], _max_distance(word)):
+                for key in level:
+                    deletes.setdefault(key, []).append(word_id)
+        self.deletes: Dict[str, Tuple[int, ...]] = {key: tuple(word_ids) for key, word_ids in deletes.items()}
+        self.signature = (len(self.rows), max((row[0] for row in self.rows), default=0),
+                          sum(len(row[1]) for row in self.rows))
+
+    def similar_words(self, token: str, prefix: bool = False) -> Dict[int, int]:
+        """Vocabulary words closest to token, as word id -> edit distance.
+
+        With prefix=True a word may also match by its first len(token)
+        characters, for a word still being typed.
+        """
+        limit = _max_distance(token)
+        exact = self.word_ids.get(token)
+        if exact is not None and not prefix:
+            return {exact: 0}
+        # Candidates sharing a key with fewer deletes tend to be closer: check them first so the bound tightens early
+        candidates: Dict[int, None] = {}
+        for level in _delete_levels(token[:_PREFIX_LENGTH], limit):
+            for key in level:
+                candidates.update(dict.fromkeys(self.deletes.get(key, ())))
+        best = limit
+        found: Dict[int, int] = {}
+        for word_id in candidates:
+            word = self.words[word_id]
+            if prefix and word.startswith(token):
+                distance = 0
+            elif best == 0:
+                continue
+            else:
+                distance = edit_distance(token, word, best, prefix=prefix)
+            if distance < best:
+                # Closer than anything so far: only the closest words are kept
+                best = distance
+                found = {}
+            if distance <= best:
+                found[word_id] = distance
+        return found
+
+    def search(self, q: str, limit: int) -> List[Tuple[TermRow, int]]:
+        tokens = _TOKEN_RE.findall(fold_accents(q))
+        scores: Optional[Dict[int, int]] = None
+        for position, token in enumerate(tokens):
+            if len(token) < _MIN_WORD_LENGTH:
+                continue
+            per_term: Dict[int, int] = {}
+            for word_id, distance in self.similar_words(token, prefix=position == len(tokens) - 1).items():
+                for ordinal in self.postings[word_id]:
+                    if distance < per_term.get(ordinal, distance + 1):
+                        per_term[ordinal] = distance
+            if scores is None:
+                scores = per_term
+            else:
+                scores = {ordinal: total + per_term[ordinal] for ordinal, total in scores.items() if ordinal in per_term}
+            if not scores:
+                return []
+        if not scores:
+            return []
+        best = heapq.nsmallest(limit, scores.items(), key=lambda item: (item[1], item[0]))
+        return [(self.rows[ordinal], distance) for ordinal, distance in best]
+
+
+class FuzzyTermMatcher:
+    """Typo-tolerant lookup of product terms, for when a search finds nothing.
+
+    Works on words, since terms are phrases: every distinct word of every
+    term is indexed SymSpell-style, by the strings left after deleting up to
+    two characters from its first _PREFIX_LENGTH characters (one for words
+    of four characters or fewer). A query word is looked up by its own
+    deletes, so candidates come from dictionary hits rather than a scan of
+    the vocabulary, and each is then checked with a banded edit distance
+    that counts adjacent transpositions as one edit. Only the closest
+    candidates are kept for each query word, and the last query word may
+    also match the start of a longer word, since it is often still being
+    typed ("bovin" -> BOVINE, "hieffers" -> HEIFERS). Matching is case and
+    accent insensitive ("gruyere" -> GRUYÈRE).
+
+    A term matches when every query word of at least three characters
+    matches one of its words. Terms are ranked by total edit distance, then
+    shorter terms first, then alphabetically.
+
+    Built from product_terms on first use (or at startup). Like the term
+    index, it compares the table signature every TERM_INDEX_CHECK_INTERVAL
+    seconds, and rebuilds in the background when the table has changed.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("FUZZY_TERMS_ENABLED", "true").lower() == "true"
+        self.check_interval = float(os.getenv("TERM_INDEX_CHECK_INTERVAL", "30"))
+        self._build_lock = threading.Lock()
+        self._vocabulary: Optional[_Vocabulary] = None
+        self._checked_at = 0.0
+        self._rebuilding = False
+        self.built_at: Optional[float] = None
+        self.build_seconds: Optional[float] = None
+        self.searches = 0
+        self.matched = 0
+
+    @property
+    def ready(self) -> bool:
+        return self._vocabulary is not None
+
+    # Building
+
+    def build_from_rows(self, rows: Iterable[TermRow]):
+        """Replace the vocabulary with rows of (id, term, description, category)"""
+        started = time.perf_counter()
+        # Searches hold on to the snapshot they started with, so swapping it needs no lock
+        self._vocabulary = _Vocabulary(rows)
+        self._checked_at = time.monotonic()
+        self.built_at = time.time()
+        self.build_seconds = round(time.perf_counter() - started, 3)
+
+    def build(self):
+        """Load every product term from the database and rebuild the vocabulary"""
+        with self._build_lock:
+            self._load()
+
+    def _load(self):
+        db = SessionLocal()
+        try:
+            rows = db.query(ProductTerm.id, ProductTerm.term, ProductTerm.description, ProductTerm.category).all()
+        finally:
+            db.close()
+        self.build_from_rows(rows)
+        print(f"Fuzzy term matcher built: {len(self._vocabulary.words)} words from {len(rows)} terms in {self.build_seconds}s")
+
+    def _rebuild_in_background(self):
+        if self._rebuilding:
+            return
+        self._rebuilding = True
+
+        def run():
+            try:
+                self.build()
+            except Exception as e:
+                print(f"Error rebuilding fuzzy term matcher: {e}")
+            finally:
+                self._rebuilding = False
+
+        threading.Thread(target=run, name="fuzzy-terms-rebuild", daemon=True).start()
+
+    def ensure_current(self):
+        """Build on first use; later, rebuild in the background if product_terms changed"""
+        if not self.ready:
+            with self._build_lock:
+                if not self.ready:
+                    self._load()
+            return
+        if self.check_interval <= 0 or time.monotonic() - self._checked_at < self.check_interval:
+            return
+        self._checked_at = time.monotonic()
+        try:
+            signature = table_signature()
+        except Exception as e:
+            print(f"Warning: Could not check product_terms for changes: {e}")
+            return
+        if signature != self._vocabulary.signature:
+            self._rebuild_in_background()
+
+    # Searching
+
+    def search(self, q: str, limit: int = 20) -> List[Tuple[TermRow, int]]:
+        """Terms close to q with their total edit distance, best first"""
+        self.ensure_current()
+        self.searches += 1
+        matches = self._vocabulary.search(q, max(0, limit))
+        if matches:
+            self.matched += 1
+        return matches
+
+    def stats(self) -> dict:
+        vocabulary = self._vocabulary
+        return {
+            "enabled": self.enabled,
+            "terms": len(vocabulary.rows) if vocabulary else 0,
+            "words": len(vocabulary.words) if vocabulary else 0,
+            "delete_keys": len(vocabulary.deletes) if vocabulary else 0,
+            "built_at": self.built_at,
+            "build_seconds": self.build_seconds,
+            "searches": self.searches,
+            "matched": self.matched,
+        }
+
+
+# Create global instance
+fuzzy_terms = FuzzyTermMatcher()
@@ -0,0 +1,209 @@
+import gzip
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip alone is always available
+    brotli = None
+
+# Preferred first when the client accepts several
+ENCODINGS = ("br", "gzip") if brotli else ("gzip",)
+ENCODING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def compress_variants(data: bytes) -> Dict[str, bytes]:
+    """Encoded copies of data for every encoding this server can send"""
+    variants = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli:
+        variants["br"] = brotli.compress(data, quality=11)
+    return variants
+
+
+def write_compressed_variants(path: str):
+    """Store path.gz (and path.br) next to a file so it can be served without compressing per request"""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        for encoding, encoded in compress_variants(data).items():
+            tmp_path = f"{path}{ENCODING_SUFFIXES[encoding]}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(encoded)
+            os.replace(tmp_path, f"{path}{ENCODING_SUFFIXES[encoding]}")
+    except OSError as e:
+        print(f"Warning: Could not write compressed copies of {path}: {e}")
+
+
+def negotiate_encoding(accept_encoding: str, available: Iterable[str]) -> Optional[str]:
+    """Pick the best encoding in `available` that Accept-Encoding allows, or None for identity"""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        match = re.search(r"q=([0-9.]+)", params)
+        if match:
+            try:
+                quality = float(match.group(1))
+            except ValueError:
+                quality = 0.0
+        accepted[name] = quality
+    available = set(available)
+    for encoding in ENCODINGS:
+        if encoding in available and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def _etag_matches(header: str, etags: Iterable[str]) -> bool:
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as If-None-Match requires
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return any(etag in candidates for etag in etags)
+
+
+def is_not_modified(request: Request, etags: Iterable[str], last_modified: Optional[float]) -> bool:
+    """True if the client's cached copy is current; If-None-Match wins over If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etags)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single byte range into [start, end); None means serve the whole body.
+
+    Multiple ranges and malformed headers fall back to a full response,
+    which RFC 9110 allows.
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match or (not match.group(1) and not match.group(2)):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last) + 1, size) if last else size
+        if last and int(last) < start:
+            return None
+    else:
+        start = max(size - int(last), 0)
+        end = size
+    if start >= size or start >= end:
+        raise RangeNotSatisfiable()
+    return start, end
+
+
+_NOT_MODIFIED_HEADERS = ("cache-control", "content-location", "etag", "expires", "last-modified", "vary")
+
+
+def _not_modified(headers: dict) -> Response:
+    return Response(status_code=304, headers={k: v for k, v in headers.items() if k.lower() in _NOT_MODIFIED_HEADERS})
+
+
+def _use_range(request: Request, etag: str, last_modified: Optional[float]) -> bool:
+    if_range = request.headers.get("if-range")
+    if if_range is None:
+        return True
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return if_range == etag
+    return last_modified is not None and if_range == formatdate(last_modified, usegmt=True)
+
+
+def cached_bytes_response(request: Request, body: bytes, etag: str, media_type: str,
+                          variants: Optional[Dict[str, bytes]] = None, last_modified: Optional[float] = None,
+                          headers: Optional[dict] = None) -> Response:
+    """Serve an in-memory body with validators, content negotiation and single-range support"""
+    variants = variants or {}
+    base = dict(headers or {})
+    base["ETag"] = etag
+    base["Accept-Ranges"] = "bytes"
+    if variants:
+        base["Vary"] = "Accept-Encoding"
+    if last_modified is not None:
+        base["Last-Modified"] = formatdate(last_modified, usegmt=True)
+
+    encoding = negotiate_encoding(request.headers.get("accept-encoding", ""), variants)
+    encoded_etags = [f'{etag[:-1]}-{name}"' for name in variants]
+    if is_not_modified(request, [etag, *encoded_etags], last_modified):
+        if encoding:
+            base["ETag"] = f'{etag[:-1]}-{encoding}"'
+        return _not_modified(base)
+
+    range_header = request.headers.get("range")
+    if range_header and _use_range(request, etag, last_modified):
+        try:
+            byte_range = parse_range(range_header, len(body))
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{len(body)}"})
+        if byte_range:
+            start, end = byte_range
+            base["Content-Range"] = f"bytes {start}-{end - 1}/{len(body)}"
+            return Response(body[start:end], status_code=206, media_type=media_type, headers=base)
+
+    if encoding:
+        # Each representation needs its own strong validator
+        base["ETag"] = f'{etag[:-1]}-{encoding}"'
+        base["Content-Encoding"] = encoding
+        return Response(variants[encoding], media_type=media_type, headers=base)
+    return Response(body, media_type=media_type, headers=base)
+
+
+def cached_file_response(request: Request, path: str, media_type: str, filename: Optional[str] = None,
+                         headers: Optional[dict] = None) -> Response:
+    """FileResponse plus 304s and precompressed path.gz / path.br siblings.
+
+    Range requests always get the identity file; FileResponse handles them
+    (including If-Range) with the same ETag used here.
+    """
+    stat_result = os.stat(path)
+    response = FileResponse(path, media_type=media_type, filename=filename, stat_result=stat_result, headers=headers)
+    etag = response.headers["etag"]
+
+    siblings = {}
+    for encoding, suffix in ENCODING_SUFFIXES.items():
+        try:
+            sibling_stat = os.stat(path + suffix)
+        except OSError:
+            continue
+        if sibling_stat.st_mtime >= stat_result.st_mtime:
+            siblings[encoding] = (path + suffix, sibling_stat)
+    if siblings:
+        response.headers["Vary"] = "Accept-Encoding"
+
+    encoding = None if "range" in request.headers else negotiate_encoding(request.headers.get("accept-encoding", ""), siblings)
+    encoded_etags = [f'{etag[:-1]}-{name}"' for name in siblings]
+    if is_not_modified(request, [etag, *encoded_etags], stat_result.st_mtime):
+        not_modified = _not_modified(dict(response.headers))
+        if encoding:
+            not_modified.headers["ETag"] = f'{etag[:-1]}-{encoding}"'
+        return not_modified
+
+    if encoding:
+        encoded_path, encoded_stat = siblings[encoding]
+        encoded = FileResponse(encoded_path, media_type=media_type, filename=filename, stat_result=encoded_stat, headers=headers)
+        encoded.headers["ETag"] = f'{etag[:-1]}-{encoding}"'
+        encoded.headers["Last-Modified"] = response.headers["last-modified"]
+        encoded.headers["Content-Encoding"] = encoding
+        encoded.headers["Vary"] = "Accept-Encoding"
+        return encoded
+    return response
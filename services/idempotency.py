@@ -0,0 +1,157 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+
+from database.models import IdempotencyKey, SessionLocal
+
+load_dotenv()
+
+
+class IdempotencyStore:
+    """Remembers client-supplied idempotency keys for report submissions.
+
+    The first request with a key inserts a row (the unique (user_id, key)
+    constraint decides the winner across processes) and later records either
+    the job it queued or the response it returned. Repeats with the same key
+    get that job or response back instead of generating the report again.
+    Failed requests release their key so the client can retry for real.
+    A request that died without releasing its key (a crashed process) leaves
+    it pending; after IDEMPOTENCY_LEASE_SECONDS a repeat takes the claim over.
+    Keys expire after IDEMPOTENCY_TTL_HOURS.
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self.ttl = timedelta(hours=float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24")))
+        self.wait_interval = float(os.getenv("IDEMPOTENCY_WAIT_INTERVAL", "1"))
+        # Longer than the 15-minute request timeout, so a live request never loses its claim
+        self.lease = timedelta(seconds=float(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "960")))
+        self._last_purge = 0.0
+        self.replays = 0
+
+    @staticmethod
+    def fingerprint(params: dict) -> str:
+        return hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def begin(self, user_id: int, key: str, fingerprint: str) -> Tuple[Optional[dict], bool]:
+        """Claim key for a new request; returns (existing record, False) if it was already used"""
+        self._purge_expired()
+        db = self.session_factory()
+        try:
+            db.add(IdempotencyKey(user_id=user_id, key=key, fingerprint=fingerprint))
+            db.commit()
+            return None, True
+        except IntegrityError:
+            db.rollback()
+        finally:
+            db.close()
+        if self._take_over(user_id, key, fingerprint):
+            return None, True
+        record = self.get(user_id, key)
+        if record is None:
+            # Released or expired between the insert and the read; claim it again
+            return self.begin(user_id, key, fingerprint)
+        self.replays += 1
+        return record, False
+
+    def _take_over(self, user_id: int, key: str, fingerprint: str) -> bool:
+        """Claim a pending key whose holder has not finished within the lease"""
+        now = datetime.utcnow()
+        db = self.session_factory()
+        try:
+            result = db.execute(
+                update(IdempotencyKey)
+                .where(
+                    IdempotencyKey.user_id == user_id,
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.fingerprint == fingerprint,
+                    IdempotencyKey.job_id.is_(None),
+                    IdempotencyKey.response.is_(None),
+                    IdempotencyKey.claimed_at < now - self.lease,
+                )
+                .values(claimed_at=now)
+            )
+            db.commit()
+        finally:
+            db.close()
+        if result.rowcount != 1:
+            return False
+        print(f"Idempotency key {key} of user {user_id} was abandoned by its request; taking it over")
+        return True
+
+    def get(self, user_id: int, key: str) -> Optional[dict]:
+        db = self.session_factory()
+        try:
+            row = db.query(IdempotencyKey).filter(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key).first()
+            if row is None:
+                return None
+            if row.created_at < datetime.utcnow() - self.ttl:
+                db.delete(row)
+                db.commit()
+                return None
+            return {
+                "fingerprint": row.fingerprint,
+                "job_id": row.job_id,
+                "response": json.loads(row.response) if row.response else None,
+            }
+        finally:
+            db.close()
+
+    def _update(self, user_id: int, key: str, **values):
+        db = self.session_factory()
+        try:
+            db.query(IdempotencyKey).filter(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key).update(values)
+            db.commit()
+        finally:
+            db.close()
+
+    def attach_job(self, user_id: int, key: str, job_id: str):
+        self._update(user_id, key, job_id=job_id)
+
+    def complete(self, user_id: int, key: str, response: dict):
+        self._update(user_id, key, response=json.dumps(response))
+
+    def release(self, user_id: int, key: str):
+        """Forget a key whose request failed so a retry generates the report"""
+        db = self.session_factory()
+        try:
+            db.execute(delete(IdempotencyKey).where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key))
+            db.commit()
+        finally:
+            db.close()
+
+    async def wait(self, user_id: int, key: str, timeout: float) -> Optional[dict]:
+        """Wait for the request holding key to record its job or response; None if it was released"""
+        deadline = time.monotonic() + timeout
+        while True:
+            record = await asyncio.to_thread(self.get, user_id, key)
+            if record is None or record["job_id"] or record["response"] or time.monotonic() >= deadline:
+                return record
+            await asyncio.sleep(self.wait_interval)
+
+    def _purge_expired(self):
+        now = time.monotonic()
+        if now - self._last_purge < 600:
+            return
+        self._last_purge = now
+        db = self.session_factory()
+        try:
+            db.execute(delete(IdempotencyKey).where(IdempotencyKey.created_at < datetime.utcnow() - self.ttl))
+            db.commit()
+        finally:
+            db.close()
+
+    def stats(self) -> dict:
+        return {"replays": self.replays, "ttl_hours": self.ttl.total_seconds() / 3600}
+
+
+# Create global instance
+idempotency_store = IdempotencyStore()
@@ -0,0 +1,91 @@
+import asyncio
+import os
+import time
+from typing import AsyncIterator, Dict, Optional, Set
+
+from dotenv import load_dotenv
+
+from services.job_store import TERMINAL_STATUSES, JobStore, job_store
+
+load_dotenv()
+
+
+class JobEventHub:
+    """Lets requests wait for a job's status to change instead of polling it.
+
+    Waiters block on an asyncio.Event per job that the store's change listener
+    sets. Changes made by workers in other processes never reach the listener,
+    so waiters also re-read the store every JOB_EVENTS_POLL_INTERVAL seconds;
+    either way the client holds one open request instead of polling.
+    """
+
+    def __init__(self, store: JobStore):
+        self.store = store
+        self.poll_interval = float(os.getenv("JOB_EVENTS_POLL_INTERVAL", "2"))
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._waiters: Dict[str, Set[asyncio.Event]] = {}
+        self.notifications = 0
+        store.add_listener(self.notify)
+
+    def notify(self, job_id: str):
+        """Store listener; may be called from worker threads"""
+        loop = self._loop
+        if loop is None or loop.is_closed() or job_id not in self._waiters:
+            return
+        self.notifications += 1
+        loop.call_soon_threadsafe(self._wake, job_id)
+
+    def _wake(self, job_id: str):
+        for event in self._waiters.get(job_id, ()):
+            event.set()
+
+    async def wait_for_change(self, job_id: str, since: Optional[str], timeout: float) -> Optional[dict]:
+        """Return the job status once its version differs from since, or the current one after timeout"""
+        self._loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        self._waiters.setdefault(job_id, set()).add(event)
+        deadline = time.monotonic() + timeout
+        try:
+            while True:
+                # Clear before reading so a change landing during the read still wakes us
+                event.clear()
+                job = await asyncio.to_thread(self.store.get, job_id)
+                remaining = deadline - time.monotonic()
+                if job is None or job["version"] != since or job["status"] in TERMINAL_STATUSES or remaining <= 0:
+                    return job
+                try:
+                    await asyncio.wait_for(event.wait(), min(remaining, self.poll_interval))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            waiters = self._waiters.get(job_id)
+            if waiters is not None:
+                waiters.discard(event)
+                if not waiters:
+                    del self._waiters[job_id]
+
+    async def subscribe(self, job_id: str, since: Optional[str] = None, keepalive: float = 15) -> AsyncIterator[Optional[dict]]:
+        """Yield each new job status until the job finishes; yields None after keepalive seconds without a change"""
+        while True:
+            job = await self.wait_for_change(job_id, since, keepalive)
+            if job is None:
+                yield {"job_id": job_id, "status": "not_found", "message": "Job not found"}
+                return
+            if job["version"] == since and job["status"] not in TERMINAL_STATUSES:
+                yield None
+                continue
+            yield job
+            if job["status"] in TERMINAL_STATUSES:
+                return
+            since = job["version"]
+
+    def stats(self) -> dict:
+        return {
+            "watched_jobs": len(self._waiters),
+            "waiters": sum(len(waiters) for waiters in self._waiters.values()),
+            "notifications": self.notifications,
+        }
+
+
+# Create global instance
+job_events = JobEventHub(job_store)
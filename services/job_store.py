@@ -0,0 +1,508 @@
+import copy
+import importlib
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import delete, func, select, update
+
+from database.models import Job, SessionLocal
+
+load_dotenv()
+
+TERMINAL_STATUSES = ("completed", "error", "cancelled")
+
+# How long finished jobs stay queryable through /job-status, per status
+JOB_TTLS = {
+    "completed": float(os.getenv("JOB_COMPLETED_TTL", "3600")),
+    "error": float(os.getenv("JOB_ERROR_TTL", "86400")),
+    "cancelled": float(os.getenv("JOB_CANCELLED_TTL", "3600")),
+}
+# Hard cap on stored jobs; the least recently used finished jobs are evicted beyond it
+JOB_MAX_RECORDS = int(os.getenv("JOB_MAX_RECORDS", "10000"))
+
+
+class JobStore(ABC):
+    """Interface for report generation job storage; subclasses must implement every abstract method.
+
+    A job moves queued -> processing -> completed / error. Workers claim queued
+    jobs atomically and must hold the claim (same worker_id, status processing)
+    for heartbeat, progress and completion calls to take effect, so a worker
+    whose job was requeued after missing heartbeats cannot overwrite the result.
+
+    Cancelling a queued job ends it right away; a processing job goes to
+    cancelling until its worker notices (its heartbeat is no longer accepted)
+    and marks it cancelled.
+
+    Finished jobs are only kept long enough for clients to pick up the result:
+    sweep() expires them per status (JOB_TTLS) and evicts the least recently
+    used finished jobs once the store holds more than JOB_MAX_RECORDS.
+    Queued and processing jobs are never evicted.
+
+    Every status carries a "version" (the job's updated_at) that changes on
+    each transition. Listeners registered with add_listener are called with
+    the job id after changes made through this store instance, so waiters in
+    the same process can wake up without polling.
+    """
+
+    def __init__(self, max_records: Optional[int] = None):
+        self.max_records = JOB_MAX_RECORDS if max_records is None else max_records
+        self._stats_lock = threading.Lock()
+        self.expired = 0
+        self.evicted = 0
+        self._listeners: List[Callable[[str], None]] = []
+
+    def add_listener(self, listener: Callable[[str], None]):
+        self._listeners.append(listener)
+
+    def _notify(self, job_id: str):
+        for listener in self._listeners:
+            try:
+                listener(job_id)
+            except Exception as e:
+                print(f"Job listener error for {job_id}: {e}")
+
+    @abstractmethod
+    def create(self, job_id: str, payload: dict, user_id: Optional[int] = None):
+        ...
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[dict]:
+        """Return the job status as served by /job-status, or None"""
+
+    @abstractmethod
+    def list_queued(self, limit: Optional[int] = 100, per_user: Optional[int] = None) -> list:
+        """Queued jobs, oldest first, as {"id", "user_id", "payload", "created_at"}
+
+        With per_user, only each user's oldest per_user jobs are listed, so one
+        user's backlog cannot push everyone else's jobs past the limit.
+        """
+
+    @abstractmethod
+    def claim_job(self, job_id: str, worker_id: str) -> bool:
+        """Atomically move one queued job to processing; False if another worker got it first"""
+
+    def claim(self, worker_id: str) -> Optional[dict]:
+        """Claim the oldest queued job; returns {"id", "user_id", "payload", "created_at"}"""
+        # Another worker may claim a candidate first; the status guard makes that a no-op, so move on
+        for job in self.list_queued(limit=5):
+            if self.claim_job(job["id"], worker_id):
+                return job
+        return None
+
+    @abstractmethod
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def update_progress(self, job_id: str, worker_id: str, progress: int) -> bool:
+        ...
+
+    @abstractmethod
+    def complete(self, job_id: str, worker_id: str, result: dict) -> bool:
+        ...
+
+    @abstractmethod
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        ...
+
+    @abstractmethod
+    def request_cancel(self, job_id: str, user_id: Optional[int] = None) -> Optional[str]:
+        """Cancel a job owned by user_id (any owner if None); returns its new status, or None if not found"""
+
+    @abstractmethod
+    def finish_cancel(self, job_id: str, worker_id: str) -> bool:
+        """Mark a job cancelled once its worker has stopped working on it"""
+
+    @abstractmethod
+    def requeue_stale(self, stale_after_seconds: float, max_attempts: int) -> int:
+        """Requeue processing jobs whose worker stopped heartbeating; give up after max_attempts"""
+
+    @abstractmethod
+    def sweep(self, ttls: Optional[Dict[str, float]] = None, max_records: Optional[int] = None) -> int:
+        """Drop expired finished jobs, then evict LRU finished jobs over max_records; returns the number removed"""
+
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+    def _record_sweep(self, expired: int, evicted: int) -> int:
+        with self._stats_lock:
+            self.expired += expired
+            self.evicted += evicted
+        return expired + evicted
+
+    def stats(self) -> dict:
+        records = self.count()
+        with self._stats_lock:
+            return {
+                "records": records,
+                "expired": self.expired,
+                "evicted": self.evicted,
+                "max_records": self.max_records,
+            }
+
+
+def _status_dict(job_id: str, status: str, progress: int, result: Optional[dict], error: Optional[str], updated_at: datetime) -> dict:
+    data = {"job_id": job_id, "status": status, "progress": progress or 0, "version": updated_at.isoformat()}
+    if result:
+        data.update(result)
+    if error:
+        data["error"] = error
+    return data
+
+
+class SQLJobStore(JobStore):
+    """Job store backed by the `jobs` table, shared by every worker process using the database"""
+
+    def __init__(self, session_factory=SessionLocal, max_records: Optional[int] = None):
+        super().__init__(max_records)
+        self.session_factory = session_factory
+
+    def _transition(self, job_id: str, worker_id: str, **values) -> bool:
+        """Apply values only while worker_id still holds the job"""
+        values["updated_at"] = datetime.utcnow()
+        db = self.session_factory()
+        try:
+            result = db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.worker_id == worker_id, Job.status == "processing")
+                .values(**values)
+            )
+            db.commit()
+        finally:
+            db.close()
+        if result.rowcount != 1:
+            return False
+        self._notify(job_id)
+        return True
+
+    def create(self, job_id: str, payload: dict, user_id: Optional[int] = None):
+        db = self.session_factory()
+        try:
+            db.add(Job(id=job_id, user_id=user_id, status="queued", progress=0, payload=json.dumps(payload)))
+            db.commit()
+        finally:
+            db.close()
+        self._notify(job_id)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        db = self.session_factory()
+        try:
+            job = db.query(Job).filter(Job.id == job_id).first()
+            if job is None:
+                return None
+            return _status_dict(job.id, job.status, job.progress, json.loads(job.result) if job.result else None, job.error, job.updated_at)
+        finally:
+            db.close()
+
+    def list_queued(self, limit: Optional[int] = 100, per_user: Optional[int] = None) -> list:
+        db = self.session_factory()
+        try:
+            query = db.query(Job.id, Job.user_id, Job.payload, Job.created_at).filter(Job.status == "queued")
+            if per_user is not None:
+                position = func.row_number().over(partition_by=Job.user_id, order_by=Job.created_at).label("position")
+                window = query.add_columns(position).subquery()
+                query = db.query(window.c.id, window.c.user_id, window.c.payload, window.c.created_at).filter(window.c.position <= per_user)
+                jobs = query.order_by(window.c.created_at).limit(limit).all()
+            else:
+                jobs = query.order_by(Job.created_at).limit(limit).all()
+            return [
+                {"id": job.id, "user_id": job.user_id, "payload": json.loads(job.payload), "created_at": job.created_at}
+                for job in jobs
+            ]
+        finally:
+            db.close()
+
+    def claim_job(self, job_id: str, worker_id: str) -> bool:
+        now = datetime.utcnow()
+        db = self.session_factory()
+        try:
+            result = db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == "queued")
+                .values(status="processing", worker_id=worker_id, heartbeat_at=now, updated_at=now, attempts=Job.attempts + 1)
+            )
+            db.commit()
+        finally:
+            db.close()
+        if result.rowcount != 1:
+            return False
+        self._notify(job_id)
+        return True
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        return self._transition(job_id, worker_id, heartbeat_at=datetime.utcnow())
+
+    def update_progress(self, job_id: str, worker_id: str, progress: int) -> bool:
+        return self._transition(job_id, worker_id, progress=progress, heartbeat_at=datetime.utcnow())
+
+    def complete(self, job_id: str, worker_id: str, result: dict) -> bool:
+        return self._transition(job_id, worker_id, status="completed", progress=100, result=json.dumps(result))
+
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        return self._transition(job_id, worker_id, status="error", progress=0, error=error)
+
+    def request_cancel(self, job_id: str, user_id: Optional[int] = None) -> Optional[str]:
+        now = datetime.utcnow()
+        owner = (Job.user_id == user_id,) if user_id is not None else ()
+        db = self.session_factory()
+        try:
+            for current, new in (("queued", "cancelled"), ("processing", "cancelling")):
+                db.execute(update(Job).where(Job.id == job_id, Job.status == current, *owner).values(status=new, updated_at=now))
+            db.commit()
+            job = db.query(Job.status).filter(Job.id == job_id, *owner).first()
+        finally:
+            db.close()
+        if job is None:
+            return None
+        self._notify(job_id)
+        return job.status
+
+    def finish_cancel(self, job_id: str, worker_id: str) -> bool:
+        db = self.session_factory()
+        try:
+            result = db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.worker_id == worker_id, Job.status.in_(("processing", "cancelling")))
+                .values(status="cancelled", updated_at=datetime.utcnow())
+            )
+            db.commit()
+        finally:
+            db.close()
+        if result.rowcount != 1:
+            return False
+        self._notify(job_id)
+        return True
+
+    def requeue_stale(self, stale_after_seconds: float, max_attempts: int) -> int:
+        now = datetime.utcnow()
+        cutoff = now - timedelta(seconds=stale_after_seconds)
+        db = self.session_factory()
+        try:
+            # A job whose worker died before it could acknowledge the cancel is simply cancelled
+            cancelled = db.execute(
+                update(Job)
+                .where(Job.status == "cancelling", Job.heartbeat_at < cutoff)
+                .values(status="cancelled", updated_at=now)
+            ).rowcount
+            stale = (Job.status == "processing", Job.heartbeat_at < cutoff)
+            failed = db.execute(
+                update(Job)
+                .where(*stale, Job.attempts >= max_attempts)
+                .values(status="error", progress=0, error="Report generation worker stopped responding", updated_at=now)
+            ).rowcount
+            requeued = db.execute(
+                update(Job)
+                .where(*stale, Job.attempts < max_attempts)
+                .values(status="queued", progress=0, worker_id=None, updated_at=now)
+            ).rowcount
+            db.commit()
+            return cancelled + failed + requeued
+        finally:
+            db.close()
+
+    def sweep(self, ttls: Optional[Dict[str, float]] = None, max_records: Optional[int] = None) -> int:
+        ttls = JOB_TTLS if ttls is None else ttls
+        max_records = self.max_records if max_records is None else max_records
+        now = datetime.utcnow()
+        db = self.session_factory()
+        try:
+            expired = 0
+            for status, ttl in ttls.items():
+                expired += db.execute(
+                    delete(Job).where(Job.status == status, Job.updated_at < now - timedelta(seconds=ttl))
+                ).rowcount
+            evicted = 0
+            overflow = db.query(func.count(Job.id)).scalar() - max_records
+            if overflow > 0:
+                # Rows are not touched on read, so the last write stands in for last use
+                oldest = select(Job.id).where(Job.status.in_(TERMINAL_STATUSES)).order_by(Job.updated_at).limit(overflow)
+                evicted = db.execute(
+                    delete(Job).where(Job.id.in_(oldest)).execution_options(synchronize_session=False)
+                ).rowcount
+            db.commit()
+            return self._record_sweep(expired, evicted)
+        finally:
+            db.close()
+
+    def count(self) -> int:
+        db = self.session_factory()
+        try:
+            return db.query(func.count(Job.id)).scalar()
+        finally:
+            db.close()
+
+
+class MemoryJobStore(JobStore):
+    """In-process job store for single-worker deployments and development"""
+
+    def __init__(self, max_records: Optional[int] = None):
+        super().__init__(max_records)
+        self._lock = threading.Lock()
+        # Ordered least recently used first
+        self._jobs: "OrderedDict[str, dict]" = OrderedDict()
+
+    def _held(self, job_id: str, worker_id: str) -> Optional[dict]:
+        job = self._jobs.get(job_id)
+        if job and job["worker_id"] == worker_id and job["status"] == "processing":
+            self._jobs.move_to_end(job_id)
+            return job
+        return None
+
+    def create(self, job_id: str, payload: dict, user_id: Optional[int] = None):
+        now = datetime.utcnow()
+        with self._lock:
+            self._jobs[job_id] = {
+                "id": job_id, "user_id": user_id, "status": "queued", "progress": 0,
+                "payload": copy.deepcopy(payload), "result": None, "error": None,
+                "worker_id": None, "attempts": 0, "heartbeat_at": None,
+                "created_at": now, "updated_at": now,
+            }
+            evicted = self._evict_over(self.max_records)
+        self._record_sweep(0, evicted)
+        self._notify(job_id)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            self._jobs.move_to_end(job_id)
+            return _status_dict(job_id, job["status"], job["progress"], job["result"], job["error"], job["updated_at"])
+
+    def list_queued(self, limit: Optional[int] = 100, per_user: Optional[int] = None) -> list:
+        with self._lock:
+            queued = sorted((job for job in self._jobs.values() if job["status"] == "queued"), key=lambda j: j["created_at"])
+            if per_user is not None:
+                seen: Dict[Optional[int], int] = {}
+                windowed = []
+                for job in queued:
+                    seen[job["user_id"]] = seen.get(job["user_id"], 0) + 1
+                    if seen[job["user_id"]] <= per_user:
+                        windowed.append(job)
+                queued = windowed
+            return [
+                {"id": job["id"], "user_id": job["user_id"], "payload": copy.deepcopy(job["payload"]), "created_at": job["created_at"]}
+                for job in queued[:limit]
+            ]
+
+    def claim_job(self, job_id: str, worker_id: str) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] != "queued":
+                return False
+            now = datetime.utcnow()
+            self._jobs.move_to_end(job_id)
+            job.update(status="processing", worker_id=worker_id, heartbeat_at=now, updated_at=now)
+            job["attempts"] += 1
+        self._notify(job_id)
+        return True
+
+    def _transition(self, job_id: str, worker_id: str, **values) -> bool:
+        with self._lock:
+            job = self._held(job_id, worker_id)
+            if job is None:
+                return False
+            job.update(updated_at=datetime.utcnow(), **values)
+        self._notify(job_id)
+        return True
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        return self._transition(job_id, worker_id, heartbeat_at=datetime.utcnow())
+
+    def update_progress(self, job_id: str, worker_id: str, progress: int) -> bool:
+        return self._transition(job_id, worker_id, progress=progress, heartbeat_at=datetime.utcnow())
+
+    def complete(self, job_id: str, worker_id: str, result: dict) -> bool:
+        return self._transition(job_id, worker_id, status="completed", progress=100, result=dict(result))
+
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        return self._transition(job_id, worker_id, status="error", progress=0, error=error)
+
+    def request_cancel(self, job_id: str, user_id: Optional[int] = None) -> Optional[str]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or (user_id is not None and job["user_id"] != user_id):
+                return None
+            if job["status"] in ("queued", "processing"):
+                job.update(status="cancelled" if job["status"] == "queued" else "cancelling", updated_at=datetime.utcnow())
+            status = job["status"]
+        self._notify(job_id)
+        return status
+
+    def finish_cancel(self, job_id: str, worker_id: str) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["worker_id"] != worker_id or job["status"] not in ("processing", "cancelling"):
+                return False
+            job.update(status="cancelled", updated_at=datetime.utcnow())
+        self._notify(job_id)
+        return True
+
+    def requeue_stale(self, stale_after_seconds: float, max_attempts: int) -> int:
+        now = datetime.utcnow()
+        cutoff = now - timedelta(seconds=stale_after_seconds)
+        changed = []
+        with self._lock:
+            for job in self._jobs.values():
+                if job["status"] not in ("processing", "cancelling") or job["heartbeat_at"] >= cutoff:
+                    continue
+                if job["status"] == "cancelling":
+                    job.update(status="cancelled", updated_at=now)
+                elif job["attempts"] >= max_attempts:
+                    job.update(status="error", progress=0, error="Report generation worker stopped responding", updated_at=now)
+                else:
+                    job.update(status="queued", progress=0, worker_id=None, updated_at=now)
+                changed.append(job["id"])
+        for job_id in changed:
+            self._notify(job_id)
+        return len(changed)
+
+    def _evict_over(self, max_records: int) -> int:
+        """Evict least recently used finished jobs while over max_records; caller holds the lock"""
+        overflow = len(self._jobs) - max_records
+        if overflow <= 0:
+            return 0
+        victims = [job_id for job_id, job in self._jobs.items() if job["status"] in TERMINAL_STATUSES][:overflow]
+        for job_id in victims:
+            del self._jobs[job_id]
+        return len(victims)
+
+    def sweep(self, ttls: Optional[Dict[str, float]] = None, max_records: Optional[int] = None) -> int:
+        ttls = JOB_TTLS if ttls is None else ttls
+        max_records = self.max_records if max_records is None else max_records
+        now = datetime.utcnow()
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job["status"] in ttls and job["updated_at"] < now - timedelta(seconds=ttls[job["status"]])
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+            evicted = self._evict_over(max_records)
+        return self._record_sweep(len(expired), evicted)
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._jobs)
+
+
+def create_job_store() -> JobStore:
+    """Build the store named by JOB_STORE_BACKEND: "sql" (default), "memory" or "package.module:ClassName" """
+    backend = os.getenv("JOB_STORE_BACKEND", "sql")
+    if backend == "sql":
+        return SQLJobStore()
+    if backend == "memory":
+        return MemoryJobStore()
+    module_name, _, class_name = backend.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+# Create global instance
+job_store = create_job_store()
@@ -0,0 +1,231 @@
+import asyncio
+import json
+import os
+import socket
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from dotenv import load_dotenv
+
+from services.fair_scheduler import FairShareScheduler
+from services.job_store import JobStore
+
+load_dotenv()
+
+JobHandler = Callable[[str, str, dict], Awaitable[None]]
+
+
+def job_model(payload: dict) -> str:
+    """The LLM model a report job will call, as used for per-model limits"""
+    model = payload.get("ai_model") or "gpt-5"
+    return "gpt-5" if model == "undefined" else model
+
+
+class JobWorker:
+    """Pool of report generation slots draining a JobStore.
+
+    Up to JOB_WORKER_CONCURRENCY jobs run at once as tasks on the event loop,
+    so they hold neither HTTP connections nor the threadpool that serves sync
+    endpoints. Each model has its own cap (JOB_MODEL_CONCURRENCY, falling back
+    to JOB_DEFAULT_MODEL_CONCURRENCY); queued jobs for a saturated model are
+    skipped until one of its slots frees up. With a scheduler, queued jobs
+    are taken in fair-share order instead of oldest first.
+
+    While a job runs, the worker heartbeats it so other processes can tell a
+    live job from one whose worker died; stale jobs are requeued (or failed
+    after JOB_MAX_ATTEMPTS) by whichever worker notices first. A rejected
+    heartbeat means the job was cancelled or taken over, so the worker stops
+    working on it.
+    """
+
+    def __init__(self, store: JobStore, handler: JobHandler, scheduler: Optional[FairShareScheduler] = None):
+        self.store = store
+        self.handler = handler
+        self.scheduler = scheduler
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.concurrency = max(1, int(os.getenv("JOB_WORKER_CONCURRENCY", "4")))
+        self.default_model_concurrency = max(1, int(os.getenv("JOB_DEFAULT_MODEL_CONCURRENCY", str(self.concurrency))))
+        self.model_concurrency: Dict[str, int] = json.loads(os.getenv("JOB_MODEL_CONCURRENCY", "{}"))
+        self.poll_interval = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+        self.heartbeat_interval = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "15"))
+        self.stale_after = float(os.getenv("JOB_STALE_AFTER", "120"))
+        self.max_attempts = int(os.getenv("JOB_MAX_ATTEMPTS", "2"))
+        # Queued jobs per user the scheduler chooses from; one user's backlog never hides another's jobs
+        self.queue_window = max(1, int(os.getenv("FAIR_SHARE_QUEUE_WINDOW", "20")))
+        self.running: Dict[str, asyncio.Task] = {}
+        self.running_per_model: Dict[str, int] = {}
+        self.jobs_started = 0
+        self.jobs_cancelled = 0
+        self._cancelled: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._slot_freed: Optional[asyncio.Event] = None
+        self._last_requeue = 0.0
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._slot_freed = asyncio.Event()
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        tasks = list(self.running.values())
+        if self._task and not self._task.done():
+            tasks.append(self._task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def model_limit(self, model: str) -> int:
+        return int(self.model_concurrency.get(model, self.default_model_concurrency))
+
+    def has_capacity(self, model: str) -> bool:
+        return self.running_per_model.get(model, 0) < self.model_limit(model)
+
+    async def run(self):
+        print(f"Job worker {self.worker_id} started with {self.concurrency} slot(s)")
+        while True:
+            if len(self.running) >= self.concurrency:
+                await self._wait_for_slot()
+                continue
+            job = None
+            try:
+                await self._requeue_stale()
+                job = await asyncio.to_thread(self._claim_next)
+            except Exception as e:
+                print(f"Job worker error while claiming: {e}")
+            if job is None:
+                await self._wait_for_slot(self.poll_interval)
+                continue
+            self._launch(job)
+
+    def _claim_next(self) -> Optional[dict]:
+        """Claim the next queued job whose model still has a free slot"""
+        if self.scheduler is not None:
+            queued = self.scheduler.order(self.store.list_queued(limit=None, per_user=self.queue_window))
+        else:
+            queued = self.store.list_queued()
+        for job in queued:
+            if self.has_capacity(job_model(job["payload"])) and self.store.claim_job(job["id"], self.worker_id):
+                return job
+        return None
+
+    def _launch(self, job: dict):
+        model = job_model(job["payload"])
+        self.running_per_model[model] = self.running_per_model.get(model, 0) + 1
+        self.jobs_started += 1
+        if self.scheduler is not None:
+            self.scheduler.started(job)
+        task = asyncio.create_task(self.run_job(job))
+        self.running[job["id"]] = task
+
+        def release(_):
+            self.running.pop(job["id"], None)
+            self.running_per_model[model] -= 1
+            if self.scheduler is not None:
+                self.scheduler.finished(job)
+            self._slot_freed.set()
+
+        task.add_done_callback(release)
+
+    async def _wait_for_slot(self, timeout: Optional[float] = None):
+        try:
+            await asyncio.wait_for(self._slot_freed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._slot_freed.clear()
+
+    def cancel(self, job_id: str) -> bool:
+        """Stop a job running in this process; the LLM call is cancelled with it"""
+        task = self.running.get(job_id)
+        if task is None or task.done():
+            return False
+        self._cancelled.add(job_id)
+        task.cancel()
+        return True
+
+    async def run_job(self, job: dict):
+        heartbeat = asyncio.create_task(self._heartbeat(job["id"]))
+        try:
+            await self.handler(job["id"], self.worker_id, job["payload"])
+        except asyncio.CancelledError:
+            if job["id"] not in self._cancelled:
+                # Worker shutdown; leave the job for stale recovery
+                raise
+            self._cancelled.discard(job["id"])
+            self.jobs_cancelled += 1
+            print(f"Job {job['id']} cancelled")
+            await asyncio.to_thread(self.store.finish_cancel, job["id"], self.worker_id)
+        except Exception as e:
+            print(f"Job {job['id']} failed: {e}")
+            await asyncio.to_thread(self.store.fail, job["id"], self.worker_id, str(e))
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat(self, job_id: str):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                held = await asyncio.to_thread(self.store.heartbeat, job_id, self.worker_id)
+            except Exception as e:
+                print(f"Job {job_id} heartbeat failed: {e}")
+                continue
+            if not held:
+                print(f"Job {job_id} was cancelled or reassigned; stopping it")
+                self.cancel(job_id)
+                return
+
+    async def _requeue_stale(self):
+        now = time.monotonic()
+        if now - self._last_requeue < self.stale_after / 2:
+            return
+        self._last_requeue = now
+        count = await asyncio.to_thread(self.store.requeue_stale, self.stale_after, self.max_attempts)
+        if count:
+            print(f"Job worker {self.worker_id} recovered {count} stale job(s)")
+
+    def stats(self) -> dict:
+        return {
+            "worker_id": self.worker_id,
+            "concurrency": self.concurrency,
+            "running": len(self.running),
+            "running_per_model": {model: count for model, count in self.running_per_model.items() if count},
+            "model_limits": dict(self.model_concurrency, default=self.default_model_concurrency),
+            "jobs_started": self.jobs_started,
+            "jobs_cancelled": self.jobs_cancelled,
+        }
+
+
+class JobSweeper:
+    """Periodically expires finished jobs and enforces the job store's size cap"""
+
+    def __init__(self, store: JobStore):
+        self.store = store
+        self.interval = float(os.getenv("JOB_SWEEP_INTERVAL", "60"))
+        self.sweeps = 0
+        self.last_removed = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def run(self):
+        while True:
+            try:
+                self.last_removed = await asyncio.to_thread(self.store.sweep)
+                self.sweeps += 1
+                if self.last_removed:
+                    print(f"Job sweeper removed {self.last_removed} finished job(s)")
+            except Exception as e:
+                print(f"Job sweeper error: {e}")
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> dict:
+        return dict(self.store.stats(), sweeps=self.sweeps, last_removed=self.last_removed, sweep_interval=self.interval)
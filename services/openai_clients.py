@@ -0,0 +1,127 @@
+import asyncio
+import os
+import threading
+import weakref
+from typing import Dict, Optional, Tuple
+
+import httpx
+from dotenv import load_dotenv
+from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
+
+load_dotenv()
+
+ClientKey = Tuple[str, Optional[str]]
+
+
+class OpenAIClientRegistry:
+    """Process-wide registry of pooled OpenAI clients, one per API key / base URL.
+
+    Clients are created lazily on first use and keep their HTTP connection pool
+    alive between reports. Async clients are bound to the event loop that created
+    them, so they are tracked per loop. After a fork the child drops the inherited
+    clients instead of sharing sockets with the parent.
+    """
+
+    def __init__(self):
+        self.max_connections = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+        self.max_keepalive_connections = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20"))
+        self.keepalive_expiry = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "30"))
+        self.connect_timeout = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "10"))
+        # Report generation can take up to 15 minutes, matching TimeoutMiddleware
+        self.read_timeout = float(os.getenv("OPENAI_READ_TIMEOUT", "900"))
+        self.max_retries = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+        self._reset()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._clients: Dict[ClientKey, OpenAI] = {}
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[ClientKey, AsyncOpenAI]]" = weakref.WeakKeyDictionary()
+        self.clients_created = 0
+
+    def _check_pid(self):
+        # Covers fork paths that bypass os.register_at_fork (e.g. multiprocessing on some platforms)
+        if self._pid != os.getpid():
+            self._reset()
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def _timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+
+    def _key(self, api_key: Optional[str], base_url: Optional[str]) -> ClientKey:
+        api_key = api_key or os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise RuntimeError("OPENAI_API_KEY environment variable not set")
+        return api_key, base_url or os.getenv("OPENAI_BASE_URL") or None
+
+    def get_client(self, api_key: Optional[str] = None, base_url: Optional[str] = None) -> OpenAI:
+        """Return the shared synchronous client for this API key / base URL"""
+        key = self._key(api_key, base_url)
+        self._check_pid()
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = OpenAI(
+                    api_key=key[0],
+                    base_url=key[1],
+                    timeout=self._timeout(),
+                    max_retries=self.max_retries,
+                    http_client=DefaultHttpxClient(limits=self._limits(), timeout=self._timeout()),
+                )
+                self._clients[key] = client
+                self.clients_created += 1
+            return client
+
+    def get_async_client(self, api_key: Optional[str] = None, base_url: Optional[str] = None) -> AsyncOpenAI:
+        """Return the shared async client for this API key / base URL on the running event loop"""
+        key = self._key(api_key, base_url)
+        loop = asyncio.get_running_loop()
+        self._check_pid()
+        with self._lock:
+            loop_clients = self._async_clients.setdefault(loop, {})
+            client = loop_clients.get(key)
+            if client is None:
+                client = AsyncOpenAI(
+                    api_key=key[0],
+                    base_url=key[1],
+                    timeout=self._timeout(),
+                    max_retries=self.max_retries,
+                    http_client=DefaultAsyncHttpxClient(limits=self._limits(), timeout=self._timeout()),
+                )
+                loop_clients[key] = client
+                self.clients_created += 1
+            return client
+
+    async def aclose(self):
+        """Close every client owned by this process; async clients on the running loop are awaited"""
+        with self._lock:
+            clients = list(self._clients.values())
+            async_clients = list(self._async_clients.pop(asyncio.get_running_loop(), {}).values())
+            self._clients.clear()
+        for client in clients:
+            client.close()
+        for client in async_clients:
+            await client.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sync_clients": len(self._clients),
+                "async_clients": sum(len(clients) for clients in self._async_clients.values()),
+                "clients_created": self.clients_created,
+                "max_connections": self.max_connections,
+                "max_keepalive_connections": self.max_keepalive_connections,
+                "keepalive_expiry": self.keepalive_expiry,
+            }
+
+
+# Create global instance
+openai_clients = OpenAIClientRegistry()
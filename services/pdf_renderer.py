@@ -0,0 +1,258 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from services.executors import io_executor, render_executor
+from services.report_renderer import REPORT_TRANSLATIONS, escape_html, render_report_body, render_report_document
+from services.single_flight import SingleFlight
+
+load_dotenv()
+
+# Bump whenever the PDF produced for the same report changes
+PDF_RENDERER_VERSION = "1"
+
+_FONT_CANDIDATES = (
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/Library/Fonts/Arial Unicode.ttf",
+    "C:\\Windows\\Fonts\\arial.ttf",
+)
+
+
+def _engine_available(name: str) -> bool:
+    try:
+        if name == "weasyprint":
+            import weasyprint  # noqa: F401
+        elif name == "fpdf2":
+            import fpdf  # noqa: F401
+        else:
+            return False
+    except Exception:  # weasyprint raises OSError when its native libraries are missing
+        return False
+    return True
+
+
+def detect_engine() -> Optional[str]:
+    """The PDF engine to use: PDF_ENGINE if set (auto by default), else the first one installed"""
+    wanted = os.getenv("PDF_ENGINE", "auto").lower()
+    if wanted == "none":
+        return None
+    candidates = ("weasyprint", "fpdf2") if wanted == "auto" else (wanted,)
+    for name in candidates:
+        if _engine_available(name):
+            return name
+    return None
+
+
+def _find_font() -> Optional[str]:
+    configured = os.getenv("PDF_FONT_PATH")
+    for path in ((configured,) if configured else _FONT_CANDIDATES):
+        if path and os.path.exists(path):
+            return path
+    return None
+
+
+def _print_document(content: str, language: str, form_data: Optional[dict], report_date: Optional[str]) -> str:
+    """Plain HTML for engines without CSS support: title, report summary, then the report body"""
+    t = REPORT_TRANSLATIONS.get(language, REPORT_TRANSLATIONS["en"])
+    parts = [f"<h1>{escape_html(t['report_title'])}</h1>"]
+    summary = [(t["generated_by"], t["ai_powered"]), (t["date"], report_date or "")]
+    if form_data:
+        summary += [
+            ("Brand Name", form_data.get("brand") or "N/A"),
+            ("Product/Service", form_data.get("product") or "N/A"),
+            ("Investment Budget", form_data.get("budget") or "N/A"),
+            ("Enterprise Size", form_data.get("enterprise_size") or "N/A"),
+        ]
+        if (form_data.get("other_info") or "").strip():
+            summary.append(("Other Information", form_data["other_info"].strip()))
+    for label, value in summary:
+        parts.append(f"<p><b>{escape_html(label)}</b> {escape_html(value)}</p>")
+    parts.append(render_report_body(content))
+    parts.append(f"<p>{escape_html(t['footer_text1'])}</p>")
+    return "\n".join(parts)
+
+
+def _render_with_fpdf(content: str, language: str, form_data: Optional[dict], report_date: Optional[str]) -> bytes:
+    from fpdf import FPDF
+
+    pdf = FPDF(format="A4")
+    pdf.set_auto_page_break(True, margin=15)
+    pdf.add_page()
+    document = _print_document(content, language, form_data, report_date)
+    font = _find_font()
+    if font:
+        pdf.add_font("Report", "", font)
+        bold = font.replace(".ttf", "-Bold.ttf")
+        pdf.add_font("Report", "B", bold if os.path.exists(bold) else font)
+        family = "Report"
+    else:
+        # Core fonts only cover Latin-1
+        document = document.encode("latin-1", "replace").decode("latin-1")
+        family = "helvetica"
+    pdf.set_font(family, size=10)
+    pdf.write_html(document, font_family=family)
+    return bytes(pdf.output())
+
+
+def _render_with_weasyprint(content: str, language: str, form_data: Optional[dict], report_date: Optional[str]) -> bytes:
+    import weasyprint
+
+    static_root = os.path.abspath("static")
+
+    def url_fetcher(url: str, *args, **kwargs):
+        # Only our own stylesheet and images; never reach out to CDNs or font services
+        prefix = "http://report.local/static/"
+        if not url.startswith(prefix):
+            raise ValueError(f"External resource skipped: {url}")
+        path = os.path.abspath(os.path.join(static_root, url[len(prefix):].split("?", 1)[0]))
+        if not path.startswith(static_root + os.sep):
+            raise ValueError(f"Resource outside /static: {url}")
+        return weasyprint.default_url_fetcher("file://" + path)
+
+    page = render_report_document(content, language, form_data, report_date)
+    return weasyprint.HTML(string=page, base_url="http://report.local/", url_fetcher=url_fetcher).write_pdf()
+
+
+def render_pdf(engine: str, content: str, language: str, form_data: Optional[dict], report_date: Optional[str]) -> bytes:
+    """Render a report to PDF bytes. Runs in a pool worker process, so it must stay importable and picklable."""
+    if engine == "weasyprint":
+        return _render_with_weasyprint(content, language, form_data, report_date)
+    return _render_with_fpdf(content, language, form_data, report_date)
+
+
+class PdfBusy(Exception):
+    """Raised when PDF_MAX_PENDING renders are already queued or running"""
+
+
+class PdfRenderer:
+    """Server-side PDF export for reports.
+
+    Renders run on the shared render process pool (services.executors) so
+    the event loop and request threads stay free; at most PDF_MAX_PENDING
+    renders may be queued or running before new ones are turned away with
+    PdfBusy.
+    Output is written to PDF_CACHE_DIR under a hash of the report text, page
+    inputs, engine and PDF_RENDERER_VERSION, trimmed to PDF_CACHE_MAX_DISK_MB
+    (least recently written first) at most every PDF_CACHE_TRIM_INTERVAL
+    seconds. Concurrent requests for the same PDF share one render, which is
+    only abandoned once every one of them has gone away.
+    """
+
+    def __init__(self):
+        self.engine = detect_engine()
+        self.max_pending = max(1, int(os.getenv("PDF_MAX_PENDING", "8")))
+        self.cache_dir = os.getenv("PDF_CACHE_DIR", "cache/pdf")
+        self.max_disk_bytes = int(float(os.getenv("PDF_CACHE_MAX_DISK_MB", "500")) * 1024 * 1024)
+        self.trim_interval = float(os.getenv("PDF_CACHE_TRIM_INTERVAL", "300"))
+        self._trimmed_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+        self.renders = 0
+        self.cache_hits = 0
+        self.failures = 0
+        self.rejected = 0
+        self.evictions = 0
+
+    @property
+    def available(self) -> bool:
+        return self.engine is not None
+
+    def make_key(self, content: str, **inputs) -> str:
+        digest = hashlib.sha256(content.encode("utf-8"))
+        digest.update(json.dumps(dict(inputs, engine=self.engine, version=PDF_RENDERER_VERSION), sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.pdf")
+
+    async def render(self, content: str, language: str, form_data: Optional[dict], report_date: Optional[str]) -> str:
+        """Return the path of the cached PDF for a report, rendering it first if needed"""
+        key = self.make_key(content, language=language, form_data=form_data, report_date=report_date)
+        path = self._path(key)
+        if os.path.exists(path):
+            self.cache_hits += 1
+            return path
+
+        if not self._flights.in_flight(key) and len(self._flights) >= self.max_pending:
+            self.rejected += 1
+            raise PdfBusy()
+        return await self._flights.do(key, lambda: self._render(path, content, language, form_data, report_date))
+
+    async def _render(self, path: str, content: str, language: str, form_data: Optional[dict], report_date: Optional[str]) -> str:
+        try:
+            data = await render_executor.run(render_pdf, self.engine, content, language, form_data, report_date)
+            await io_executor.run(self._write, path, data)
+        except Exception:
+            self.failures += 1
+            raise
+        self.renders += 1
+        return path
+
+    def _write(self, path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        if self._trim_due():
+            self._trim_disk()
+
+    def _trim_due(self) -> bool:
+        """Whether a write should sweep the cache: the first one, then one every trim_interval seconds"""
+        now = time.monotonic()
+        with self._lock:
+            if self._trimmed_at is not None and now - self._trimmed_at < self.trim_interval:
+                return False
+            self._trimmed_at = now
+            return True
+
+    def _trim_disk(self):
+        """Drop the oldest PDFs until the cache fits its budget"""
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".pdf"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        return {
+            "engine": self.engine,
+            "in_flight": len(self._flights),
+            "max_pending": self.max_pending,
+            "renders": self.renders,
+            "cache_hits": self.cache_hits,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "evictions": self.evictions,
+        }
+
+
+# Create global instance
+pdf_renderer = PdfRenderer()
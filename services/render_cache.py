@@ -0,0 +1,213 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from dotenv import load_dotenv
+
+from services.http_cache import ENCODING_SUFFIXES, compress_variants
+
+load_dotenv()
+
+
+class RenderedPage:
+    """A rendered report page as UTF-8 bytes plus its precompressed variants.
+
+    rendered_at doubles as the page's Last-Modified time: it changes whenever
+    the page is rendered again, e.g. after a renderer upgrade.
+    """
+
+    __slots__ = ("key", "body", "variants", "rendered_at")
+
+    def __init__(self, key: str, body: bytes, variants: Dict[str, bytes], rendered_at: float):
+        self.key = key
+        self.body = body
+        self.variants = variants
+        self.rendered_at = rendered_at
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.key[:32]}"'
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(v) for v in self.variants.values())
+
+
+class RenderCache:
+    """Cache of report pages rendered from their markdown.
+
+    Keys hash everything the page is built from: the report text, language,
+    form data, report date and renderer version (RENDERER_VERSION is part of
+    the inputs, so bumping it orphans every old entry). Lookups go through an
+    in-process LRU bounded by total size first, then an optional HTML file per
+    entry on disk (RENDER_CACHE_DIR, empty to disable) trimmed to a size
+    budget, least recently written first, every RENDER_CACHE_TRIM_INTERVAL
+    seconds at most. Pages are compressed once when they
+    are rendered, and the gzip (and brotli) copies are kept in both tiers
+    alongside the HTML.
+    """
+
+    def __init__(self):
+        self.max_memory_bytes = int(float(os.getenv("RENDER_CACHE_MEMORY_MB", "64")) * 1024 * 1024)
+        self.cache_dir = os.getenv("RENDER_CACHE_DIR", "cache/rendered")
+        self.max_disk_bytes = int(float(os.getenv("RENDER_CACHE_MAX_DISK_MB", "500")) * 1024 * 1024)
+        self.trim_interval = float(os.getenv("RENDER_CACHE_TRIM_INTERVAL", "300"))
+        self._trimmed_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, RenderedPage]" = OrderedDict()
+        self._memory_bytes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.renders = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(content: str, **inputs) -> str:
+        """Hash the report text and the other page inputs into a cache key"""
+        digest = hashlib.sha256(content.encode("utf-8"))
+        digest.update(json.dumps(inputs, sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.html")
+
+    def lookup(self, key: str) -> Optional[RenderedPage]:
+        """Return the cached page for key from memory or disk, or None if it has to be rendered"""
+        with self._lock:
+            page = self._memory.get(key)
+            if page is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return page
+
+        page = self._read_disk(key)
+        if page is not None:
+            with self._lock:
+                self.disk_hits += 1
+                self._remember(key, page)
+        return page
+
+    def store(self, key: str, html: str) -> RenderedPage:
+        """Compress a freshly rendered page and keep it in both tiers"""
+        body = html.encode("utf-8")
+        page = RenderedPage(key, body, compress_variants(body), time.time())
+        with self._lock:
+            self.renders += 1
+            self._remember(key, page)
+        self._write_disk(key, page)
+        return page
+
+    def get_or_render(self, key: str, render: Callable[[], str]) -> RenderedPage:
+        """Return the page for key, calling render() and storing the result on a miss"""
+        page = self.lookup(key)
+        if page is None:
+            page = self.store(key, render())
+        return page
+
+    def _remember(self, key: str, page: RenderedPage):
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= old.size
+        self._memory[key] = page
+        self._memory_bytes += page.size
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.size
+            self.evictions += 1
+
+    def _read_disk(self, key: str) -> Optional[RenderedPage]:
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                body = f.read()
+                rendered_at = os.fstat(f.fileno()).st_mtime
+        except OSError:
+            return None
+        variants = {}
+        for encoding, suffix in ENCODING_SUFFIXES.items():
+            try:
+                with open(path + suffix, "rb") as f:
+                    variants[encoding] = f.read()
+            except OSError:
+                continue
+        if "gzip" not in variants:
+            # Trimmed separately from the page; compress again rather than serve it uncompressed
+            variants = compress_variants(body)
+        return RenderedPage(key, body, variants, rendered_at)
+
+    def _write_disk(self, key: str, page: RenderedPage):
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            for suffix, data in [("", page.body)] + [(ENCODING_SUFFIXES[e], v) for e, v in page.variants.items()]:
+                tmp_path = f"{path}{suffix}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path + suffix)
+            if self._trim_due():
+                self._trim_disk()
+        except OSError as e:
+            print(f"Warning: Could not write rendered report cache entry: {e}")
+
+    def _trim_due(self) -> bool:
+        """Whether a store should sweep the disk tier: the first one, then one every trim_interval seconds"""
+        now = time.monotonic()
+        with self._lock:
+            if self._trimmed_at is not None and now - self._trimmed_at < self.trim_interval:
+                return False
+            self._trimmed_at = now
+            return True
+
+    def _trim_disk(self):
+        """Drop the oldest pages until the disk tier fits its budget"""
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith((".html", ".html.gz", ".html.br")):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.renders
+            return {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "renders": self.renders,
+                "hit_ratio": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "disk_enabled": bool(self.cache_dir),
+            }
+
+
+# Create global instance
+render_cache = RenderCache()
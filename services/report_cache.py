@@ -0,0 +1,213 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _normalize(value: str) -> str:
+    """Case-fold and collapse whitespace so trivially different specs share a key"""
+    return re.sub(r"\s+", " ", (value or "").strip()).casefold()
+
+
+class ReportCache:
+    """Content-addressed cache of LLM report text.
+
+    Entries are keyed on a hash of the normalized report spec, language, model,
+    prompt template version and a date bucket (the prompt embeds the analysis
+    date, so a cached report is only reused within the same bucket). Lookups
+    go through an in-process LRU first, then a JSON file per entry on disk.
+    Both tiers honour the TTL; the disk tier is also trimmed to a size budget,
+    oldest entries first, at most every REPORT_CACHE_TRIM_INTERVAL seconds.
+
+    get() and put() touch the disk, so the server calls them on the I/O
+    executor; get_from_memory() is cheap enough for the event loop.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("REPORT_CACHE_ENABLED", "true").lower() == "true"
+        self.memory_entries = int(os.getenv("REPORT_CACHE_MEMORY_ENTRIES", "128"))
+        self.cache_dir = os.getenv("REPORT_CACHE_DIR", "cache/reports")
+        self.ttl_seconds = float(os.getenv("REPORT_CACHE_TTL_HOURS", "72")) * 3600
+        self.max_disk_bytes = int(float(os.getenv("REPORT_CACHE_MAX_DISK_MB", "200")) * 1024 * 1024)
+        self.date_bucket_days = max(1, int(os.getenv("REPORT_CACHE_DATE_BUCKET_DAYS", "7")))
+        self.trim_interval = float(os.getenv("REPORT_CACHE_TRIM_INTERVAL", "300"))
+        self._trimmed_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def make_key(self, spec, language: str, model: str, template_version: str,
+                 analysis_date: Optional[date] = None, mode: str = "single") -> str:
+        """Hash the normalized spec and generation settings into a cache key"""
+        analysis_date = analysis_date or date.today()
+        products = [_normalize(p) for p in spec.product.split(',') if p.strip()]
+        payload = {
+            "brand": _normalize(spec.brand),
+            "products": products,
+            "budget": _normalize(spec.budget),
+            "enterprise_size": _normalize(spec.enterprise_size),
+            "other_info": _normalize(spec.other_info),
+            "language": _normalize(language),
+            "model": _normalize(model),
+            "mode": mode,
+            "template_version": template_version,
+            "date_bucket": analysis_date.toordinal() // self.date_bucket_days,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get_from_memory(self, key: str) -> Optional[str]:
+        """Return the report text for key if the in-process tier has it; never touches the disk"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, text = entry
+                if time.time() - created_at < self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return text
+                del self._memory[key]
+        return None
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached report text for key, or None on a miss"""
+        if not self.enabled:
+            return None
+        text = self.get_from_memory(key)
+        if text is not None:
+            return text
+        now = time.time()
+
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            entry = None
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            if now - entry["created_at"] >= self.ttl_seconds:
+                self.misses += 1
+                self._remove_file(path)
+                return None
+            self.disk_hits += 1
+            self._remember(key, entry["created_at"], entry["text"])
+            return entry["text"]
+
+    def put(self, key: str, text: str):
+        """Store report text in both tiers"""
+        if not self.enabled:
+            return
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, created_at, text)
+            self.stores += 1
+
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"created_at": created_at, "text": text}, f)
+            os.replace(tmp_path, path)
+            if self._trim_due():
+                self._trim_disk()
+        except OSError as e:
+            print(f"Warning: Could not write report cache entry: {e}")
+
+    def record_bypass(self):
+        with self._lock:
+            self.bypassed += 1
+
+    def _remember(self, key: str, created_at: float, text: str):
+        self._memory[key] = (created_at, text)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _remove_file(self, path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _trim_due(self) -> bool:
+        """Whether a store should sweep the disk tier: the first one, then one every trim_interval seconds"""
+        now = time.monotonic()
+        with self._lock:
+            if self._trimmed_at is not None and now - self._trimmed_at < self.trim_interval:
+                return False
+            self._trimmed_at = now
+            return True
+
+    def _trim_disk(self):
+        """Drop expired entries, then the oldest ones until the disk tier fits its budget"""
+        entries = []
+        total = 0
+        now = time.time()
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if now - stat.st_mtime >= self.ttl_seconds:
+                    self._remove_file(path)
+                    with self._lock:
+                        self.evictions += 1
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_disk_bytes:
+                break
+            self._remove_file(path)
+            total -= size
+            with self._lock:
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "memory_entries": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+                "bypassed": self.bypassed,
+                "stores": self.stores,
+                "evictions": self.evictions,
+            }
+
+
+# Create global instance
+report_cache = ReportCache()
@@ -0,0 +1,208 @@
+import html
+import os
+from datetime import datetime
+from typing import List, Optional
+
+from dotenv import load_dotenv
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from markupsafe import Markup
+
+from services.static_assets import asset_url
+
+load_dotenv()
+
+# Bump whenever the HTML produced for the same markdown changes
+RENDERER_VERSION = "2"
+
+_ORDERED_PREFIXES = ("1. ", "2. ", "3. ", "4. ", "5. ")
+
+# Keywords that mean the model already wrote an Other Information section
+_OTHER_INFO_KEYWORDS = ('other information', 'additional client requirements', 'altre informazioni', 'requisiti aggiuntivi')
+
+# Report shell strings, per language
+REPORT_TRANSLATIONS = {
+    "en": {
+        "title": "AI Trade Report - Professional Market Analysis",
+        "report_title": "AI Trade Report",
+        "report_overview": "Report Overview",
+        "generated_by": "Generated by:",
+        "ai_powered": "AI-Powered Market Research",
+        "date": "Date:",
+        "report_type": "Report Type:",
+        "comprehensive_analysis": "Comprehensive Market Analysis",
+        "footer_text1": "This report was generated using AI-powered market research technology.",
+        "footer_text2": "For questions or additional analysis, please contact your research team.",
+        "print": "Print",
+        "download_pdf": "Download PDF",
+        "save": "Save",
+        "return_home": "Home",
+        "saved_reports_title": "Your Saved Reports",
+        "saved_reports_subtitle": "Access and manage your previously generated reports",
+        "saved_reports_nav": "Saved Reports",
+        "no_reports_title": "No Saved Reports Yet",
+        "no_reports_description": "Generate your first report to see it saved here for easy access."
+    },
+    "it": {
+        "title": "AI Trade Report - Analisi di Mercato Professionale",
+        "report_title": "AI Trade Report",
+        "report_overview": "Panoramica del Report",
+        "generated_by": "Generato da:",
+        "ai_powered": "Ricerca di Mercato basata su AI",
+        "date": "Data:",
+        "report_type": "Tipo di Report:",
+        "comprehensive_analysis": "Analisi di Mercato Completa",
+        "footer_text1": "Questo report è stato generato utilizzando tecnologia di ricerca di mercato basata su AI.",
+        "footer_text2": "Per domande o analisi aggiuntive, contatta il tuo team di ricerca.",
+        "print": "Stampa",
+        "download_pdf": "Scarica PDF",
+        "save": "Salva",
+        "return_home": "Home",
+        "saved_reports_title": "I Tuoi Report Salvati",
+        "saved_reports_subtitle": "Accedi e gestisci i tuoi report generati in precedenza",
+        "saved_reports_nav": "Report Salvati",
+        "no_reports_title": "Nessun Report Salvato Ancora",
+        "no_reports_description": "Genera il tuo primo report per vederlo salvato qui per un accesso facile."
+    }
+}
+
+
+def escape_html(text: str) -> str:
+    """Escape &, <, >, " and ' (as &#x27;) for element content"""
+    return html.escape(text, quote=True)
+
+
+def render_report_body(content: str) -> str:
+    """Render report markdown to the HTML body fragment used by render_report_document.
+
+    Single pass over the lines, appending to a list. A table row counts as a
+    header when one of its cells contains dashes, or when no table line in the
+    whole document contains '---'; that second condition does not depend on
+    the row, so it is computed once up front.
+    """
+    lines = content.split('\n')
+    out: List[str] = []
+    append = out.append
+    no_separator_rows = not any('---' in line for line in lines if '|' in line)
+    in_table = False
+    in_list = False
+    list_type = 'ul'
+
+    for line in lines:
+        line = line.strip()
+
+        if not line:
+            if in_table:
+                append("        </table>\n")
+                in_table = False
+            elif in_list:
+                append(f"        </{list_type}>\n")
+                in_list = False
+            else:
+                append("        <br>\n")
+            continue
+
+        if line.startswith('# '):
+            append(f"        <h1>{escape_html(line[2:])}</h1>\n")
+        elif line.startswith('## '):
+            append(f"        <h2>{escape_html(line[3:])}</h2>\n")
+        elif line.startswith('### '):
+            append(f"        <h3>{escape_html(line[4:])}</h3>\n")
+        elif line.startswith('#### '):
+            append(f"        <h4>{escape_html(line[5:])}</h4>\n")
+        elif line.startswith('|') and '|' in line[1:]:
+            if not in_table:
+                append("        <table>\n")
+                in_table = True
+            cells = [cell.strip() for cell in line.split('|')[1:-1]]
+            tag = 'th' if no_separator_rows or any('--' in cell for cell in cells) else 'td'
+            append("            <tr>\n")
+            for cell in cells:
+                append(f"                <{tag}>{escape_html(cell)}</{tag}>\n")
+            append("            </tr>\n")
+        elif line.startswith('- ') or line.startswith('* '):
+            if not in_list:
+                append("        <ul>\n")
+                in_list = True
+                list_type = 'ul'
+            append(f"            <li>{escape_html(line[2:])}</li>\n")
+        elif line.startswith(_ORDERED_PREFIXES):
+            if not in_list:
+                append("        <ol>\n")
+                in_list = True
+                list_type = 'ol'
+            append(f"            <li>{escape_html(line[3:])}</li>\n")
+        elif line.startswith('**') and line.endswith('**'):
+            append(f"        <p><strong>{escape_html(line[2:-2])}</strong></p>\n")
+        elif line.startswith('```'):
+            if line == '```':
+                append("        <div class=\"code-block\">\n")
+            else:
+                append(f"        <div class=\"code-block\">\n            {escape_html(line[3:])}\n")
+        elif line.endswith('```'):
+            append("        </div>\n")
+        elif line.startswith('> '):
+            append(f"        <div class=\"highlight\">{escape_html(line[2:])}</div>\n")
+        else:
+            append(f"        <p>{escape_html(line)}</p>\n")
+
+    if in_table:
+        append("        </table>\n")
+    if in_list:
+        append(f"        </{list_type}>\n")
+    return "".join(out)
+
+
+def _bytecode_cache() -> Optional[FileSystemBytecodeCache]:
+    """On-disk cache of compiled templates, so worker processes skip the Jinja compile step"""
+    cache_dir = os.getenv("REPORT_TEMPLATE_CACHE_DIR", "cache/jinja")
+    if not cache_dir:
+        return None
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+    except OSError as e:
+        print(f"Warning: Template bytecode cache disabled ({cache_dir}): {e}")
+        return None
+    return FileSystemBytecodeCache(cache_dir)
+
+
+_environment = Environment(
+    loader=FileSystemLoader("templates"),
+    autoescape=True,
+    trim_blocks=True,
+    lstrip_blocks=True,
+    bytecode_cache=_bytecode_cache(),
+)
+_environment.globals["asset_url"] = asset_url
+
+# Compiled once at import; Jinja re-checks the file's mtime only when auto_reload is on
+report_template = _environment.get_template("report.html")
+
+_BODY_SLOT = Markup("<!--report-body-->")
+
+
+def render_report_document(content: str, language: str = "en", form_data: dict = None,
+                           report_date: Optional[str] = None) -> str:
+    """Render a full report page: the templates/report.html shell around render_report_body(content).
+
+    Form values are HTML-escaped by the template and handed to report.js as a
+    JSON literal, so quotes or markup typed into the form cannot break the page.
+    """
+    other_info = ((form_data or {}).get('other_info') or '').strip()
+    content_lower = content.lower() if other_info else ''
+    shell = report_template.render(
+        language=language,
+        t=REPORT_TRANSLATIONS.get(language, REPORT_TRANSLATIONS["en"]),
+        report_date=report_date or datetime.now().strftime('%d %B %Y'),
+        form_data=form_data,
+        form_values={
+            key: (form_data or {}).get(key, '')
+            for key in ('brand', 'product', 'budget', 'enterprise_size', 'other_info')
+        },
+        other_info=other_info,
+        other_info_fallback=bool(other_info) and not any(keyword in content_lower for keyword in _OTHER_INFO_KEYWORDS),
+        body=_BODY_SLOT,
+    )
+    # The body is spliced in after rendering: passing it through the template
+    # would run markupsafe's escape() over the whole fragment just to mark it safe
+    head, tail = shell.split(_BODY_SLOT, 1)
+    return "".join((head, render_report_body(content), tail))
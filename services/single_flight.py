@@ -0,0 +1,74 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class _Call:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesce concurrent identical calls onto one in-flight task.
+
+    The first caller for a key starts the work; callers arriving while it runs
+    await the same task and receive the same result (or exception). The shared
+    task is only cancelled once every waiter has gone away, so one client
+    disconnecting does not cancel the work for the others.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._calls
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn() for key, or attach to the identical call already in flight"""
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            self.leaders += 1
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+        else:
+            self.coalesced += 1
+        return await self._wait(call)
+
+    async def join(self, key: str) -> Optional[Any]:
+        """Await the call in flight for key; returns None when there is none"""
+        call = self._calls.get(key)
+        if call is None:
+            return None
+        self.coalesced += 1
+        return await self._wait(call)
+
+    async def _wait(self, call: _Call) -> Any:
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Last interested caller left (cancelled); stop the shared work
+                call.task.cancel()
+
+    def _forget(self, key: str, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._calls),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+        }
+
+
+# Create global instance for LLM report generation
+report_single_flight = SingleFlight()
@@ -0,0 +1,70 @@
+import hashlib
+import os
+import threading
+from typing import Dict, Tuple
+
+from dotenv import load_dotenv
+from starlette.staticfiles import StaticFiles
+
+load_dotenv()
+
+STATIC_DIR = "static"
+
+
+class AssetFingerprints:
+    """Content hashes for files under /static, used as ?v= cache busters.
+
+    A hash is recomputed only when the file's mtime or size changes, so
+    editing an asset in development is picked up without a restart.
+    """
+
+    def __init__(self, directory: str = STATIC_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._hashes: Dict[str, Tuple[float, int, str]] = {}
+
+    def fingerprint(self, path: str) -> str:
+        full_path = os.path.join(self.directory, path)
+        stat = os.stat(full_path)
+        with self._lock:
+            cached = self._hashes.get(path)
+            if cached and cached[:2] == (stat.st_mtime, stat.st_size):
+                return cached[2]
+        with open(full_path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:12]
+        with self._lock:
+            self._hashes[path] = (stat.st_mtime, stat.st_size, digest)
+        return digest
+
+    def url(self, path: str) -> str:
+        """Versioned URL for a file under /static, e.g. /static/css/report.css?v=1a2b3c4d5e6f"""
+        try:
+            return f"/static/{path}?v={self.fingerprint(path)}"
+        except OSError:
+            return f"/static/{path}"
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles that lets browsers cache assets.
+
+    Requests carrying a ?v= fingerprint are immutable for a year, since any
+    change to the file changes the URL; unversioned requests get a short
+    max-age (STATIC_MAX_AGE) and revalidate with the ETag StaticFiles sets.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_age = int(os.getenv("STATIC_MAX_AGE", "3600"))
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if b"v=" in scope.get("query_string", b""):
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        else:
+            response.headers["Cache-Control"] = f"public, max-age={self.max_age}"
+        return response
+
+
+# Create global instance
+static_assets = AssetFingerprints()
+asset_url = static_assets.url
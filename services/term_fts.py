@@ -0,0 +1,175 @@
+import os
+import re
+import threading
+from typing import List, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from database.models import engine
+
+load_dotenv()
+
+# (id, term, description, category)
+TermRow = Tuple[int, str, Optional[str], Optional[str]]
+
+# External-content FTS5 table over product_terms: the text lives once, in product_terms,
+# and the triggers keep the full-text index in step with every insert, update and delete
+_FTS_DDL = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS product_terms_fts USING fts5(
+        term, description,
+        content='product_terms', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3 4'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS product_terms_fts_ai AFTER INSERT ON product_terms BEGIN
+        INSERT INTO product_terms_fts(rowid, term, description) VALUES (new.id, new.term, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS product_terms_fts_ad AFTER DELETE ON product_terms BEGIN
+        INSERT INTO product_terms_fts(product_terms_fts, rowid, term, description)
+        VALUES ('delete', old.id, old.term, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS product_terms_fts_au AFTER UPDATE OF term, description ON product_terms BEGIN
+        INSERT INTO product_terms_fts(product_terms_fts, rowid, term, description)
+        VALUES ('delete', old.id, old.term, old.description);
+        INSERT INTO product_terms_fts(rowid, term, description) VALUES (new.id, new.term, new.description);
+    END""",
+)
+
+# Terms equal to the query first, then terms starting with it, then by relevance.
+# bm25 weighs a hit in the term ten times a hit in the description; lower is better.
+# A page resumes after the sort key of the previous page's last row (the term breaks
+# ties, being unique) instead of skipping an OFFSET of rows; every match is still
+# scored, since bm25 decides the order.
+_SEARCH_SQL = text("""
+    WITH matches AS (
+        SELECT p.id, p.term, p.description, p.category,
+            CASE WHEN lower(p.term) = lower(:q) THEN 0 WHEN p.term LIKE :prefix ESCAPE '\\' THEN 1 ELSE 2 END AS match_class,
+            bm25(product_terms_fts, 10.0, 1.0) AS score,
+            length(p.term) AS term_length
+        FROM product_terms_fts
+        JOIN product_terms AS p ON p.id = product_terms_fts.rowid
+        WHERE product_terms_fts MATCH :match
+    )
+    SELECT id, term, description, category, match_class, score, term_length
+    FROM matches
+    WHERE :after_term IS NULL
+        OR (match_class, score, term_length, term) > (:after_class, :after_score, :after_length, :after_term)
+    ORDER BY match_class, score, term_length, term
+    LIMIT :limit OFFSET :offset
+""")
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def match_expression(q: str) -> Optional[str]:
+    """FTS5 query matching every word of q as a prefix, or None if q has no words"""
+    tokens = _TOKEN_RE.findall(q)
+    if not tokens:
+        return None
+    # Quoted so words like AND / NOT / NEAR are matched rather than parsed as operators
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def _like_prefix(q: str) -> str:
+    return q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def search_params(q: str, limit: int, offset: int = 0, after: Optional[list] = None) -> dict:
+    """Parameters for _SEARCH_SQL; after is the sort key of the row to resume after"""
+    if after is None:
+        after = [None] * 4
+    elif not (isinstance(after, (list, tuple)) and len(after) == 4 and isinstance(after[0], int)
+              and isinstance(after[1], (int, float)) and isinstance(after[2], int) and isinstance(after[3], str)):
+        raise ValueError("not a full-text search sort key")
+    return {
+        "match": match_expression(q), "q": q, "prefix": _like_prefix(q), "limit": limit, "offset": offset,
+        "after_class": after[0], "after_score": after[1], "after_length": after[2], "after_term": after[3],
+    }
+
+
+class TermFts:
+    """Product term search on an SQLite FTS5 index (TERM_SEARCH_BACKEND=fts).
+
+    product_terms_fts indexes term and description and is kept in sync by
+    triggers, so writes from any process or tool are searchable as soon as
+    they commit. Each word of the query is matched as a word prefix
+    ("live hor" finds "LIVE HORSES"), accents folded; results put exact and
+    whole-term prefix matches first and then rank by bm25. Unlike the ILIKE
+    search it does not match inside words ("orse").
+
+    The table is created on first use and filled from product_terms when it
+    is new. Without SQLite or FTS5 the search reports itself unavailable and
+    the endpoints keep using ILIKE.
+    """
+
+    def __init__(self):
+        self.backend = os.getenv("TERM_SEARCH_BACKEND", "index").lower()
+        self._lock = threading.Lock()
+        self._available: Optional[bool] = None
+        self.searches = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend == "fts" and self._available is not False
+
+    def setup(self) -> bool:
+        """Create product_terms_fts and its triggers if missing; False when FTS5 cannot be used"""
+        if self._available is not None:
+            return self._available
+        with self._lock:
+            if self._available is not None:
+                return self._available
+            if engine.dialect.name != "sqlite":
+                print(f"Warning: Full-text term search needs SQLite, not {engine.dialect.name}; using ILIKE search")
+                self._available = False
+                return False
+            try:
+                with engine.begin() as conn:
+                    exists = conn.exec_driver_sql(
+                        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'product_terms_fts'"
+                    ).first()
+                    for statement in _FTS_DDL:
+                        conn.exec_driver_sql(statement)
+                    if not exists:
+                        conn.exec_driver_sql("INSERT INTO product_terms_fts(product_terms_fts) VALUES ('rebuild')")
+                        print("Full-text term index created")
+            except OperationalError as e:
+                print(f"Warning: SQLite FTS5 unavailable ({e}); using ILIKE search")
+                self._available = False
+                return False
+            self._available = True
+            return True
+
+    def rebuild(self, db: Session):
+        """Re-index every row and merge the index segments, if product_terms_fts exists; used after bulk loads"""
+        if engine.dialect.name != "sqlite":
+            return
+        exists = db.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'product_terms_fts'")).first()
+        if exists:
+            db.execute(text("INSERT INTO product_terms_fts(product_terms_fts) VALUES ('rebuild')"))
+            db.execute(text("INSERT INTO product_terms_fts(product_terms_fts) VALUES ('optimize')"))
+
+    def search(self, db: Session, q: str, limit: int = 20, offset: int = 0,
+               after: Optional[list] = None) -> Tuple[List[TermRow], bool, Optional[list]]:
+        """Return one page of matches for q, whether more follow, and the sort key of its last row.
+
+        The page starts `offset` matches after the sort key `after` from an
+        earlier page, or at the best match.
+        """
+        if match_expression(q) is None or not self.setup():
+            return [], False, None
+        self.searches += 1
+        limit, offset = max(0, limit), max(0, offset)
+        rows = db.execute(_SEARCH_SQL, search_params(q, limit + 1, offset, after)).all()
+        page = rows[:limit]
+        last_key = list(page[-1][4:]) + [page[-1][1]] if page else after
+        return [tuple(row[:4]) for row in page], len(rows) > limit, last_key
+
+    def stats(self) -> dict:
+        return {"backend": self.backend, "available": self._available, "searches": self.searches}
+
+
+# Create global instance
+term_fts = TermFts()
@@ -0,0 +1,445 @@
+import bisect
+import os
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import event, func
+from sqlalchemy.orm import object_session
+
+from database.models import ProductTerm, SessionLocal
+
+load_dotenv()
+
+# (id, term, description, category)
+TermRow = Tuple[int, str, Optional[str], Optional[str]]
+
+# Sentinel above any character a term can contain, for prefix range scans
+_PREFIX_END = "\U0010ffff"
+# Prefix references pack (word offset << 32 | ordinal) into one integer
+_ORDINAL_MASK = (1 << 32) - 1
+
+
+def table_signature() -> Tuple[int, int, int]:
+    """Row count, max id and total term length of product_terms: cheap, and changes with almost any write"""
+    db = SessionLocal()
+    try:
+        count, max_id, total_length = db.query(
+            func.count(ProductTerm.id), func.max(ProductTerm.id), func.sum(func.length(ProductTerm.term))
+        ).one()
+    finally:
+        db.close()
+    return (count or 0, max_id or 0, total_length or 0)
+
+
+def rank_from_key(key) -> tuple:
+    """A rank taken back from a pagination cursor, checked so it compares with the ranks search() returns"""
+    if (isinstance(key, (list, tuple)) and len(key) == 5 and all(isinstance(value, int) for value in key[:3])
+            and isinstance(key[3], str) and isinstance(key[4], int)):
+        return tuple(key)
+    raise ValueError("not a term index rank")
+
+
+def fold(text: str) -> str:
+    """Case-insensitive form of a term or query, matching what ILIKE compared"""
+    return text.casefold()
+
+
+def _word_starts(folded: str) -> List[int]:
+    """Offsets where a word starts: the first alphanumeric character after a non-alphanumeric one"""
+    return [i for i, ch in enumerate(folded) if ch.isalnum() and (i == 0 or not folded[i - 1].isalnum())]
+
+
+def _grams(folded: str) -> Set[str]:
+    """Bigrams and trigrams of a folded term: bigrams answer two-character queries exactly"""
+    return {folded[i:i + n] for n in (2, 3) for i in range(len(folded) - n + 1)}
+
+
+def _query_grams(q: str) -> Set[str]:
+    return {q} if len(q) <= 3 else {q[i:i + 3] for i in range(len(q) - 2)}
+
+
+class _Entry:
+    __slots__ = ("row", "folded", "starts")
+
+    def __init__(self, row: TermRow):
+        self.row = row
+        self.folded = fold(row[1])
+        self.starts = _word_starts(self.folded)
+
+    def sort_key(self):
+        # Shorter terms first, then alphabetical
+        return (len(self.folded), self.folded, self.row[0])
+
+    def rank(self, q: str) -> Optional[tuple]:
+        """Where this term ranks for q, or None if it does not contain q"""
+        for start in self.starts:
+            if self.folded.startswith(q, start):
+                return (0, start) + self.sort_key()
+        return (1, 0) + self.sort_key() if q in self.folded else None
+
+
+class _Segment:
+    """Immutable snapshot of the terms, built in one pass from the table.
+
+    Entries are stored in rank order (shorter terms first, then alphabetical)
+    and everything else refers to them by ordinal, so a posting list read
+    front to back is already ranked and the structures are flat arrays of
+    integers rather than millions of Python objects.
+    """
+
+    def __init__(self, rows: Iterable[TermRow]):
+        self.entries: List[_Entry] = sorted((_Entry(tuple(row)) for row in rows), key=_Entry.sort_key)
+        self.ordinals: Dict[int, int] = {entry.row[0]: i for i, entry in enumerate(self.entries)}
+
+        # Every word-boundary suffix of every term, sorted: a flattened trie.
+        # Sorting the references themselves orders matches by word offset, then rank.
+        prefixes = sorted(
+            (entry.folded[start:], (start << 32) | ordinal)
+            for ordinal, entry in enumerate(self.entries)
+            for start in entry.starts
+        )
+        self.prefix_refs = array("Q", (ref for _, ref in prefixes))
+
+        postings: Dict[str, List[int]] = {}
+        for ordinal, entry in enumerate(self.entries):
+            for gram in _grams(entry.folded):
+                postings.setdefault(gram, []).append(ordinal)
+        self.grams: Dict[str, array] = {gram: array("I", ordinals) for gram, ordinals in postings.items()}
+
+    def _suffix(self, ref: int) -> str:
+        return self.entries[ref & _ORDINAL_MASK].folded[ref >> 32:]
+
+    def _lower_bound(self, key: str) -> int:
+        lo, hi = 0, len(self.prefix_refs)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._suffix(self.prefix_refs[mid]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def prefix_matches(self, q: str, wanted: int, dead: Set[int]) -> Tuple[List[tuple], Set[int], bool]:
+        """Terms where q starts the term or one of its words: up to `wanted` ranks, the ordinals seen, and whether that is all"""
+        refs = self.prefix_refs[self._lower_bound(q):self._lower_bound(q + _PREFIX_END)]
+        ranks, seen = [], set()
+        for ref in sorted(refs):
+            ordinal = ref & _ORDINAL_MASK
+            if ordinal in seen or ordinal in dead:
+                continue
+            seen.add(ordinal)
+            if len(ranks) == wanted:
+                return ranks, seen, False
+            ranks.append((0, ref >> 32) + self.entries[ordinal].sort_key())
+        return ranks, seen, True
+
+    def substring_matches(self, q: str, wanted: int, exclude: Set[int], dead: Set[int]) -> Tuple[List[tuple], bool]:
+        """Other terms containing q anywhere: up to `wanted` ranks and whether that is all"""
+        postings = sorted((self.grams.get(gram, ()) for gram in _query_grams(q)), key=len)
+        if len(q) < 2:
+            # Shorter than any indexed gram: check every term (the endpoints ask for two characters or more)
+            candidates, verify = range(len(self.entries)), True
+        elif len(postings) == 1:
+            # The gram is the query itself: every posting matches, already in rank order
+            candidates, verify = postings[0], False
+        else:
+            candidates, verify = sorted(set(postings[0]).intersection(*postings[1:])), True
+        ranks = []
+        for ordinal in candidates:
+            if ordinal in exclude or ordinal in dead:
+                continue
+            entry = self.entries[ordinal]
+            if verify and q not in entry.folded:
+                continue
+            if len(ranks) == wanted:
+                return ranks, False
+            ranks.append((1, 0) + entry.sort_key())
+        return ranks, True
+
+
+class TermIndex:
+    """In-process index over product_terms for the autocomplete endpoints.
+
+    Two structures answer a query, both over case-folded terms:
+
+    - a prefix index of every word-boundary suffix of every term, kept as a
+      sorted array and searched by binary search (a flattened trie: the same
+      lookups, a fraction of the memory of nested dicts in Python). It finds
+      terms where the query starts the term or one of its words;
+    - an inverted index from bigrams and trigrams to terms for the remaining
+      substring matches. Posting lists are intersected smallest first and,
+      for queries longer than a trigram, candidates are checked with `in`.
+
+    Results keep the ILIKE '%q%' semantics of the database path but are
+    ranked: the term itself, then terms starting with the query, then terms
+    with a word starting with it (earlier words first), then any other
+    substring; ties go to the shorter term, then alphabetical order. Only as
+    many matches as the requested page needs are ranked (a few pages ahead),
+    and ranked pages are cached per query (TERM_INDEX_CACHE_SIZE) so
+    scrolling through a query does not rank it again.
+
+    The index is built from the table on first use (or at startup). ORM
+    inserts, updates and deletes are applied when their session commits, to
+    a small overlay searched alongside the built segment; once
+    TERM_INDEX_MAX_PENDING changes pile up the segment is rebuilt in the
+    background. Every TERM_INDEX_CHECK_INTERVAL seconds a search also
+    compares a cheap signature of the table (row count, max id, total term
+    length) and rebuilds if something else, such as a bulk load or another
+    process, changed it. refresh() forces a rebuild.
+    """
+
+    def __init__(self):
+        self.backend = os.getenv("TERM_SEARCH_BACKEND", "index").lower()
+        self.check_interval = float(os.getenv("TERM_INDEX_CHECK_INTERVAL", "30"))
+        self.cache_size = int(os.getenv("TERM_INDEX_CACHE_SIZE", "256"))
+        self.max_pending = int(os.getenv("TERM_INDEX_MAX_PENDING", "500"))
+        self._lock = threading.RLock()
+        self._build_lock = threading.Lock()
+        self._segment: Optional[_Segment] = None
+        # Changes since the segment was built: replaced or deleted ordinals, and added or updated terms by id
+        self._dead: Set[int] = set()
+        self._extra: Dict[int, _Entry] = {}
+        # query -> (ranks, ranked rows, whether that is every match)
+        self._results: "OrderedDict[str, Tuple[List[tuple], List[TermRow], bool]]" = OrderedDict()
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._checked_at = 0.0
+        self._rebuilding = False
+        self.built_at: Optional[float] = None
+        self.build_seconds: Optional[float] = None
+        self.builds = 0
+        self.updates = 0
+        self.searches = 0
+        self.cache_hits = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend == "index"
+
+    @property
+    def ready(self) -> bool:
+        return self._segment is not None
+
+    # Building
+
+    def build_from_rows(self, rows: Iterable[TermRow]):
+        """Replace the index contents with rows; used by build() and the benchmark"""
+        started = time.perf_counter()
+        segment = _Segment(rows)
+        with self._lock:
+            self._segment = segment
+            self._dead = set()
+            self._extra = {}
+            self._signature = self._live_signature()
+            self._results.clear()
+            self._checked_at = time.monotonic()
+            self.built_at = time.time()
+            self.build_seconds = round(time.perf_counter() - started, 3)
+            self.builds += 1
+
+    def build(self):
+        """Load every product term from the database and rebuild the index"""
+        with self._build_lock:
+            self._load()
+
+    def _load(self):
+        db = SessionLocal()
+        try:
+            rows = db.query(ProductTerm.id, ProductTerm.term, ProductTerm.description, ProductTerm.category).all()
+        finally:
+            db.close()
+        self.build_from_rows(rows)
+        print(f"Term index built: {len(rows)} terms in {self.build_seconds}s")
+
+    def refresh(self):
+        """Rebuild from the database, e.g. after loading terms outside the ORM"""
+        self.build()
+
+    def _rebuild_in_background(self):
+        if self._rebuilding:
+            return
+        self._rebuilding = True
+
+        def run():
+            try:
+                self.build()
+            except Exception as e:
+                print(f"Error rebuilding term index: {e}")
+            finally:
+                self._rebuilding = False
+
+        threading.Thread(target=run, name="term-index-rebuild", daemon=True).start()
+
+    def _live_entries(self):
+        dead = self._dead
+        for ordinal, entry in enumerate(self._segment.entries):
+            if ordinal not in dead:
+                yield entry
+        yield from self._extra.values()
+
+    def _live_signature(self) -> Tuple[int, int, int]:
+        count = max_id = total_length = 0
+        for entry in self._live_entries():
+            count += 1
+            max_id = max(max_id, entry.row[0])
+            total_length += len(entry.row[1])
+        return (count, max_id, total_length)
+
+    def ensure_current(self):
+        """Build on first use, then rebuild if the table changed behind the ORM hooks"""
+        if not self.ready:
+            with self._build_lock:
+                if not self.ready:
+                    self._load()
+            return
+        if self.check_interval <= 0 or time.monotonic() - self._checked_at < self.check_interval:
+            return
+        self._checked_at = time.monotonic()
+        try:
+            signature = table_signature()
+        except Exception as e:
+            print(f"Warning: Could not check product_terms for changes: {e}")
+            return
+        if signature != self._signature:
+            self.build()
+
+    # Incremental updates
+
+    def apply_changes(self, changes: List[Tuple[str, TermRow]]):
+        """Apply committed ORM changes: ("upsert", row) or ("delete", row)"""
+        if not self.ready:
+            return
+        with self._lock:
+            for op, row in changes:
+                term_id = row[0]
+                self._extra.pop(term_id, None)
+                ordinal = self._segment.ordinals.get(term_id)
+                if ordinal is not None:
+                    self._dead.add(ordinal)
+                if op != "delete":
+                    self._extra[term_id] = _Entry(tuple(row))
+            self._signature = self._live_signature()
+            self._results.clear()
+            self.updates += 1
+            if len(self._extra) + len(self._dead) > self.max_pending:
+                self._rebuild_in_background()
+
+    # Searching
+
+    def _ranked(self, q: str, wanted: int) -> Tuple[List[tuple], List[TermRow], bool]:
+        cached = self._results.get(q)
+        if cached is not None and (cached[2] or len(cached[0]) >= wanted):
+            self._results.move_to_end(q)
+            self.cache_hits += 1
+            return cached
+
+        # Rank a few pages ahead so scrolling mostly hits the cache
+        wanted = max(wanted, 100)
+        ranks, seen, complete = self._segment.prefix_matches(q, wanted, self._dead)
+        if complete:
+            # With the page already full this only finds out whether more matches follow
+            more, complete = self._segment.substring_matches(q, wanted - len(ranks), seen, self._dead)
+            ranks += more
+        rows_by_id = {}
+        for entry in self._extra.values():
+            rank = entry.rank(q)
+            if rank is not None:
+                ranks.append(rank)
+                rows_by_id[entry.row[0]] = entry.row
+        if rows_by_id:
+            ranks.sort()
+            complete = complete and len(ranks) <= wanted
+            ranks = ranks[:wanted]
+
+        segment = self._segment
+        rows = [rows_by_id.get(rank[-1]) or segment.entries[segment.ordinals[rank[-1]]].row for rank in ranks]
+        self._results[q] = (ranks, rows, complete)
+        while len(self._results) > self.cache_size:
+            self._results.popitem(last=False)
+        return ranks, rows, complete
+
+    def search(self, q: str, limit: int = 20, offset: int = 0,
+               after: Optional[tuple] = None) -> Tuple[List[TermRow], bool, Optional[tuple]]:
+        """Return one page of ranked matches for q, whether more follow, and the rank of its last row.
+
+        The page starts `offset` matches after the rank `after` (from an
+        earlier page) or, without it, after the best match. Paging by rank
+        rather than by position neither repeats nor skips terms when the
+        table changes between pages.
+        """
+        self.ensure_current()
+        q = fold(q)
+        limit, offset = max(0, limit), max(0, offset)
+        with self._lock:
+            self.searches += 1
+            wanted = offset + limit + 1
+            while True:
+                ranks, rows, complete = self._ranked(q, wanted)
+                start = offset + (bisect.bisect_right(ranks, after) if after is not None else 0)
+                if complete or len(ranks) > start + limit:
+                    break
+                # The cursor is past what has been ranked so far: rank further
+                wanted = max(start + limit + 1, 2 * len(ranks))
+            page = rows[start:start + limit]
+            last_rank = ranks[start + len(page) - 1] if page else after
+            return page, len(rows) > start + limit, last_rank
+
+    def stats(self) -> dict:
+        with self._lock:
+            segment = self._segment
+            return {
+                "backend": self.backend,
+                "terms": len(segment.entries) - len(self._dead) + len(self._extra) if segment else 0,
+                "prefix_keys": len(segment.prefix_refs) if segment else 0,
+                "grams": len(segment.grams) if segment else 0,
+                "pending_changes": len(self._dead) + len(self._extra),
+                "built_at": self.built_at,
+                "build_seconds": self.build_seconds,
+                "builds": self.builds,
+                "updates": self.updates,
+                "searches": self.searches,
+                "cache_hits": self.cache_hits,
+            }
+
+
+# Create global instance
+term_index = TermIndex()
+
+
+# Keep the index in step with ORM writes. Changes are collected per session
+# during flush and applied only once the transaction commits.
+
+def _record_change(session, op: str, target: ProductTerm):
+    session.info.setdefault("term_index_changes", []).append(
+        (op, (target.id, target.term, target.description, target.category))
+    )
+
+
+@event.listens_for(ProductTerm, "after_insert")
+@event.listens_for(ProductTerm, "after_update")
+def _term_saved(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        _record_change(session, "upsert", target)
+
+
+@event.listens_for(ProductTerm, "after_delete")
+def _term_deleted(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        _record_change(session, "delete", target)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _apply_committed(session):
+    changes = session.info.pop("term_index_changes", None)
+    if changes and term_index.enabled:
+        term_index.apply_changes(changes)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop("term_index_changes", None)
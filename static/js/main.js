@@ -119,42 +119,33 @@ $(document).ready(function () {
         // Add the AI model selection to form data
         formData += '&ai_model=' + encodeURIComponent(selectedModel);
 
+        // One key per submission, reused by every retry so the server generates the report once
+        const idempotencyKey = (window.crypto && crypto.randomUUID)
+            ? crypto.randomUUID()
+            : Date.now().toString(36) + '-' + Math.random().toString(36).slice(2);
+
         // Set a timeout for the request (increased to 15 minutes)
         const requestTimeout = setTimeout(function() {
             $('#splash-screen').css('display', 'none');
             alert('Report generation is taking longer than expected. This can happen with complex reports. Please try again or contact support if the issue persists.');
         }, 900000); // 15 minutes timeout
 
-        // Show progress updates
-        let progressCounter = 0;
-        const progressInterval = setInterval(function() {
-            progressCounter += 2; // Slower progress to be more realistic
-            if (progressCounter <= 85) { // Stop at 85% to avoid showing 100% before completion
-                console.log('Generating report... ' + progressCounter + '%');
-                // Update loading description with more specific messages
-                const messages = [
-                    'Our AI is analyzing market data, competitive landscape, and strategic opportunities for your business expansion.',
-                    'Processing market research data and generating insights...',
-                    'Analyzing competitive landscape and market trends...',
-                    'Generating strategic recommendations and implementation plan...',
-                    'Finalizing report structure and formatting...',
-                    'Almost done! Preparing your comprehensive market analysis...'
-                ];
-                const messageIndex = Math.min(Math.floor(progressCounter / 15), messages.length - 1);
-                $('.loading-description').text(messages[messageIndex]);
-            }
-        }, 20000); // Update every 20 seconds for more realistic progress
-
         // Submit form data via AJAX with retry mechanism
         function submitReport(retryCount = 0) {
             $.ajax({
                 url: '/generate',
                 type: 'POST',
-                data: formData,
+                data: formData + '&async_job=true',
+                headers: { 'Idempotency-Key': idempotencyKey },
                 timeout: 900000, // 15 minutes timeout
                 success: function (response, status, xhr) {
                     clearTimeout(requestTimeout);
-                    clearInterval(progressInterval);
+                    
+                    // The report was queued; follow it through /job-status
+                    if (response.status === 'queued') {
+                        pollJobStatus(response.job_id);
+                        return;
+                    }
                     
                     // Complete all steps
                     completeAllSteps();
@@ -176,7 +167,6 @@ $(document).ready(function () {
                 },
                 error: function (xhr, status, error) {
                     clearTimeout(requestTimeout);
-                    clearInterval(progressInterval);
                     
                     console.error('Report generation error:', {xhr, status, error, retryCount});
                     
@@ -222,8 +212,115 @@ $(document).ready(function () {
             });
         }
         
+        // Stream the report over Server-Sent Events so progress reflects the real output
+        function streamReport() {
+            let sectionCount = 0;
+            let receivedChars = 0;
+            let finished = false;
+            
+            fetch('/generate-stream', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/x-www-form-urlencoded' },
+                body: formData
+            })
+            .then(response => {
+                if (response.status === 401) {
+                    clearTimeout(requestTimeout);
+                    $('#splash-screen').css('display', 'none');
+                    alert('You need to log in to generate reports. Redirecting to login page...');
+                    window.location.href = '/login';
+                    return;
+                }
+                if (!response.ok || !response.body) {
+                    throw new Error(`HTTP error! status: ${response.status}`);
+                }
+                
+                const reader = response.body.getReader();
+                const decoder = new TextDecoder();
+                let buffer = '';
+                
+                function handleEvent(eventName, data) {
+                    if (eventName === 'token') {
+                        receivedChars += data.text.length;
+                        if (sectionCount === 0) {
+                            $('.loading-description').text(`Writing report... (${receivedChars} characters received)`);
+                        }
+                    } else if (eventName === 'section') {
+                        sectionCount++;
+                        $('.loading-description').text(`Writing section ${sectionCount}: ${data.title}`);
+                    } else if (eventName === 'done') {
+                        finished = true;
+                        clearTimeout(requestTimeout);
+                        completeAllSteps();
+                        setTimeout(function() {
+                            $('#splash-screen').css('display', 'none');
+                            window.location.href = data.redirect_url;
+                        }, 1000);
+                    } else if (eventName === 'error') {
+                        finished = true;
+                        clearTimeout(requestTimeout);
+                        $('#splash-screen').css('display', 'none');
+                        alert('An error occurred while generating the report: ' + data.message);
+                    }
+                }
+                
+                function read() {
+                    return reader.read().then(({ done, value }) => {
+                        buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+                        
+                        // Each SSE frame ends with a blank line
+                        let boundary;
+                        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                            const frame = buffer.slice(0, boundary);
+                            buffer = buffer.slice(boundary + 2);
+                            let eventName = 'message';
+                            let dataText = '';
+                            frame.split('\n').forEach(line => {
+                                if (line.startsWith('event: ')) {
+                                    eventName = line.slice(7);
+                                } else if (line.startsWith('data: ')) {
+                                    dataText += line.slice(6);
+                                }
+                            });
+                            if (dataText) {
+                                handleEvent(eventName, JSON.parse(dataText));
+                            }
+                        }
+                        
+                        if (done) {
+                            if (!finished) {
+                                throw new Error('Stream ended before the report was completed');
+                            }
+                            return;
+                        }
+                        return read();
+                    });
+                }
+                return read();
+            })
+            .catch(error => {
+                console.error('Report streaming error:', error);
+                if (finished) {
+                    return;
+                }
+                if (receivedChars === 0) {
+                    // Streaming unavailable (e.g. a buffering proxy): fall back to the regular request
+                    console.log('Falling back to non-streaming report generation');
+                    submitReport();
+                } else {
+                    clearTimeout(requestTimeout);
+                    $('#splash-screen').css('display', 'none');
+                    alert('The connection was interrupted while generating the report. Please try again.');
+                }
+            });
+        }
+        
         // Start the report generation
-        submitReport();
+        if (window.fetch && window.ReadableStream && window.TextDecoder) {
+            streamReport();
+        } else {
+            submitReport();
+        }
     });
     
     // Loading steps animation
@@ -311,41 +408,94 @@ $(document).ready(function () {
     }
 });
 
-// Function to poll job status
+// Follow a queued job: pushed over SSE when available, otherwise by long-polling /job-status
 function pollJobStatus(jobId) {
-    const pollInterval = setInterval(function() {
+    var version = null;
+
+    // Nobody will see the report if the tab closes, so stop generating it
+    function cancelOnLeave() {
+        if (navigator.sendBeacon) {
+            navigator.sendBeacon(`/jobs/${jobId}/cancel`);
+        }
+    }
+    window.addEventListener('pagehide', cancelOnLeave);
+
+    // Apply one status update; returns true once the job has finished
+    function handleStatus(status) {
+        console.log('Job status:', status);
+        version = status.version || version;
+        
+        var finished = ['completed', 'error', 'cancelled', 'not_found'].indexOf(status.status) !== -1;
+        if (finished) {
+            window.removeEventListener('pagehide', cancelOnLeave);
+        }
+        
+        if (status.status === 'completed') {
+            // Complete all steps
+            $('.step').removeClass('active').addClass('completed');
+            
+            // Small delay before redirect for better UX
+            setTimeout(function() {
+                $('#splash-screen').css('display', 'none');
+                window.location.href = status.redirect_url;
+            }, 1000);
+            return true;
+        } else if (status.status === 'error') {
+            $('#splash-screen').css('display', 'none');
+            alert('Error generating report: ' + status.error);
+            return true;
+        } else if (status.status === 'not_found') {
+            $('#splash-screen').css('display', 'none');
+            alert('Report job not found. Please try again.');
+            return true;
+        } else if (status.status === 'cancelled') {
+            $('#splash-screen').css('display', 'none');
+            return true;
+        } else if (status.status === 'processing') {
+            console.log('Progress:', status.progress + '%');
+            $('#splash-screen .loading-description').text('Generating report... ' + status.progress + '%');
+        }
+        return false;
+    }
+
+    function longPoll(failures) {
         $.ajax({
             url: `/job-status/${jobId}`,
             type: 'GET',
+            data: version ? {wait: 30, since: version} : {wait: 30},
+            timeout: 45000,
             success: function(status) {
-                console.log('Job status:', status);
-                
-                if (status.status === 'completed') {
-                    clearInterval(pollInterval);
-                    // Complete all steps
-                    completeAllSteps();
-                    
-                    // Small delay before redirect for better UX
-                    setTimeout(function() {
-                        $('#splash-screen').css('display', 'none');
-                        window.location.href = status.redirect_url;
-                    }, 1000);
-                } else if (status.status === 'error') {
-                    clearInterval(pollInterval);
-                    $('#splash-screen').css('display', 'none');
-                    alert('Error generating report: ' + status.error);
-                } else if (status.status === 'processing') {
-                    // Update progress if needed
-                    console.log('Progress:', status.progress + '%');
+                if (!handleStatus(status)) {
+                    longPoll(0);
                 }
             },
             error: function() {
-                clearInterval(pollInterval);
+                if (failures < 3) {
+                    setTimeout(function() { longPoll(failures + 1); }, 2000);
+                    return;
+                }
                 $('#splash-screen').css('display', 'none');
                 alert('Error checking report status.');
             }
         });
-    }, 2000); // Poll every 2 seconds
+    }
+
+    if (!window.EventSource) {
+        longPoll(0);
+        return;
+    }
+
+    var source = new EventSource(`/job-events/${jobId}`);
+    source.addEventListener('status', function(e) {
+        if (handleStatus(JSON.parse(e.data))) {
+            source.close();
+        }
+    });
+    source.onerror = function() {
+        // Hand over to long-polling rather than letting EventSource reconnect forever
+        source.close();
+        longPoll(0);
+    };
 }
 
 // Translation function
@@ -407,6 +557,9 @@ function initializeSelect2Input() {
         return;
     }
     
+    // Cursor for each page of the current search, from the response to the page before it
+    let termCursors = { term: null, pages: {} };
+    
     // Initialize Select2
     try {
         $(productSelect).select2({
@@ -415,14 +568,26 @@ function initializeSelect2Input() {
             dataType: 'json',
             delay: 300,
             data: function (params) {
-                return {
+                const page = params.page || 1;
+                if (page === 1) {
+                    termCursors = { term: params.term, pages: {} };
+                }
+                const query = {
                     q: params.term,
-                    page: params.page || 1,
                     per_page: 20
                 };
+                if (termCursors.term === params.term && termCursors.pages[page]) {
+                    query.cursor = termCursors.pages[page];
+                } else {
+                    query.page = page;
+                }
+                return query;
             },
             processResults: function (data, params) {
                 params.page = params.page || 1;
+                if (data.pagination.cursor && termCursors.term === params.term) {
+                    termCursors.pages[params.page + 1] = data.pagination.cursor;
+                }
                 
                 return {
                     results: data.results.map(function(item) {
@@ -430,7 +595,8 @@ function initializeSelect2Input() {
                             id: item.id,
                             text: item.text,
                             description: item.description,
-                            category: item.category
+                            category: item.category,
+                            fuzzy: item.fuzzy || false
                         };
                     }),
                     pagination: {
@@ -659,6 +825,19 @@ function formatProductOption(product) {
         return $container;
     }
     
+    // Near matches offered when nothing matched what was typed
+    if (product.fuzzy) {
+        const $container = $(
+            '<div class="select2-result-text">' +
+                '<div class="select2-result-hint">Did you mean</div>' +
+                '<div class="select2-result-term">' + product.text + '</div>' +
+                '<div class="select2-result-description">' + (product.description || '') + '</div>' +
+                (product.category ? '<div class="select2-result-category">' + product.category + '</div>' : '') +
+            '</div>'
+        );
+        return $container;
+    }
+    
     const $container = $(
         '<div class="select2-result-text">' +
             '<div class="select2-result-term">' + product.text + '</div>' +
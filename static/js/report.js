@@ -0,0 +1,360 @@
+/* Report page actions: PDF download, save to account, navigation. Loaded by every generated report. */
+const HTML2PDF_URL = 'https://cdnjs.cloudflare.com/ajax/libs/html2pdf.js/0.10.1/html2pdf.bundle.min.js';
+
+// Define the function immediately when script loads
+function downloadPDF() {
+    // Show loading state
+    const btn = event.target.closest('.action-btn') || event.target;
+    const originalText = btn.innerHTML;
+    btn.innerHTML = '⏳ Generating PDF...';
+    btn.disabled = true;
+
+    // The server renders (and caches) the PDF; fall back to the in-browser export when it can't
+    const reportName = window.location.pathname.split('/').pop().replace(/\.html$/, '');
+    fetch('/download/' + encodeURIComponent(reportName) + '.pdf')
+        .then(function(response) {
+            if (!response.ok) {
+                throw new Error('Server PDF export unavailable (HTTP ' + response.status + ')');
+            }
+            return response.blob();
+        })
+        .then(function(blob) {
+            const link = document.createElement('a');
+            link.href = URL.createObjectURL(blob);
+            link.download = 'AI_Trade_Report.pdf';
+            document.body.appendChild(link);
+            link.click();
+            link.remove();
+            setTimeout(function() { URL.revokeObjectURL(link.href); }, 1000);
+            btn.innerHTML = originalText;
+            btn.disabled = false;
+        })
+        .catch(function(error) {
+            console.warn(error);
+            downloadPDFInBrowser(btn, originalText);
+        });
+}
+
+// html2pdf is only fetched when the server-side export is not available
+function loadHtml2Pdf() {
+    if (window.html2pdf) {
+        return Promise.resolve();
+    }
+    return new Promise(function(resolve, reject) {
+        const script = document.createElement('script');
+        script.src = HTML2PDF_URL;
+        script.onload = resolve;
+        script.onerror = reject;
+        document.head.appendChild(script);
+    });
+}
+
+function downloadPDFInBrowser(btn, originalText) {
+    const element = document.getElementById('report-content');
+
+   // Wait for fonts and images to load
+   setTimeout(function() {
+       // First, ensure the element is visible and has content
+       if (!element || element.offsetHeight === 0 || element.offsetWidth === 0) {
+           alert('Report content not found. Please refresh the page and try again.');
+           btn.innerHTML = originalText;
+           btn.disabled = false;
+           return;
+       }
+
+       // Ensure the element is visible and has content
+       const rect = element.getBoundingClientRect();
+       if (rect.width === 0 || rect.height === 0) {
+           alert('Report content is not visible. Please scroll to the report and try again.');
+           btn.innerHTML = originalText;
+           btn.disabled = false;
+           return;
+       }
+
+       // Force a reflow to ensure content is rendered
+       element.style.display = 'none';
+       element.offsetHeight; // Trigger reflow
+       element.style.display = 'block';
+
+       // Ensure all content is visible and expanded
+       element.style.height = 'auto';
+       element.style.minHeight = '100vh';
+       element.style.overflow = 'visible';
+
+       // Wait a bit more for any dynamic content to render
+       setTimeout(function() {
+
+       const opt = {
+           margin: [0.5, 0.5, 0.5, 0.5],
+           filename: 'AI_Trade_Report.pdf',
+           image: { type: 'jpeg', quality: 0.98 },
+           html2canvas: { 
+               scale: 1.2,
+               useCORS: true,
+               allowTaint: true,
+               backgroundColor: '#ffffff',
+               logging: false,
+               letterRendering: true,
+               width: element.scrollWidth,
+               height: element.scrollHeight,
+               scrollX: 0,
+               scrollY: 0,
+               windowWidth: element.scrollWidth,
+               windowHeight: element.scrollHeight
+           },
+           jsPDF: { 
+               unit: 'in', 
+               format: 'a4', 
+               orientation: 'portrait',
+               compress: true
+           },
+           pagebreak: { mode: ['css', 'legacy'] }
+       };
+
+      // Debug: Log element dimensions
+      console.log('Element dimensions:', {
+          width: element.offsetWidth,
+          height: element.offsetHeight,
+          scrollWidth: element.scrollWidth,
+          scrollHeight: element.scrollHeight,
+          rect: element.getBoundingClientRect()
+      });
+
+      // Try the main PDF generation
+      loadHtml2Pdf().then(function() {
+          return html2pdf().set(opt).from(element).save();
+      }).then(function() {
+          btn.innerHTML = originalText;
+          btn.disabled = false;
+      }).catch(function(error) {
+          console.error('PDF generation failed:', error);
+
+          // Fallback: Try with simpler options
+          const simpleOpt = {
+              margin: 0.5,
+              filename: 'AI_Trade_Report.pdf',
+              image: { type: 'jpeg', quality: 0.8 },
+              html2canvas: { 
+                  scale: 1,
+                  backgroundColor: '#ffffff',
+                  width: element.scrollWidth,
+                  height: element.scrollHeight,
+                  useCORS: true,
+                  scrollX: 0,
+                  scrollY: 0
+              },
+              jsPDF: { unit: 'in', format: 'a4', orientation: 'portrait' }
+          };
+
+          html2pdf().set(simpleOpt).from(element).save().then(function() {
+              btn.innerHTML = originalText;
+              btn.disabled = false;
+          }).catch(function(fallbackError) {
+              console.error('Fallback PDF generation also failed:', fallbackError);
+              alert('PDF generation failed. Please use the Print button and save as PDF from your browser instead.');
+              btn.innerHTML = originalText;
+              btn.disabled = false;
+          });
+      });
+  }, 500);
+}, 1000);
+}
+
+// Also make it available on window object
+window.downloadPDF = downloadPDF;
+
+// Save report function
+// Track if report is saved
+let isReportSaved = false;
+
+function saveReport() {
+console.log('Save report function called');
+
+const btn = event.target.closest('.action-btn');
+if (!btn) {
+  console.error('Save button not found');
+  return;
+}
+
+// Check if already saved
+if (isReportSaved) {
+  btn.innerHTML = '✅ Already Saved';
+  btn.style.background = 'linear-gradient(135deg, #10b981, #059669)';
+  btn.disabled = true;
+
+  setTimeout(() => {
+      btn.innerHTML = '💾 Save';
+      btn.style.background = 'linear-gradient(135deg, #8b5cf6, #7c3aed)';
+      btn.disabled = false;
+  }, 2000);
+  return;
+}
+
+const originalText = btn.innerHTML;
+
+// Show loading state
+btn.innerHTML = '⏳ Saving...';
+btn.disabled = true;
+
+try {
+  // Get report data
+  const reportTitle = document.querySelector('h1')?.textContent || 'AI Trade Report';
+  const reportContent = document.getElementById('report-content')?.innerHTML || '';
+  const currentUrl = window.location.pathname;
+  const filename = currentUrl.split('/').pop() || 'unknown_report.html';
+
+  console.log('Report data extracted:', {
+      title: reportTitle,
+      filename: filename,
+      contentLength: reportContent.length
+  });
+
+  // Extract form data from embedded JavaScript variable
+  let brand = 'Unknown Brand';
+  let product = 'Unknown Product';
+  let budget = 'Unknown Budget';
+  let enterpriseSize = 'Unknown Size';
+
+  // Try to get from embedded form data first
+  if (window.formData) {
+      console.log('Found window.formData:', window.formData);
+      brand = window.formData.brand || 'Unknown Brand';
+      product = window.formData.product || 'Unknown Product';
+      budget = window.formData.budget || 'Unknown Budget';
+      enterpriseSize = window.formData.enterprise_size || 'Unknown Size';
+      console.log('Extracted form data from embedded variable:', { brand, product, budget, enterpriseSize });
+  } else {
+      console.log('No window.formData found, trying URL parameters...');
+      // Fallback to URL parameters
+      const urlParams = new URLSearchParams(window.location.search);
+      console.log('Current URL:', window.location.href);
+      console.log('URL search params:', window.location.search);
+      console.log('URL params object:', Object.fromEntries(urlParams));
+
+      brand = urlParams.get('brand') || 'Unknown Brand';
+      product = urlParams.get('product') || 'Unknown Product';
+      budget = urlParams.get('budget') || 'Unknown Budget';
+      enterpriseSize = urlParams.get('enterprise_size') || 'Unknown Size';
+
+      console.log('Extracted form data from URL (fallback):', { brand, product, budget, enterpriseSize });
+  }
+
+  // Prepare data for API
+  const reportData = {
+      title: reportTitle,
+      brand: brand,
+      product: product,
+      budget: budget,
+      enterprise_size: enterpriseSize,
+      ai_model: 'gpt-5',
+      language: 'en',
+      content: reportContent,
+      file_path: filename
+  };
+
+  console.log('Sending data to API:', reportData);
+  console.log('Final data being sent:', {
+      title: reportData.title,
+      brand: reportData.brand,
+      product: reportData.product,
+      budget: reportData.budget,
+      enterprise_size: reportData.enterprise_size
+  });
+
+  // Send to database
+  fetch('/save-report', {
+      method: 'POST',
+      headers: {
+          'Content-Type': 'application/json',
+      },
+      body: JSON.stringify(reportData)
+  })
+  .then(response => {
+      console.log('API response status:', response.status);
+      if (!response.ok) {
+          throw new Error(`HTTP error! status: ${response.status}`);
+      }
+      return response.json();
+  })
+  .then(data => {
+      console.log('API response data:', data);
+      if (data.status === 'success') {
+          isReportSaved = true; // Mark as saved
+          btn.innerHTML = '✅ Saved!';
+          btn.style.background = 'linear-gradient(135deg, #10b981, #059669)';
+
+          setTimeout(() => {
+              btn.innerHTML = '💾 Save';
+              btn.style.background = 'linear-gradient(135deg, #8b5cf6, #7c3aed)';
+              btn.disabled = false;
+          }, 2000);
+      } else {
+          throw new Error(data.message || 'Failed to save report');
+      }
+  })
+  .catch(error => {
+      console.error('Error saving report:', error);
+      btn.innerHTML = '❌ Error';
+      btn.style.background = 'linear-gradient(135deg, #ef4444, #dc2626)';
+
+      setTimeout(() => {
+          btn.innerHTML = originalText;
+          btn.style.background = 'linear-gradient(135deg, #8b5cf6, #7c3aed)';
+          btn.disabled = false;
+      }, 3000);
+  });
+} catch (error) {
+  console.error('Error in saveReport function:', error);
+  btn.innerHTML = '❌ Error';
+  btn.style.background = 'linear-gradient(135deg, #ef4444, #dc2626)';
+
+  setTimeout(() => {
+      btn.innerHTML = originalText;
+      btn.style.background = 'linear-gradient(135deg, #8b5cf6, #7c3aed)';
+      btn.disabled = false;
+  }, 3000);
+}
+}
+
+// Return to main page function
+function returnToMain() {
+if (isReportSaved) {
+  // If report is saved, go directly without warning
+  window.location.href = '/';
+} else {
+  // If not saved, show warning
+  if (confirm('Are you sure you want to return to the main page? Your current report will be lost.')) {
+      window.location.href = '/';
+  }
+}
+}
+
+// Make functions available globally
+window.saveReport = saveReport;
+window.returnToMain = returnToMain;
+
+  // Hide header when printing
+window.addEventListener('beforeprint', function() {
+const header = document.querySelector('.report-header');
+if (header) header.style.display = 'none';
+});
+
+window.addEventListener('afterprint', function() {
+const header = document.querySelector('.report-header');
+if (header) header.style.display = 'block';
+});
+
+// Ensure function is available when DOM is ready
+document.addEventListener('DOMContentLoaded', function() {
+// Function should be available now
+if (typeof downloadPDF === 'function') {
+  console.log('downloadPDF function is ready');
+} else {
+  console.error('downloadPDF function not properly defined');
+}
+});
+
+// Also try to make it available immediately
+if (typeof downloadPDF === 'function') {
+console.log('downloadPDF function loaded successfully');
+}
@@ -0,0 +1,23 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Point the app at a throwaway database before anything imports database.models
+_DB_DIR = tempfile.mkdtemp(prefix="ai_trade_report_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+os.environ.setdefault("REPORT_CACHE_DIR", os.path.join(_DB_DIR, "report_cache"))
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database.models import Base, engine  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def fresh_database():
+    """Every test starts with empty tables"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield
@@ -0,0 +1,137 @@
+import asyncio
+import json
+import threading
+from datetime import timedelta
+
+import pytest
+
+from services.idempotency import IdempotencyStore
+
+
+@pytest.fixture
+def store():
+    store = IdempotencyStore()
+    store.wait_interval = 0.01
+    return store
+
+
+def test_first_request_claims_the_key(store):
+    assert store.begin(1, "key", "fp") == (None, True)
+
+
+def test_repeat_gets_the_existing_record(store):
+    store.begin(1, "key", "fp")
+    record, created = store.begin(1, "key", "fp")
+    assert not created
+    assert record == {"fingerprint": "fp", "job_id": None, "response": None}
+    assert store.replays == 1
+
+
+def test_keys_are_per_user(store):
+    store.begin(1, "key", "fp")
+    assert store.begin(2, "key", "fp") == (None, True)
+
+
+def test_replay_returns_the_recorded_job_or_response(store):
+    store.begin(1, "queued", "fp")
+    store.attach_job(1, "queued", "job-1")
+    assert store.begin(1, "queued", "fp")[0]["job_id"] == "job-1"
+
+    store.begin(1, "inline", "fp")
+    store.complete(1, "inline", {"status": "success", "report_name": "r.html"})
+    assert store.begin(1, "inline", "fp")[0]["response"] == {"status": "success", "report_name": "r.html"}
+
+
+def test_released_key_can_be_claimed_again(store):
+    store.begin(1, "key", "fp")
+    store.release(1, "key")
+    assert store.get(1, "key") is None
+    assert store.begin(1, "key", "other") == (None, True)
+
+
+def test_expired_key_is_forgotten(store):
+    store.begin(1, "key", "fp")
+    store.ttl = timedelta(seconds=-1)
+    assert store.get(1, "key") is None
+    assert store.begin(1, "key", "fp") == (None, True)
+
+
+def test_abandoned_claim_is_taken_over_after_the_lease(store):
+    store.begin(1, "key", "fp")
+    assert not store.begin(1, "key", "fp")[1]
+    store.lease = timedelta(seconds=-1)
+    assert store.begin(1, "key", "fp") == (None, True)
+
+
+def test_lease_does_not_take_over_a_finished_request_or_other_parameters(store):
+    store.lease = timedelta(seconds=-1)
+    store.begin(1, "done", "fp")
+    store.complete(1, "done", {"status": "success"})
+    assert store.begin(1, "done", "fp")[0]["response"] == {"status": "success"}
+
+    store.begin(1, "pending", "fp")
+    record, created = store.begin(1, "pending", "other")
+    assert not created and record["fingerprint"] == "fp"
+
+
+def test_fingerprint_ignores_parameter_order():
+    assert IdempotencyStore.fingerprint({"a": 1, "b": 2}) == IdempotencyStore.fingerprint({"b": 2, "a": 1})
+    assert IdempotencyStore.fingerprint({"a": 1}) != IdempotencyStore.fingerprint({"a": 2})
+
+
+def test_wait_returns_once_the_holder_records_its_response(store):
+    store.begin(1, "key", "fp")
+    threading.Timer(0.05, store.complete, (1, "key", {"status": "success"})).start()
+    record = asyncio.run(store.wait(1, "key", timeout=5))
+    assert record["response"] == {"status": "success"}
+
+
+def test_wait_returns_none_when_the_holder_releases(store):
+    store.begin(1, "key", "fp")
+    threading.Timer(0.05, store.release, (1, "key")).start()
+    assert asyncio.run(store.wait(1, "key", timeout=5)) is None
+
+
+def test_wait_gives_up_at_the_timeout(store):
+    store.begin(1, "key", "fp")
+    record = asyncio.run(store.wait(1, "key", timeout=0.05))
+    assert record == {"fingerprint": "fp", "job_id": None, "response": None}
+
+
+class TestResolveIdempotencyKey:
+    """The /generate side: claim, replay or reject a key"""
+
+    @pytest.fixture(autouse=True)
+    def app_module(self):
+        import app
+        self.app = app
+
+    def resolve(self, user_id, key, fingerprint):
+        return asyncio.run(self.app.resolve_idempotency_key(user_id, key, fingerprint))
+
+    def test_new_key_is_claimed(self):
+        assert self.resolve(1, "key", "fp") is None
+
+    def test_completed_request_is_replayed(self):
+        self.app.idempotency_store.begin(1, "key", "fp")
+        self.app.idempotency_store.complete(1, "key", {"status": "success", "report_name": "r.html"})
+        response = self.resolve(1, "key", "fp")
+        assert response.status_code == 200
+        assert json.loads(response.body) == {"status": "success", "report_name": "r.html"}
+
+    def test_queued_request_is_replayed_as_its_job(self):
+        self.app.idempotency_store.begin(1, "key", "fp")
+        self.app.idempotency_store.attach_job(1, "key", "job-1")
+        response = self.resolve(1, "key", "fp")
+        assert response.status_code == 202
+        assert json.loads(response.body)["job_id"] == "job-1"
+
+    def test_abandoned_request_is_taken_over(self, monkeypatch):
+        self.app.idempotency_store.begin(1, "key", "fp")
+        monkeypatch.setattr(self.app.idempotency_store, "lease", timedelta(seconds=-1))
+        assert self.resolve(1, "key", "fp") is None
+
+    def test_reused_key_with_different_parameters_conflicts(self):
+        self.app.idempotency_store.begin(1, "key", "fp")
+        response = self.resolve(1, "key", "other")
+        assert response.status_code == 422
@@ -0,0 +1,146 @@
+import pytest
+
+from services.job_store import JobStore, MemoryJobStore, SQLJobStore
+
+
+@pytest.fixture(params=["memory", "sql"])
+def store(request):
+    return MemoryJobStore() if request.param == "memory" else SQLJobStore()
+
+
+def test_incomplete_store_fails_when_created():
+    class PartialStore(JobStore):
+        def create(self, job_id, payload, user_id=None):
+            pass
+
+    with pytest.raises(TypeError):
+        PartialStore()
+
+
+def test_job_runs_queued_to_completed(store):
+    store.create("job-1", {"brand": "Acme"}, user_id=7)
+    assert store.get("job-1")["status"] == "queued"
+    assert [job["id"] for job in store.list_queued()] == ["job-1"]
+
+    job = store.claim("worker-a")
+    assert job["id"] == "job-1"
+    assert job["user_id"] == 7
+    assert job["payload"] == {"brand": "Acme"}
+    assert store.get("job-1")["status"] == "processing"
+    assert store.list_queued() == []
+
+    assert store.update_progress("job-1", "worker-a", 50)
+    assert store.get("job-1")["progress"] == 50
+    assert store.complete("job-1", "worker-a", {"report_name": "report.html"})
+
+    status = store.get("job-1")
+    assert status["status"] == "completed"
+    assert status["progress"] == 100
+    assert status["report_name"] == "report.html"
+
+
+def test_claim_is_exclusive(store):
+    store.create("job-1", {}, user_id=1)
+    assert store.claim_job("job-1", "worker-a")
+    assert not store.claim_job("job-1", "worker-b")
+    assert store.claim("worker-b") is None
+
+
+def test_only_the_claiming_worker_can_update(store):
+    store.create("job-1", {}, user_id=1)
+    store.claim_job("job-1", "worker-a")
+
+    assert not store.heartbeat("job-1", "worker-b")
+    assert not store.update_progress("job-1", "worker-b", 75)
+    assert not store.complete("job-1", "worker-b", {})
+    assert store.get("job-1")["status"] == "processing"
+
+    assert store.fail("job-1", "worker-a", "boom")
+    assert store.get("job-1")["status"] == "error"
+    # A finished job no longer accepts the worker's calls either
+    assert not store.heartbeat("job-1", "worker-a")
+    assert not store.complete("job-1", "worker-a", {})
+
+
+def test_stale_job_is_requeued_and_old_worker_locked_out(store):
+    store.create("job-1", {}, user_id=1)
+    store.claim_job("job-1", "worker-a")
+
+    # Every heartbeat is older than "one second in the future"
+    assert store.requeue_stale(stale_after_seconds=-1, max_attempts=3) == 1
+    assert store.get("job-1")["status"] == "queued"
+    assert not store.complete("job-1", "worker-a", {})
+
+    assert store.claim_job("job-1", "worker-b")
+    assert store.complete("job-1", "worker-b", {})
+    assert store.get("job-1")["status"] == "completed"
+
+
+def test_stale_job_fails_after_max_attempts(store):
+    store.create("job-1", {}, user_id=1)
+    store.claim_job("job-1", "worker-a")
+    store.requeue_stale(stale_after_seconds=-1, max_attempts=2)
+    store.claim_job("job-1", "worker-b")
+
+    assert store.requeue_stale(stale_after_seconds=-1, max_attempts=2) == 1
+    status = store.get("job-1")
+    assert status["status"] == "error"
+    assert "stopped responding" in status["error"]
+
+
+def test_fresh_heartbeat_is_not_requeued(store):
+    store.create("job-1", {}, user_id=1)
+    store.claim_job("job-1", "worker-a")
+    assert store.requeue_stale(stale_after_seconds=60, max_attempts=3) == 0
+    assert store.get("job-1")["status"] == "processing"
+
+
+def test_cancel_queued_job(store):
+    store.create("job-1", {}, user_id=1)
+    assert store.request_cancel("job-1", user_id=2) is None
+    assert store.request_cancel("job-1", user_id=1) == "cancelled"
+    assert store.claim("worker-a") is None
+
+
+def test_cancel_processing_job_waits_for_worker(store):
+    store.create("job-1", {}, user_id=1)
+    store.claim_job("job-1", "worker-a")
+
+    assert store.request_cancel("job-1", user_id=1) == "cancelling"
+    # The worker learns of the cancel when its heartbeat is refused
+    assert not store.heartbeat("job-1", "worker-a")
+    assert store.finish_cancel("job-1", "worker-a")
+    assert store.get("job-1")["status"] == "cancelled"
+
+
+def test_listeners_hear_every_transition(store):
+    changes = []
+    store.add_listener(changes.append)
+    store.create("job-1", {}, user_id=1)
+    store.claim_job("job-1", "worker-a")
+    store.complete("job-1", "worker-a", {})
+    assert changes == ["job-1", "job-1", "job-1"]
+
+
+def test_sweep_expires_finished_jobs_and_keeps_active_ones(store):
+    store.create("done", {}, user_id=1)
+    store.claim_job("done", "worker-a")
+    store.complete("done", "worker-a", {})
+    store.create("waiting", {}, user_id=1)
+
+    assert store.sweep(ttls={"completed": -1}, max_records=100) == 1
+    assert store.get("done") is None
+    assert store.get("waiting")["status"] == "queued"
+
+
+def test_sweep_evicts_oldest_finished_jobs_over_the_cap(store):
+    for job_id in ("a", "b", "c"):
+        store.create(job_id, {}, user_id=1)
+        store.claim_job(job_id, "worker")
+        store.complete(job_id, "worker", {})
+    store.create("queued", {}, user_id=1)
+
+    assert store.sweep(ttls={}, max_records=2) == 2
+    assert store.count() == 2
+    assert store.get("c") is not None
+    assert store.get("queued") is not None
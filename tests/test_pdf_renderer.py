@@ -0,0 +1,78 @@
+import asyncio
+import os
+
+import pytest
+
+import services.pdf_renderer as pdf_module
+from services.pdf_renderer import PdfBusy, PdfRenderer
+
+
+class SlowRenderExecutor:
+    """Stands in for the render process pool; each render takes `delay` seconds"""
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.calls = 0
+
+    async def run(self, fn, *args):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return b"%PDF-1.4 " + args[1].encode("utf-8")
+
+
+@pytest.fixture
+def executor(monkeypatch):
+    executor = SlowRenderExecutor()
+    monkeypatch.setattr(pdf_module, "render_executor", executor)
+    return executor
+
+
+@pytest.fixture
+def renderer(tmp_path):
+    renderer = PdfRenderer()
+    renderer.engine = "fpdf2"
+    renderer.cache_dir = str(tmp_path / "pdf")
+    return renderer
+
+
+def test_identical_requests_share_one_render(renderer, executor):
+    async def main():
+        return await asyncio.gather(*(renderer.render("report", "en", None, None) for _ in range(3)))
+
+    paths = asyncio.run(main())
+    assert len(set(paths)) == 1 and os.path.exists(paths[0])
+    assert executor.calls == 1
+
+
+def test_first_requester_leaving_does_not_fail_the_others(renderer, executor):
+    async def main():
+        leader = asyncio.create_task(renderer.render("report", "en", None, None))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(renderer.render("report", "en", None, None))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower
+
+    path = asyncio.run(main())
+    assert os.path.exists(path)
+    assert renderer.renders == 1
+
+
+def test_renders_beyond_max_pending_are_turned_away(renderer, executor):
+    renderer.max_pending = 1
+
+    async def main():
+        first = asyncio.create_task(renderer.render("one", "en", None, None))
+        await asyncio.sleep(0)
+        with pytest.raises(PdfBusy):
+            await renderer.render("two", "en", None, None)
+        await first
+
+    asyncio.run(main())
+
+
+def test_cache_is_trimmed_to_its_budget(renderer, executor):
+    renderer.max_disk_bytes = 0
+    path = asyncio.run(renderer.render("report", "en", None, None))
+    assert not os.path.exists(path)
+    assert renderer.evictions == 1
@@ -0,0 +1,86 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch):
+    import app
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "reports").mkdir()
+    return app
+
+
+def run_job(app, **overrides):
+    params = dict(brand="Acme", product="Olive oil", budget="", enterprise_size="small", other_info="",
+                  ai_model="none", language="en", user_id=1)
+    params.update(overrides)
+    app.job_store.create("job-1", params, user_id=1)
+    app.job_store.claim_job("job-1", "worker-a")
+    return app.generate_report_background("job-1", "worker-a", **params)
+
+
+def test_job_writes_the_report_and_completes(app_module):
+    asyncio.run(run_job(app_module))
+    status = app_module.job_store.get("job-1")
+    assert status["status"] == "completed"
+    assert os.path.exists(f"reports/{status['report_name'][:-len('.html')]}.txt")
+
+
+def test_cancel_after_the_files_are_written_removes_them(app_module, monkeypatch):
+    saving = []
+
+    def slow_store_report_record(*args):
+        saving.append(True)
+        time.sleep(0.2)
+
+    monkeypatch.setattr(app_module, "store_report_record", slow_store_report_record)
+
+    async def cancel_while_saving():
+        task = asyncio.create_task(run_job(app_module))
+        while not saving:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_while_saving())
+    assert os.listdir("reports") == []
+
+
+def test_cancel_the_worker_missed_removes_the_files(app_module):
+    async def cancel_before_completion():
+        job = run_job(app_module)
+        # Cancelled, but the worker's heartbeat has not heard yet, so the job runs to the end
+        app_module.job_store.request_cancel("job-1")
+        await job
+
+    asyncio.run(cancel_before_completion())
+    assert os.listdir("reports") == []
+    assert app_module.job_store.get("job-1")["status"] == "cancelled"
+
+
+def test_job_with_an_unsupported_language_fails(app_module):
+    asyncio.run(run_job(app_module, language='en" onload="alert(1)'))
+    status = app_module.job_store.get("job-1")
+    assert status["status"] == "error"
+    assert "Unsupported language" in status["error"]
+    assert os.listdir("reports") == []
+
+
+@pytest.mark.parametrize("path", ["/generate", "/generate-stream"])
+def test_generate_rejects_an_unsupported_language(app_module, path):
+    from fastapi.testclient import TestClient
+
+    from database.models import User
+
+    app_module.app.dependency_overrides[app_module.get_current_user_from_cookie] = lambda: User(id=1, email="a@example.com")
+    try:
+        form = {"brand": "Acme", "product": "Olive oil", "enterprise_size": "small", "language": 'en" x="'}
+        response = TestClient(app_module.app).post(path, data=form)
+    finally:
+        app_module.app.dependency_overrides.clear()
+    assert response.status_code == 400
+    assert "Unsupported language" in response.json()["message"]
@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+import generate_prompt
+from generate_prompt import LLM_ERROR_PREFIX, call_openai_chat_sections_async
+
+SECTIONS = [["Overview"], ["Prices"], ["Outlook"]]
+
+
+@pytest.fixture
+def replies(monkeypatch):
+    """Queue of replies per section group; an exhausted queue repeats its last reply"""
+    queues = {}
+
+    async def fake_call(prompt, model="gpt-5", temperature=0.0):
+        group = next(name for (name,) in SECTIONS if f"- {name}\n" in prompt)
+        queue = queues.setdefault(group, [f"{group} text"])
+        return queue.pop(0) if len(queue) > 1 else queue[0]
+
+    monkeypatch.setattr(generate_prompt, "call_openai_chat_async", fake_call)
+    monkeypatch.setattr(generate_prompt, "SECTION_RETRIES", 1)
+    return queues
+
+
+def generate():
+    return asyncio.run(call_openai_chat_sections_async("prompt", SECTIONS))
+
+
+def test_sections_are_joined_in_order(replies):
+    assert generate() == "Overview text\n\nPrices text\n\nOutlook text"
+
+
+def test_failed_group_is_retried(replies):
+    replies["Prices"] = [f"{LLM_ERROR_PREFIX} timeout", "Prices text"]
+    assert generate() == "Overview text\n\nPrices text\n\nOutlook text"
+
+
+def test_group_that_keeps_failing_fails_the_report(replies):
+    replies["Prices"] = [f"{LLM_ERROR_PREFIX} timeout"]
+    text = generate()
+    assert text.startswith(LLM_ERROR_PREFIX)
+    assert "Overview text" not in text
@@ -0,0 +1,153 @@
+import random
+
+import pytest
+
+from services.term_index import TermIndex, rank_from_key
+
+TERMS = ["HORSE CHESTNUT", "LIVE HORSES", "SEAHORSE", "HORSES", "CARROTS", "HORSERADISH", "HORSE"]
+
+
+def make_index(terms) -> TermIndex:
+    index = TermIndex()
+    index.check_interval = 0
+    index.build_from_rows([(i, term, None, None) for i, term in enumerate(terms, 1)])
+    return index
+
+
+def names(rows) -> list:
+    return [row[1] for row in rows]
+
+
+def all_pages(index: TermIndex, q: str, limit: int, after=None) -> list:
+    """Every match for q after the rank `after`, fetched page by page with the rank cursor"""
+    rows = []
+    while True:
+        page, has_more, after = index.search(q, limit=limit, after=after)
+        rows += page
+        if not has_more:
+            return rows
+
+
+def test_ranking_puts_term_then_prefix_then_word_then_substring_matches():
+    rows, has_more, _ = make_index(TERMS).search("horse")
+    assert names(rows) == ["HORSE", "HORSES", "HORSERADISH", "HORSE CHESTNUT", "LIVE HORSES", "SEAHORSE"]
+    assert not has_more
+
+
+def test_search_is_case_insensitive_and_empty_for_no_match():
+    index = make_index(TERMS)
+    assert names(index.search("RaDiSh")[0]) == ["HORSERADISH"]
+    assert index.search("zebra") == ([], False, None)
+
+
+def test_matches_are_the_same_as_ilike():
+    rng = random.Random(7)
+    terms = ["".join(rng.choice("abcde ") for _ in range(rng.randint(2, 12))).strip() or "a" for _ in range(400)]
+    terms = list(dict.fromkeys(terms))
+    index = make_index(terms)
+    for q in ("a", "ab", "b c", "cde", "eea", "dd"):
+        expected = sorted(term for term in terms if q in term)
+        assert sorted(names(all_pages(index, q, limit=7))) == expected
+
+
+def test_offset_paging():
+    index = make_index(TERMS)
+    first, more, _ = index.search("horse", limit=4)
+    second, more_after, _ = index.search("horse", limit=4, offset=4)
+    assert len(first) == 4 and more
+    assert names(first + second) == names(index.search("horse", limit=100)[0])
+    assert not more_after
+
+
+def test_cursor_paging_matches_offset_paging():
+    terms = [f"ITEM {i:03d}" for i in range(250)]
+    index = make_index(terms)
+    everything = names(index.search("item", limit=1000)[0])
+    # Past the first ranked batch, so later pages have to rank further
+    assert names(all_pages(index, "item", limit=30)) == everything
+    assert len(everything) == 250
+
+
+def test_cursor_neither_repeats_nor_skips_after_an_insert():
+    index = make_index(TERMS)
+    page, _, after = index.search("horse", limit=3)
+    # A new term that ranks ahead of the cursor would shift every offset by one
+    index.apply_changes([("upsert", (100, "HORSEY", None, None))])
+    rest = all_pages(index, "horse", limit=2, after=after)
+    assert names(page) + names(rest) == ["HORSE", "HORSES", "HORSERADISH", "HORSE CHESTNUT", "LIVE HORSES", "SEAHORSE"]
+
+
+def test_applied_changes_are_searchable():
+    index = make_index(TERMS)
+    index.apply_changes([("upsert", (100, "HORSEHAIR", None, None)), ("delete", (5, "CARROTS", None, None))])
+    assert "HORSEHAIR" in names(index.search("horse", limit=100)[0])
+    assert index.search("carrot")[0] == []
+    # An update replaces the old spelling
+    index.apply_changes([("upsert", (3, "SEA HORSE", None, None))])
+    assert "SEAHORSE" not in names(index.search("horse", limit=100)[0])
+    assert "SEA HORSE" in names(index.search("horse", limit=100)[0])
+
+
+@pytest.mark.parametrize("key", [None, "x", [0, 0, 5], [0, 0, 5, "horse", "1"], ["0", 0, 5, "horse", 1]])
+def test_rank_from_key_rejects_malformed_keys(key):
+    with pytest.raises(ValueError):
+        rank_from_key(key)
+
+
+def test_rank_from_key_accepts_a_returned_rank():
+    _, _, after = make_index(TERMS).search("horse", limit=2)
+    assert rank_from_key(list(after)) == after
+
+
+class TestSelect2Terms:
+    """/api/select2-terms paging by cursor on the index and ILIKE backends"""
+
+    @pytest.fixture(autouse=True)
+    def client(self, monkeypatch):
+        from fastapi.testclient import TestClient
+
+        import app
+        from database.models import ProductTerm, SessionLocal
+
+        db = SessionLocal()
+        db.add_all(ProductTerm(term=f"ITEM {i:03d}") for i in range(45))
+        db.commit()
+        db.close()
+        monkeypatch.setattr(app.fuzzy_terms, "enabled", False)
+        self.app = app
+        self.client = TestClient(app.app)
+
+    def use_backend(self, monkeypatch, backend):
+        monkeypatch.setattr(self.app.term_index, "backend", backend)
+        monkeypatch.setattr(self.app.term_fts, "backend", backend)
+        if backend == "index":
+            self.app.term_index.build()
+
+    def fetch_all(self, q):
+        terms, params = [], {"q": q, "per_page": 20}
+        while True:
+            body = self.client.get("/api/select2-terms", params=params).json()
+            terms += [item["text"] for item in body["results"]]
+            if not body["pagination"]["more"]:
+                assert "cursor" not in body["pagination"]
+                return terms
+            params = {"q": q, "per_page": 20, "cursor": body["pagination"]["cursor"]}
+
+    @pytest.mark.parametrize("backend", ["index", "db"])
+    def test_cursor_pages_cover_every_match_once(self, monkeypatch, backend):
+        self.use_backend(monkeypatch, backend)
+        assert self.fetch_all("item") == [f"ITEM {i:03d}" for i in range(45)]
+
+    @pytest.mark.parametrize("backend", ["index", "db"])
+    def test_page_parameter_still_works(self, monkeypatch, backend):
+        self.use_backend(monkeypatch, backend)
+        body = self.client.get("/api/select2-terms", params={"q": "item", "page": 3, "per_page": 20}).json()
+        assert [item["text"] for item in body["results"]] == [f"ITEM {i:03d}" for i in range(40, 45)]
+        assert body["pagination"]["more"] is False
+
+    def test_cursor_from_another_query_is_rejected(self, monkeypatch):
+        self.use_backend(monkeypatch, "db")
+        body = self.client.get("/api/select2-terms", params={"q": "item", "per_page": 20}).json()
+        cursor = body["pagination"]["cursor"]
+        assert self.client.get("/api/select2-terms", params={"q": "ite", "cursor": cursor}).status_code == 400
+        assert self.client.get("/api/select2-terms", params={"q": "item", "cursor": "not a cursor"}).status_code == 400